@@ -3,7 +3,9 @@ from django.contrib.auth.admin import UserAdmin
 from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, ExamMode
+from django.db.models import Q
+from .search import matching
+from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, ExamMode, Job, AuditEvent
 
 # CustomUser Admin
 @admin.register(CustomUser)
@@ -79,7 +81,16 @@ class SubjectAdmin(admin.ModelAdmin):
 class PracticalAdmin(admin.ModelAdmin):
     list_display = ['number', 'title', 'subject', 'teacher', 'deadline']
     list_filter = ['subject', 'teacher']
-    search_fields = ['title', 'description']
+    # Shows the search box; get_search_results does the searching
+    search_fields = ['subject__code']
+    search_help_text = 'Whole words of the title or description, or an exact subject code'
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index and an indexed equality instead of LIKE '%term%' scans
+        if not search_term.strip():
+            return queryset, False
+        ids = matching(search_term).filter(submission__isnull=True).values('practical_id')
+        return queryset.filter(Q(pk__in=ids) | Q(subject__code=search_term.strip())), False
 
 
 # PracticalSubmission Admin
@@ -87,7 +98,16 @@ class PracticalAdmin(admin.ModelAdmin):
 class PracticalSubmissionAdmin(admin.ModelAdmin):
     list_display = ['student', 'practical', 'status', 'is_draft', 'is_late', 'submitted_at']
     list_filter = ['status', 'is_draft', 'is_late']
-    search_fields = ['student__username', 'practical__title']
+    # Shows the search box; get_search_results does the searching
+    search_fields = ['student__username']
+    search_help_text = 'Whole words of the practical title, student name or report text, or an exact username'
+
+    def get_search_results(self, request, queryset, search_term):
+        # The index holds the practical title, student name and username and the report text
+        if not search_term.strip():
+            return queryset, False
+        ids = matching(search_term).filter(submission__isnull=False).values('submission_id')
+        return queryset.filter(Q(pk__in=ids) | Q(student__username=search_term.strip())), False
 
 
 # Certificate Admin
@@ -103,3 +123,29 @@ class CertificateAdmin(admin.ModelAdmin):
 class ExamModeAdmin(admin.ModelAdmin):
     list_display = ['department', 'is_enabled']
     list_filter = ['is_enabled']
+
+
+# Job Admin
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['locked_by', 'locked_at', 'error']
+
+
+# AuditEvent Admin (read-only; the log is append-only)
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'action', 'actor', 'student', 'subject', 'from_status', 'to_status']
+    list_filter = ['action', 'department']
+    list_select_related = ['actor', 'student', 'subject']
+    raw_id_fields = ['actor', 'student', 'subject']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,123 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# Events waiting for the end of the current request or job; None outside batch()
+_pending = ContextVar('audit_pending', default=None)
+
+
+def _pk(value):
+    return getattr(value, 'pk', value)
+
+
+def record(action, actor=None, student=None, subject=None, target=None,
+           from_status='', to_status='', department='', **details):
+    """
+    Queue one audit event. `actor`, `student` and `subject` may be instances
+    or ids; `target` is the changed object. Inside a transaction the event is
+    only kept if it commits. Inside batch() (every request and job) it is
+    written with the others at the end, otherwise straight away.
+    """
+    if not department:
+        department = getattr(subject, 'department', None) or getattr(student, 'department', None) or ''
+    event = AuditEvent(
+        created_at=timezone.now(),
+        action=action,
+        actor_id=_pk(actor),
+        student_id=_pk(student),
+        subject_id=_pk(subject),
+        department=department,
+        object_type=target._meta.model_name if target is not None else '',
+        object_id=target.pk if target is not None else None,
+        from_status=from_status or '',
+        to_status=to_status or '',
+        details=details,
+    )
+    # Runs at once when no transaction is open
+    transaction.on_commit(lambda: _queue(event))
+
+
+def _queue(event):
+    pending = _pending.get()
+    if pending is None:
+        write([event])
+    else:
+        pending.append(event)
+
+
+def write(events):
+    """Insert events in batches of AUDIT_BATCH_SIZE; a failure is logged, not raised"""
+    try:
+        AuditEvent.objects.bulk_create(events, batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500))
+    except Exception:
+        logger.exception('Could not write %s audit events', len(events))
+
+
+@contextmanager
+def batch():
+    """Hold the events recorded inside the block and write them together at the end"""
+    token = _pending.set([])
+    try:
+        yield
+    finally:
+        events = _pending.get()
+        _pending.reset(token)
+        if events:
+            write(events)
+
+
+def timeline(student=None, subject=None, actor=None, department=None, before=None, limit=50):
+    """
+    Newest events first for a student, subject and/or actor. Pages are keyed
+    on id (pass the last id seen as `before`), so each page is one index range
+    scan however many events exist.
+    """
+    # Prefetched rather than joined so events of deleted users still show
+    events = AuditEvent.objects.prefetch_related('actor', 'student', 'subject')
+    if student is not None:
+        events = events.filter(student_id=_pk(student))
+    if subject is not None:
+        events = events.filter(subject_id=_pk(subject))
+    if actor is not None:
+        events = events.filter(actor_id=_pk(actor))
+    if department:
+        events = events.filter(department=department)
+    if before is not None:
+        events = events.filter(id__lt=before)
+    return list(events.order_by('-id')[:limit])
+
+
+def event_json(event):
+    return {
+        'id': event.id,
+        'created_at': event.created_at.isoformat(),
+        'action': event.action,
+        'actor': event.actor.full_name if event.actor else None,
+        'actor_id': event.actor_id,
+        'student': event.student.full_name if event.student else None,
+        'student_id': event.student_id,
+        'subject': event.subject.name if event.subject else None,
+        'subject_id': event.subject_id,
+        'object_type': event.object_type,
+        'object_id': event.object_id,
+        'from_status': event.from_status,
+        'to_status': event.to_status,
+        'details': event.details,
+    }
+
+
+class AuditMiddleware:
+    """Write the audit events of a request in one INSERT after the view returns"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with batch():
+            return self.get_response(request)
@@ -0,0 +1,61 @@
+from django.db import transaction
+from .models import CustomUser, Subject, Certificate
+from . import audit, metrics
+
+
+def generate_student_certificates(template, batch_size=500):
+    """
+    Create one 'generated' certificate per student of the template's subject.
+
+    Students who already have a certificate for the subject are skipped.
+    Rows are inserted with bulk_create in batches inside one transaction, so
+    Certificate.save() is not run per student; 'generated' has no save()
+    side effects. Every certificate points at the template's file. The
+    subject row is locked first, so concurrent runs for the same subject
+    queue up and each sees the rows the other created.
+
+    Returns (created, skipped).
+    """
+    with transaction.atomic():
+        subject = Subject.objects.select_for_update().get(pk=template.subject_id)
+        student_ids = list(
+            CustomUser.objects.filter(
+                role='student',
+                department=subject.department,
+                student_class=subject.student_class
+            ).values_list('id', flat=True)
+        )
+        existing = set(
+            Certificate.objects.filter(
+                subject=subject,
+                student__isnull=False
+            ).values_list('student_id', flat=True)
+        ).intersection(student_ids)
+
+        new_certificates = [
+            Certificate(
+                student_id=student_id,
+                subject=subject,
+                teacher=template.teacher,
+                status='generated',
+                file_path=template.file_path.name or None,
+            )
+            for student_id in student_ids
+            if student_id not in existing
+        ]
+        # Every row is inserted, so the counts below are exact
+        Certificate.objects.bulk_create(new_certificates, batch_size=batch_size)
+
+        # bulk_create skips the storage layer, so count the shared file's new references
+        if template.file_path:
+            template.file_path.storage.add_references(template.file_path.name, len(new_certificates))
+
+    # bulk_create sends no post_save, so the transition signal does not see these
+    metrics.inc('portal_certificate_transitions_total', len(new_certificates), status='generated')
+    if new_certificates:
+        audit.record(
+            'certificate_generated', actor=template.teacher_id, subject=subject, target=template,
+            to_status='generated', created=len(new_certificates), skipped=len(existing)
+        )
+
+    return len(new_certificates), len(existing)
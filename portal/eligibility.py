@@ -0,0 +1,57 @@
+from collections import namedtuple
+from django.db.models import Count, Q
+from .models import CustomUser, Practical
+from .stats import count_subquery
+
+# A student may submit a subject's certificate once every practical is approved
+Eligibility = namedtuple('Eligibility', ['student_id', 'approved', 'total', 'eligible'])
+
+
+def subject_eligibility(subject, student_ids=None):
+    """
+    student_id -> Eligibility for a subject, in one grouped query: each
+    student's approved submissions are counted next to the subject's
+    practical count. Covers the subject's class, or only `student_ids`.
+    """
+    if student_ids is None:
+        students = CustomUser.objects.filter(
+            role='student', department=subject.department, student_class=subject.student_class
+        )
+    else:
+        students = CustomUser.objects.filter(pk__in=student_ids)
+
+    rows = students.order_by().annotate(
+        approved=Count('practicalsubmission', filter=Q(
+            practicalsubmission__practical__subject=subject,
+            practicalsubmission__status='approved',
+        )),
+        total=count_subquery(Practical.objects.filter(subject=subject)),
+    ).values_list('id', 'approved', 'total')
+
+    return {
+        student_id: Eligibility(student_id, approved, total or 0, approved >= (total or 0))
+        for student_id, approved, total in rows
+    }
+
+
+def student_eligibility(student, subject):
+    """Eligibility of one student for one subject"""
+    student_id = getattr(student, 'pk', student)
+    return subject_eligibility(subject, [student_id]).get(student_id) or Eligibility(student_id, 0, 0, False)
+
+
+def attach_eligibility(certificates):
+    """
+    Set `eligibility` on each certificate that has a student, with one
+    query per subject however many students the list holds
+    """
+    by_subject = {}
+    for certificate in certificates:
+        if certificate.student_id:
+            by_subject.setdefault(certificate.subject_id, []).append(certificate)
+
+    for group in by_subject.values():
+        eligibility = subject_eligibility(group[0].subject, [certificate.student_id for certificate in group])
+        for certificate in group:
+            certificate.eligibility = eligibility.get(certificate.student_id)
+    return certificates
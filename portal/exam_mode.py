@@ -0,0 +1,67 @@
+import copy
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from .models import ExamMode
+
+VERSION_KEY = 'exam-mode:version'
+
+# This process's copy of every ExamMode row, and the version it was loaded at
+_local = {'version': None, 'modes': None, 'checked': 0.0}
+_lock = threading.Lock()
+
+
+def exam_modes():
+    """
+    department -> ExamMode for every stored row.
+
+    Rows are kept in process memory. At most every EXAM_MODE_CHECK_INTERVAL
+    seconds the shared version key is compared, and the rows are reloaded
+    (one query) only when some process has saved an ExamMode since. So a
+    toggle reaches every worker within the interval, and in between a
+    lookup costs no query and no cache round trip. The version key lives
+    in the shared database cache (settings.CACHES).
+    """
+    now = time.monotonic()
+    with _lock:
+        if _local['modes'] is not None and now - _local['checked'] < getattr(settings, 'EXAM_MODE_CHECK_INTERVAL', 5):
+            return _local['modes']
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    with _lock:
+        if _local['modes'] is None or version != _local['version']:
+            _local['modes'] = {mode.department: mode for mode in ExamMode.objects.all()}
+            _local['version'] = version
+        _local['checked'] = now
+        return _local['modes']
+
+
+def is_exam_mode_enabled(department=None):
+    """Whether exam mode is on for the department, or for any department"""
+    modes = exam_modes()
+    if department is None:
+        return any(mode.is_enabled for mode in modes.values())
+    mode = modes.get(department)
+    return bool(mode and mode.is_enabled)
+
+
+def get_exam_mode(department):
+    """
+    A copy of the department's ExamMode, or an unsaved disabled one when
+    no row exists yet
+    """
+    mode = exam_modes().get(department)
+    return copy.copy(mode) if mode else ExamMode(department=department, is_enabled=False)
+
+
+def invalidate_exam_mode():
+    """New shared version so every process reloads, starting with this one"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    with _lock:
+        _local['modes'] = None
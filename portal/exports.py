@@ -0,0 +1,152 @@
+import csv
+import io
+import os
+import time
+import zipfile
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.text import get_valid_filename
+from .models import PracticalSubmission
+
+MANIFEST_NAME = 'manifest.csv'
+MANIFEST_FIELDS = [
+    'file', 'roll_number', 'student', 'class', 'subject', 'practical',
+    'title', 'status', 'submitted_at', 'late',
+]
+
+
+class ZipStream:
+    """
+    Write-only file object for ZipFile. It cannot seek, so ZipFile writes
+    sizes and CRCs in data descriptors after each entry and the archive
+    can be sent while it is being built.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def visible_submissions(user):
+    """
+    Submitted practicals a user may download, matching download_submission
+    """
+    submissions = PracticalSubmission.objects.filter(is_draft=False).exclude(file_path='').exclude(file_path__isnull=True)
+
+    if user.role == 'teacher':
+        return submissions.filter(practical__subject__teacher=user)
+    if user.role in ('hod', 'examiner'):
+        return submissions.filter(practical__subject__department=user.department)
+    if user.role == 'admin':
+        return submissions
+    return submissions.none()
+
+
+def safe_name(value, fallback):
+    """
+    A free-text field as one ZIP path component: no separators and no
+    leading dots, so an entry cannot escape the extraction folder, create
+    extra folders or come out hidden
+    """
+    try:
+        name = get_valid_filename(str(value or '')).lstrip('.')
+    except SuspiciousFileOperation:
+        name = ''
+    return name or str(fallback)
+
+
+def entry_name(submission, folder_per_subject):
+    student = submission.student
+    practical = submission.practical
+    extension = os.path.splitext(submission.file_path.name)[1].lower()
+    name = f"{safe_name(student.roll_number or student.username, student.pk)}_P{practical.number}{extension}"
+    if folder_per_subject:
+        name = f"{safe_name(practical.subject.code, practical.subject_id)}/{name}"
+    return name
+
+
+def stream_submissions_zip(submissions, folder_per_subject=False, include_manifest=False):
+    """
+    Yield a ZIP of the submissions' files, one block at a time.
+
+    Files are read in FILE_SERVE_CHUNK_SIZE blocks and stored without
+    compression (PDF and DOCX are already compressed), so memory use stays
+    constant however large the export is.
+    """
+    chunk_size = getattr(settings, 'FILE_SERVE_CHUNK_SIZE', 64 * 1024)
+    stream = ZipStream()
+    manifest = []
+    used_names = set()
+
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for submission in submissions:
+            name = entry_name(submission, folder_per_subject)
+            base, extension = os.path.splitext(name)
+            suffix = 2
+            while name in used_names:
+                name = f"{base}_{suffix}{extension}"
+                suffix += 1
+
+            try:
+                path = submission.file_path.path
+                stat = os.stat(path)
+            except (OSError, ValueError):
+                name = ''  # recorded in the manifest as missing
+            else:
+                used_names.add(name)
+                info = zipfile.ZipInfo(name, date_time=time.localtime(stat.st_mtime)[:6])
+                info.file_size = stat.st_size
+                with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                    for block in iter(lambda: source.read(chunk_size), b''):
+                        target.write(block)
+                        yield stream.pop()
+                yield stream.pop()
+
+            if include_manifest:
+                manifest.append(manifest_row(submission, name or 'MISSING'))
+
+        if include_manifest:
+            archive.writestr(MANIFEST_NAME, manifest_csv(manifest))
+
+    yield stream.pop()
+
+
+def manifest_row(submission, name):
+    student = submission.student
+    practical = submission.practical
+    return {
+        'file': name,
+        'roll_number': student.roll_number or '',
+        'student': student.full_name,
+        'class': student.student_class or '',
+        'subject': practical.subject.code,
+        'practical': practical.number,
+        'title': practical.title,
+        'status': submission.status,
+        'submitted_at': submission.submitted_at.isoformat() if submission.submitted_at else '',
+        'late': 'yes' if submission.is_late else 'no',
+    }
+
+
+def manifest_csv(rows):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=MANIFEST_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
@@ -0,0 +1,268 @@
+import os
+import secrets
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from .utils import get_file_extension
+from . import metrics
+
+CONTENT_TYPE_MAP = {
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.png': 'image/png',
+}
+
+# Headers used by the front proxy to send the file itself
+OFFLOAD_HEADERS = {
+    'nginx': 'X-Accel-Redirect',
+    'apache': 'X-Sendfile',
+    'lighttpd': 'X-Sendfile',
+}
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 32
+
+
+def get_content_type(file_name):
+    """
+    Get content type for a stored file from its extension
+    """
+    return CONTENT_TYPE_MAP.get(get_file_extension(file_name), 'application/octet-stream')
+
+
+def get_offload_backend():
+    """
+    Return the configured proxy offload backend, or None to stream through Django
+    """
+    backend = getattr(settings, 'FILE_SERVE_BACKEND', None)
+    if backend and backend not in OFFLOAD_HEADERS:
+        raise ValueError(f"Unknown FILE_SERVE_BACKEND: {backend}")
+    return backend
+
+
+def get_chunk_size():
+    return getattr(settings, 'FILE_SERVE_CHUNK_SIZE', 64 * 1024)
+
+
+def file_validators(path):
+    """
+    Return (size, etag, last_modified) for a stored file.
+    The ETag changes whenever the file is replaced or rewritten.
+    """
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return stat.st_size, etag, int(stat.st_mtime)
+
+
+def parse_range_header(header, size):
+    """
+    Parse a 'bytes=' Range header into a sorted list of inclusive (start,
+    end) pairs, with overlapping and adjacent ranges merged.
+
+    Returns None when the header should be ignored (malformed, too many
+    ranges, or asking for more bytes than the file has, which only repeats
+    data; RFC 9110 section 14.2) and an empty list when no range can be
+    satisfied.
+    """
+    units, _, range_set = header.partition('=')
+    if units.strip().lower() != 'bytes' or not range_set:
+        return None
+
+    specs = range_set.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        start, sep, end = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if not start:
+                # Suffix range: the last N bytes
+                length = int(end)
+                if length > 0 and size > 0:
+                    ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(start)
+            end = int(end) if end else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start < size:
+            ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+
+    if sum(end - start + 1 for start, end in ranges) > size:
+        return None
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Check If-Range so a client resuming a stale copy gets the whole new file
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_range(path, start, end, chunk_size):
+    """
+    Yield bytes start..end (inclusive) of a file in chunks
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = file.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def multipart_ranges(path, ranges, size, content_type, boundary, chunk_size):
+    """
+    Yield a multipart/byteranges body for several ranges
+    """
+    for start, end in ranges:
+        yield multipart_part_header(boundary, content_type, start, end, size)
+        yield from read_range(path, start, end, chunk_size)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def multipart_part_header(boundary, content_type, start, end, size):
+    return (
+        f'\r\n--{boundary}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+    ).encode()
+
+
+def partial_response(path, ranges, size, content_type, disposition):
+    """
+    206 response for one or more satisfiable byte ranges
+    """
+    chunk_size = get_chunk_size()
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            read_range(path, start, end, chunk_size), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        boundary = secrets.token_hex(16)
+        response = StreamingHttpResponse(
+            multipart_ranges(path, ranges, size, content_type, boundary, chunk_size),
+            status=206,
+            content_type=f'multipart/byteranges; boundary={boundary}',
+        )
+        response['Content-Length'] = sum(
+            len(multipart_part_header(boundary, content_type, start, end, size)) + end - start + 1
+            for start, end in ranges
+        ) + len(f'\r\n--{boundary}--\r\n')
+
+    response['Content-Disposition'] = disposition
+    return response
+
+
+def offload_response(path, accel_name, content_type, disposition, backend):
+    """
+    Empty response telling the front proxy which file to send
+    """
+    response = HttpResponse(content_type=content_type)
+    if backend == 'nginx':
+        prefix = getattr(settings, 'FILE_SERVE_ACCEL_PREFIX', '/protected-media/')
+        response[OFFLOAD_HEADERS[backend]] = prefix.rstrip('/') + '/' + quote(accel_name.replace(os.sep, '/'))
+    else:
+        response[OFFLOAD_HEADERS[backend]] = path
+    response['Content-Disposition'] = disposition
+    return response
+
+
+def serve_file(request, field_file, as_attachment=False):
+    """
+    Serve a stored FileField without loading it into worker memory.
+
+    Sends ETag/Last-Modified validators and answers If-None-Match /
+    If-Modified-Since with 304. Range requests get 206 partial content
+    (single or multipart), which lets pdf.js load large PDFs page by page.
+    Full responses are streamed in FILE_SERVE_CHUNK_SIZE blocks through
+    FileResponse, or handed to the front proxy when FILE_SERVE_BACKEND is set.
+    """
+    if not field_file:
+        raise Http404("File not found on server")
+    return serve_path(
+        request, field_file.path, os.path.basename(field_file.name),
+        as_attachment=as_attachment, accel_name=os.path.relpath(field_file.path, settings.MEDIA_ROOT)
+    )
+
+
+def serve_path(request, path, file_name, as_attachment=False, accel_name=None):
+    """
+    Serve a file on local disk with the same caching and Range handling as
+    serve_file. Only files with an accel_name (a path under MEDIA_ROOT) can
+    be offloaded to nginx; the others are always streamed.
+    """
+    if not os.path.exists(path):
+        raise Http404("File not found on server")
+
+    size, etag, last_modified = file_validators(path)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_file_response(request, path, file_name, as_attachment, accel_name, size, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+
+    # Counted when the response is built; with offloading the proxy sends the bytes
+    if request.method != 'HEAD' and response.status_code in (200, 206):
+        sent = size if response.status_code == 200 else int(response['Content-Length'])
+        metrics.inc('portal_file_bytes_served_total', sent, view=metrics.view_name(request))
+    return response
+
+
+def build_file_response(request, path, file_name, as_attachment, accel_name, size, etag, last_modified):
+    content_type = get_content_type(file_name)
+    disposition = content_disposition_header(as_attachment, file_name)
+
+    backend = get_offload_backend()
+    if backend and (accel_name or backend != 'nginx'):
+        # The proxy applies Range itself on the file it sends
+        return offload_response(path, accel_name, content_type, disposition, backend)
+
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.method in ('GET', 'HEAD') and if_range_matches(request, etag, last_modified):
+        ranges = parse_range_header(range_header, size)
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if ranges:
+            return partial_response(path, ranges, size, content_type, disposition)
+
+    response = FileResponse(
+        open(path, 'rb'),
+        as_attachment=as_attachment,
+        filename=file_name,
+        content_type=content_type,
+    )
+    response.block_size = get_chunk_size()
+    return response
@@ -1,3 +1,4 @@
+import re
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import authenticate
@@ -226,10 +227,11 @@ class ExaminerSearchForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'}),
         required=True
     )
+    # One roll number, or several separated by commas or spaces
     roll_number = forms.CharField(
-        max_length=20,
+        max_length=2000,
         widget=forms.TextInput(attrs={'class': 'form-control'}),
-        required=True
+        required=False
     )
     subject = forms.ModelChoiceField(
         queryset=Subject.objects.all(),
@@ -237,6 +239,12 @@ class ExaminerSearchForm(forms.Form):
         required=False,
         empty_label="All Subjects"
     )
+    whole_class = forms.BooleanField(required=False)
+
+    def roll_numbers(self):
+        """The entered roll numbers, without repeats"""
+        values = re.split(r'[\s,;]+', self.cleaned_data.get('roll_number') or '')
+        return list(dict.fromkeys(value for value in values if value))
 
 class CertificateSubmissionForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,172 @@
+import random
+import threading
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+from django.conf import settings
+from django.db import connections
+
+# Timings of the request being handled, None when it is not sampled
+current = ContextVar('request_timings', default=None)
+
+_summary = {}
+_summary_lock = threading.Lock()
+
+
+class RequestTimings:
+    """
+    What one request spent its time on. Also the execute_wrapper that
+    times its queries.
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.view_start = None
+        self.view_end = None
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - start
+            self.queries += 1
+
+    def as_dict(self):
+        end = perf_counter()
+        view = (self.view_end or end) - self.view_start if self.view_start else 0.0
+        return {
+            'total': (end - self.start) * 1000,
+            'view': view * 1000,
+            'db': self.db * 1000,
+            'template': self.template * 1000,
+            'queries': self.queries,
+        }
+
+
+def install_template_timer():
+    """
+    Wrap the Django template backend so renders made while a sampled
+    request is running add to its template time. Nested renders (e.g.
+    render_to_string in a template tag) count once, as part of the outer one.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'timed', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        timings = current.get()
+        if timings is None or timings.rendering:
+            return original(self, context, request)
+        timings.rendering = True
+        start = perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            timings.template += perf_counter() - start
+            timings.rendering = False
+
+    render.timed = True
+    Template.render = render
+
+
+def server_timing_header(timings):
+    return ', '.join([
+        f"db;dur={timings['db']:.1f};desc=\"{timings['queries']} queries\"",
+        f"tpl;dur={timings['template']:.1f}",
+        f"view;dur={timings['view']:.1f}",
+        f"total;dur={timings['total']:.1f}",
+    ])
+
+
+def record(route, timings):
+    window = getattr(settings, 'SERVER_TIMING_WINDOW', 200)
+    with _summary_lock:
+        entry = _summary.get(route)
+        if entry is None:
+            entry = _summary[route] = {'requests': 0, 'recent': deque(maxlen=window)}
+        entry['requests'] += 1
+        entry['recent'].append(timings)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summary():
+    """
+    Per URL name: sampled request count, and p50/p95 total time plus mean
+    view, DB and template time and query count over the recent window
+    """
+    with _summary_lock:
+        entries = {route: (entry['requests'], list(entry['recent'])) for route, entry in _summary.items()}
+
+    result = {}
+    for route, (requests, recent) in sorted(entries.items()):
+        totals = sorted(timings['total'] for timings in recent)
+        result[route] = {
+            'requests': requests,
+            'window': len(recent),
+            'p50_ms': round(percentile(totals, 0.5), 2),
+            'p95_ms': round(percentile(totals, 0.95), 2),
+            'max_ms': round(totals[-1], 2),
+        }
+        for name in ('view', 'db', 'template', 'queries'):
+            mean = sum(timings[name] for timings in recent) / len(recent)
+            result[route][name if name == 'queries' else f'{name}_ms'] = round(mean, 2)
+    return result
+
+
+def reset_summary():
+    with _summary_lock:
+        _summary.clear()
+
+
+class ServerTimingMiddleware:
+    """
+    Time a sample of requests: total, view, DB (with query count) and
+    template rendering. Results go into the per URL name summary and, when
+    SERVER_TIMING_HEADER is on, a Server-Timing response header. Requests
+    that are not sampled only cost a random() call.
+
+    List it first in MIDDLEWARE so the total covers the other middleware.
+    For streaming responses only the time to build the response is counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        if random.random() >= getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+            timings.view_end = perf_counter()
+        finally:
+            current.reset(token)
+
+        match = getattr(request, 'resolver_match', None)
+        result = timings.as_dict()
+        record(match.view_name if match else 'unresolved', result)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = server_timing_header(result)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current.get()
+        if timings is not None:
+            timings.view_start = perf_counter()
@@ -0,0 +1,181 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+from importlib import import_module
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .models import Job
+from . import audit, metrics
+
+logger = logging.getLogger(__name__)
+
+# Task name -> function(job, **payload)
+TASKS = {}
+
+
+def task(name):
+    """
+    Register a function as a background task under the given name.
+    The function is called with the Job and the job payload as keyword arguments.
+    """
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def load_tasks():
+    """
+    Import the task modules so their @task registrations run
+    """
+    import_module('portal.tasks')
+    return TASKS
+
+
+def enqueue(name, payload=None, user=None, max_attempts=None):
+    """
+    Add a job to the queue and return it.
+    The job is only visible to workers once the current transaction commits.
+    """
+    if name not in load_tasks():
+        raise ValueError(f"Unknown task: {name}")
+
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        created_by=user,
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+    )
+
+    if getattr(settings, 'JOB_RUN_INLINE', False):
+        transaction.on_commit(lambda: claim(job.pk, 'inline') and run_job(job.pk, 'inline'))
+    return job
+
+
+def set_progress(job, percent, message=''):
+    """
+    Record task progress so dashboards can poll it; this also renews the
+    job's lock
+    """
+    job.progress = max(0, min(100, int(percent)))
+    job.progress_message = message[:255]
+    Job.objects.filter(pk=job.pk).update(
+        progress=job.progress, progress_message=job.progress_message, locked_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs whose worker died while running them
+    """
+    timeout = getattr(settings, 'JOB_LOCK_TIMEOUT', 600)
+    return Job.objects.filter(
+        status='running',
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status='queued', locked_by='', locked_at=None)
+
+
+def claim(job_id, worker_id):
+    """
+    Lock a queued job for this worker; False if another worker got it first.
+
+    Claiming is a conditional UPDATE on status='queued', so two workers
+    racing for the same row cannot both win, on any database backend.
+    """
+    return bool(Job.objects.filter(id=job_id, status='queued').update(
+        status='running', locked_by=worker_id, locked_at=timezone.now()
+    ))
+
+
+def claim_next(worker_id):
+    """
+    Claim the oldest due job for this worker
+    """
+    candidates = Job.objects.filter(status='queued', run_after__lte=timezone.now()).order_by('run_after', 'id')
+
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        if claim(job_id, worker_id):
+            return job_id
+    return None
+
+
+def heartbeat(job_id, worker_id, stop_event):
+    """
+    Renew a running job's lock until stop_event is set, so jobs that run
+    longer than JOB_LOCK_TIMEOUT are not requeued by requeue_stale_jobs
+    """
+    interval = getattr(settings, 'JOB_LOCK_TIMEOUT', 600) / 3
+    try:
+        while not stop_event.wait(interval):
+            Job.objects.filter(pk=job_id, status='running', locked_by=worker_id).update(
+                locked_at=timezone.now()
+            )
+    finally:
+        connection.close()
+
+
+def run_job(job_id, worker_id):
+    """
+    Run one claimed job, recording its result or scheduling a retry
+    """
+    job = Job.objects.get(pk=job_id)
+    func = load_tasks().get(job.name)
+    job.attempts += 1
+    Job.objects.filter(pk=job.pk).update(attempts=job.attempts)
+
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=heartbeat, args=(job.pk, worker_id, stop_heartbeat), daemon=True).start()
+    # Updates only apply while this worker still holds the job; if its lock
+    # expired and another worker took the job over, that run's state wins
+    owned = Job.objects.filter(pk=job.pk, status='running', locked_by=worker_id)
+    try:
+        if func is None:
+            raise ValueError(f"Unknown task: {job.name}")
+        with audit.batch():
+            result = func(job, **job.payload)
+    except Exception:
+        job.error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+
+        if job.attempts < job.max_attempts:
+            backoff = getattr(settings, 'JOB_RETRY_BACKOFF', 5) * 2 ** (job.attempts - 1)
+            updated = owned.update(
+                status='queued', error=job.error, locked_by='', locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=backoff)
+            )
+        else:
+            updated = owned.update(status='failed', error=job.error, finished_at=timezone.now())
+        if not updated:
+            logger.warning("Job %s (%s) was taken over while running on %s; failure not recorded",
+                           job.pk, job.name, worker_id)
+        return False
+    finally:
+        stop_heartbeat.set()
+
+    if not owned.update(status='succeeded', result=result, error='', progress=100, finished_at=timezone.now()):
+        logger.warning("Job %s (%s) was taken over while running on %s; result discarded",
+                       job.pk, job.name, worker_id)
+        return False
+    return True
+
+
+def work(worker_id, stop_event, poll_interval=None):
+    """
+    Worker loop: claim and run jobs until stop_event is set
+    """
+    poll_interval = poll_interval or getattr(settings, 'JOB_POLL_INTERVAL', 1.0)
+    load_tasks()
+
+    while not stop_event.is_set():
+        close_old_connections()
+        job_id = claim_next(worker_id)
+        if job_id is None:
+            stop_event.wait(poll_interval)
+            continue
+        run_job(job_id, worker_id)
+        # Jobs record metrics too (e.g. generated certificates)
+        metrics.maybe_flush()
+
+    connection.close()
@@ -0,0 +1,82 @@
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from portal.models import CustomUser, Subject, Certificate
+from portal.certificates import generate_student_certificates
+
+BENCH_DEPARTMENT = 'computer_science'
+BENCH_CLASS = 'Semester 6'
+
+
+def legacy_generate(template):
+    """The old add_certificate loop: create() plus a file-copy save() per student"""
+    subject = template.subject
+    students = CustomUser.objects.filter(
+        role='student',
+        department=subject.department,
+        student_class=subject.student_class
+    )
+    for student in students:
+        student_certificate = Certificate.objects.create(
+            student=student,
+            subject=subject,
+            teacher=template.teacher,
+            status='generated'
+        )
+        if template.file_path:
+            student_certificate.file_path = template.file_path
+            student_certificate.save()
+
+
+class Command(BaseCommand):
+    help = 'Time per-student vs bulk certificate generation (all rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help='Comma separated class sizes')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+
+        self.stdout.write(f"{'students':>8} {'mode':<7} {'seconds':>9} {'queries':>8}")
+        for size in sizes:
+            for mode in ('legacy', 'bulk'):
+                seconds, queries = self.run_once(size, mode)
+                self.stdout.write(f'{size:>8} {mode:<7} {seconds:>9.3f} {queries:>8}')
+
+    def run_once(self, size, mode):
+        with transaction.atomic():
+            password = make_password(None)
+            teacher = CustomUser.objects.create(
+                username='bench_teacher', full_name='Bench Teacher', role='teacher',
+                department=BENCH_DEPARTMENT, password=password
+            )
+            CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=f'bench_student_{i}', full_name=f'Bench Student {i}', role='student',
+                    department=BENCH_DEPARTMENT, student_class=BENCH_CLASS,
+                    roll_number=f'B{i}', password=password
+                )
+                for i in range(size)
+            ], batch_size=1000)
+            subject = Subject.objects.create(
+                name='Bench Subject', code='BENCH-CERT', department=BENCH_DEPARTMENT,
+                student_class=BENCH_CLASS, teacher=teacher
+            )
+            template = Certificate.objects.create(
+                subject=subject, teacher=teacher, status='template_added',
+                file_path='certificates/bench_template.pdf'
+            )
+
+            queries = []
+            with connection.execute_wrapper(lambda execute, *args: queries.append(1) or execute(*args)):
+                start = time.perf_counter()
+                if mode == 'legacy':
+                    legacy_generate(template)
+                else:
+                    generate_student_certificates(template)
+                seconds = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        return seconds, len(queries)
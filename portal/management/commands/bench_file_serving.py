@@ -0,0 +1,105 @@
+import os
+import tempfile
+import time
+import tracemalloc
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from portal.models import PracticalSubmission
+from portal.file_serving import serve_file, get_content_type
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_REQUEST = RequestFactory().get('/')
+
+
+def legacy_response(field_file):
+    """The old download path: whole file read into one HttpResponse"""
+    with open(field_file.path, 'rb') as file:
+        file_data = file.read()
+    response = HttpResponse(file_data, content_type=get_content_type(field_file.name))
+    response['Content-Length'] = len(file_data)
+    return response
+
+
+def consume(response):
+    """Drain a response the way the WSGI server would and return bytes sent"""
+    sent = 0
+    for chunk in response:
+        sent += len(chunk)
+    response.close()
+    return sent
+
+
+def run_mode(mode, field_file):
+    """Build and drain one response, returning (bytes, seconds, peak_bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == 'buffered':
+        response = legacy_response(field_file)
+    elif mode == 'streaming':
+        with override_settings(FILE_SERVE_BACKEND=None):
+            response = serve_file(BENCH_REQUEST, field_file, as_attachment=True)
+    else:
+        with override_settings(FILE_SERVE_BACKEND='nginx'):
+            response = serve_file(BENCH_REQUEST, field_file, as_attachment=True)
+    sent = consume(response)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sent, elapsed, peak
+
+
+def _child(mode, field_file, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = run_mode(mode, field_file)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put(result + ((after - before) * 1024,))
+
+
+def measure(mode, field_file):
+    """Run one mode, in a forked child when possible so RSS growth is isolated"""
+    if resource is None or 'fork' not in multiprocessing.get_all_start_methods():
+        return run_mode(mode, field_file) + (None,)
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(mode, field_file, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Compare memory and worker time of buffered, streamed and proxy-offloaded file responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,40', help='Comma separated file sizes in MB')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(os.path.join(media_root, 'practicals'))
+
+            self.stdout.write(f"{'size':>6} {'mode':<10} {'worker ms':>10} {'peak heap MB':>13} {'RSS growth MB':>14}")
+            for size in sizes:
+                name = f'practicals/bench_{size}mb.pdf'
+                with open(os.path.join(media_root, name), 'wb') as file:
+                    block = os.urandom(1024 * 1024)
+                    for _ in range(size):
+                        file.write(block)
+
+                field_file = PracticalSubmission(file_path=name).file_path
+
+                for mode in ('buffered', 'streaming', 'offload'):
+                    sent, elapsed, peak, rss = measure(mode, field_file)
+                    rss_text = f'{rss / 1048576:.1f}' if rss is not None else 'n/a'
+                    self.stdout.write(
+                        f'{size:>4}MB {mode:<10} {elapsed * 1000:>10.1f} '
+                        f'{peak / 1048576:>13.1f} {rss_text:>14}'
+                    )
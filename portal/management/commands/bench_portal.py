@@ -0,0 +1,210 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from portal.models import CustomUser, Practical, PracticalSubmission, Certificate, CertificateSubmission
+from portal.seeding import SEED_PREFIX
+
+
+class QueryCounter:
+    """execute_wrapper that counts every query, with no cap"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the dashboard, review and download views against seed_portal data and write '
+        'query counts, p50/p95 latency and peak memory to a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--output', default='bench_report.json', help='Where to write the JSON report')
+        parser.add_argument('--compare', help='Earlier report to compare against')
+        parser.add_argument('--only', help='Comma separated scenario names to run')
+
+    def handle(self, *args, **options):
+        users = {
+            role: CustomUser.objects.filter(username__startswith=f'{SEED_PREFIX}{role}_').order_by('id').first()
+            for role in ('student', 'teacher', 'hod', 'examiner')
+        }
+        users['admin'] = CustomUser.objects.filter(username=f'{SEED_PREFIX}admin').first()
+        if not all(users.values()):
+            raise CommandError('No seeded data found; run manage.py seed_portal first')
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+            scenarios = self.scenarios(users)
+            if options['only']:
+                wanted = set(options['only'].split(','))
+                scenarios = [scenario for scenario in scenarios if scenario[0] in wanted]
+
+            for name, user, method, url, data in scenarios:
+                results[name] = self.measure(user, method, url, data, options['iterations'])
+                result = results[name]
+                self.stdout.write(
+                    f"{name:<28} {result['status']:>3}  p50 {result['p50_ms']:>8.2f} ms  "
+                    f"p95 {result['p95_ms']:>8.2f} ms  {result['queries']:>4} queries  "
+                    f"peak {result['peak_kb']:>8.0f} KB"
+                )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'iterations': options['iterations'],
+                'dataset': {
+                    'students': CustomUser.objects.filter(role='student').count(),
+                    'submissions': PracticalSubmission.objects.count(),
+                    'certificates': Certificate.objects.count(),
+                },
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['compare']:
+            self.compare(options['compare'], report)
+
+    def scenarios(self, users):
+        """
+        (name, user, method, url, data) for every view worth tracking
+        """
+        teacher, student = users['teacher'], users['student']
+        submission = PracticalSubmission.objects.filter(
+            practical__teacher=teacher, is_draft=False
+        ).exclude(file_path=None).first()
+        practical = Practical.objects.filter(teacher=teacher).first()
+        certificate = Certificate.objects.filter(teacher=teacher, student__isnull=False).exclude(file_path=None).first()
+        certificate_submission = CertificateSubmission.objects.filter(certificate__teacher=teacher).first()
+
+        second_page = None
+        client = Client()
+        client.force_login(teacher)
+        cursor = client.get(reverse('teacher_queue', args=['submissions'])).json().get('next_cursor')
+        if cursor:
+            second_page = reverse('teacher_queue', args=['submissions']) + f'?cursor={cursor}'
+
+        scenarios = [
+            ('home', None, 'get', reverse('home'), None),
+            ('student_dashboard', student, 'get', reverse('student_dashboard'), None),
+            ('submit_practical_form', student, 'get', reverse('submit_practical', args=[practical.id]), None),
+            ('student_certificates', student, 'get', reverse('student_certificates'), None),
+            ('teacher_dashboard', teacher, 'get', reverse('teacher_dashboard'), None),
+            ('teacher_queue', teacher, 'get', reverse('teacher_queue', args=['submissions']), None),
+            ('teacher_queue_page_2', teacher, 'get', second_page, None),
+            ('teacher_certificates', teacher, 'get', reverse('teacher_certificates'), None),
+            ('review_submission', teacher, 'get', reverse('review_submission', args=[submission.id]), None),
+            ('download_submission', teacher, 'get', reverse('download_submission', args=[submission.id]), None),
+            ('download_certificate', users['admin'], 'get', reverse('download_certificate', args=[certificate.id]), None),
+            ('view_certificate_submission', teacher, 'get',
+             reverse('view_certificate', args=[certificate_submission.id]) if certificate_submission else None, None),
+            ('export_practical_zip', teacher, 'get', reverse('export_practical_submissions', args=[practical.id]), None),
+            ('hod_dashboard', users['hod'], 'get', reverse('hod_dashboard'), None),
+            ('admin_dashboard', users['admin'], 'get', reverse('admin_dashboard'), None),
+            ('examiner_dashboard', users['examiner'], 'get', reverse('examiner_dashboard'), None),
+            ('examiner_search', users['examiner'], 'post', reverse('examiner_dashboard'), {
+                'department': student.department,
+                'student_class': student.student_class,
+                'roll_number': student.roll_number,
+            }),
+            ('examiner_certificates', users['examiner'], 'get', reverse('examiner_certificates'), None),
+        ]
+        return [scenario for scenario in scenarios if scenario[3]]
+
+    def measure(self, user, method, url, data, iterations):
+        client = Client()
+        if user:
+            client.force_login(user)
+
+        def request():
+            response = getattr(client, method)(url, data) if data else getattr(client, method)(url)
+            # Streaming responses only do their work when consumed
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    pass
+            response.close()
+            return response
+
+        response = request()  # warm up caches and connections
+
+        counter = QueryCounter()
+        timings = []
+        with connection.execute_wrapper(counter):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - start) * 1000)
+
+        # Separate run for memory, since tracing slows everything down
+        tracemalloc.start()
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': counter.count // iterations,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'mean_ms': statistics.fmean(timings),
+            'peak_kb': peak / 1024,
+        }
+
+    def compare(self, path, report):
+        if not os.path.exists(path):
+            raise CommandError(f'No report at {path}')
+        with open(path) as file:
+            baseline = json.load(file)
+
+        self.stdout.write(
+            f"\nCompared with {baseline['meta'].get('revision') or path}:\n"
+            f"{'view':<28} {'p50 ms':>18} {'queries':>12} {'peak KB':>20}"
+        )
+        for name, result in report['results'].items():
+            old = baseline['results'].get(name)
+            if not old:
+                continue
+            self.stdout.write(
+                f"{name:<28} {old['p50_ms']:>8.2f} → {result['p50_ms']:<8.2f}"
+                f"{old['queries']:>5} → {result['queries']:<5}"
+                f"{old['peak_kb']:>9.0f} → {result['peak_kb']:<9.0f}"
+            )
@@ -0,0 +1,73 @@
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a gunicorn worker loads before serving: the WSGI app and the URLconf
+BOOT_MODULES = ['practical_portal.wsgi', 'practical_portal.urls']
+
+# Document and image libraries that must only be imported when first used
+LAZY_MODULES = ['docx', 'docx2pdf', 'PIL', 'lxml']
+
+
+def parse_importtime(output):
+    """
+    (depth, self_us, cumulative_us, module) for each line of -X importtime
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure worker boot import time with python -X importtime in a fresh '
+        'interpreter and fail if it exceeds IMPORT_TIME_BUDGET_MS or loads a '
+        'document library eagerly'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time; the median is used')
+        parser.add_argument('--budget-ms', type=float, help='Override IMPORT_TIME_BUDGET_MS')
+        parser.add_argument('--top', type=int, default=15, help='Slowest modules to list')
+
+    def handle(self, *args, **options):
+        budget = options['budget_ms'] or getattr(settings, 'IMPORT_TIME_BUDGET_MS', 1000)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+        code = 'import ' + ', '.join(BOOT_MODULES)
+
+        totals = []
+        rows = []
+        for _ in range(max(1, options['runs'])):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                capture_output=True, text=True, env=env, cwd=settings.BASE_DIR
+            )
+            if result.returncode:
+                raise CommandError(f'Importing the WSGI application failed:\n{result.stderr[-2000:]}')
+            rows = parse_importtime(result.stderr)
+            totals.append(sum(cumulative for depth, _, cumulative, name in rows if depth == 0 and name in BOOT_MODULES))
+
+        total_ms = statistics.median(totals) / 1000
+        self.stdout.write(f'Boot imports: {total_ms:.1f} ms (median of {len(totals)}), budget {budget:.0f} ms\n')
+
+        self.stdout.write(f"{'self ms':>9} {'total ms':>9}  module")
+        for depth, self_us, cumulative_us, name in sorted(rows, key=lambda row: row[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}')
+
+        problems = []
+        eager = sorted({name.split('.')[0] for _, _, _, name in rows} & set(LAZY_MODULES))
+        if eager:
+            problems.append('loaded at boot: ' + ', '.join(eager))
+        if total_ms > budget:
+            problems.append(f'{total_ms:.1f} ms is over the {budget:.0f} ms budget')
+        if problems:
+            raise CommandError('Import time check failed; ' + '; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Import time within budget'))
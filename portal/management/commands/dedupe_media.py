@@ -0,0 +1,134 @@
+import os
+from collections import Counter
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from portal.models import PracticalSubmission, Certificate, CertificateSubmission, StoredBlob
+from portal.storage import BLOB_DIR, blob_relative_path, content_storage, parse_blob_name
+
+FILE_MODELS = (PracticalSubmission, Certificate, CertificateSubmission)
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads into content-addressed storage and rebuild blob reference counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without changing it')
+        parser.add_argument('--gc', action='store_true', help='Delete blob files that no row references')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        migrated = {}  # legacy name -> blob name
+        bytes_saved = 0
+        moved = 0
+
+        for model in FILE_MODELS:
+            legacy_names = (
+                model.objects.exclude(file_path='').exclude(file_path__isnull=True)
+                .values_list('file_path', flat=True).distinct()
+            )
+            for name in legacy_names:
+                if parse_blob_name(name) or name in migrated:
+                    continue
+                path = content_storage.path(name)
+                if not os.path.exists(path):
+                    self.stderr.write(f'Missing file: {name}')
+                    continue
+
+                size = os.path.getsize(path)
+                if dry_run:
+                    migrated[name] = None
+                    continue
+
+                with open(path, 'rb') as file:
+                    new_name = content_storage.save(name, File(file, name=os.path.basename(name)))
+                # save() added one reference, so more than one means the blob already existed
+                if StoredBlob.objects.filter(digest=parse_blob_name(new_name)[0], ref_count__gt=1).exists():
+                    bytes_saved += size
+                migrated[name] = new_name
+                moved += 1
+
+        if not dry_run:
+            self.repoint_rows(migrated)
+
+        if dry_run:
+            self.stdout.write(f'{len(migrated)} legacy files would be moved into blob storage')
+            return
+
+        blobs_removed = self.rebuild_ref_counts(options['gc'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} files, saved {bytes_saved} bytes from duplicates, '
+            f'removed {blobs_removed} unreferenced blobs'
+        ))
+
+    def repoint_rows(self, migrated):
+        """
+        Point rows at their blobs, each under its row lock so an upload
+        replacing the same row waits for it (or wins, and is left alone).
+        Legacy files are removed once no committed row names them.
+        """
+        for model in FILE_MODELS:
+            ids = model.objects.filter(file_path__in=list(migrated)).values_list('pk', flat=True)
+            for pk in list(ids):
+                with transaction.atomic():
+                    name = model.objects.select_for_update().filter(pk=pk).values_list('file_path', flat=True).first()
+                    if name in migrated:
+                        model.objects.filter(pk=pk).update(file_path=migrated[name])
+
+        for name in migrated:
+            if any(model.objects.filter(file_path=name).exists() for model in FILE_MODELS):
+                self.stderr.write(f'Still referenced, kept: {name}')
+                continue
+            try:
+                os.remove(content_storage.path(name))
+            except FileNotFoundError:
+                pass
+
+    def rebuild_ref_counts(self, collect_garbage):
+        """
+        Recount references from the database, the source of truth. The
+        StoredBlob rows stay locked meanwhile, so uploads and deletes that
+        would change a count wait until it has been rewritten.
+        """
+        with transaction.atomic():
+            list(StoredBlob.objects.select_for_update().values_list('digest', flat=True))
+            counts = self.recount()
+        return self.collect_garbage(counts) if collect_garbage else 0
+
+    def recount(self):
+        """Rewrite every StoredBlob count from the rows; returns {digest: count}"""
+        counts = Counter()
+        for model in FILE_MODELS:
+            for name in model.objects.filter(file_path__contains='/').values_list('file_path', flat=True).iterator():
+                parsed = parse_blob_name(name)
+                if parsed:
+                    counts[parsed[0]] += 1
+
+        known = dict(StoredBlob.objects.values_list('digest', 'ref_count'))
+        for digest, ref_count in known.items():
+            if counts.get(digest, 0) != ref_count:
+                StoredBlob.objects.filter(digest=digest).update(ref_count=counts.get(digest, 0))
+        StoredBlob.objects.bulk_create([
+            StoredBlob(digest=digest, ref_count=count) for digest, count in counts.items() if digest not in known
+        ], ignore_conflicts=True)
+        return counts
+
+    def collect_garbage(self, counts):
+        """Delete blob files that no row referenced when the counts were rebuilt"""
+        removed = 0
+        StoredBlob.objects.filter(ref_count__lte=0).delete()
+        blob_root = content_storage.path(BLOB_DIR)
+        for root, _, names in os.walk(blob_root):
+            for name in names:
+                digest = os.path.splitext(name)[0]
+                if name.startswith('.') or digest in counts:
+                    continue
+                # An upload may have stored this blob since the counts were taken
+                if StoredBlob.objects.filter(digest=digest).exists():
+                    continue
+                try:
+                    os.remove(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        return removed
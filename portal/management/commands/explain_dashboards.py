@@ -0,0 +1,249 @@
+import statistics
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from portal.models import CustomUser, Subject, Practical, PracticalSubmission, Certificate
+
+SEED_PREFIX = 'explain_'
+
+# Indexes added in 0005_dashboard_indexes, dropped for the "before" run
+DASHBOARD_INDEXES = {
+    CustomUser: ['user_role_dept_class_roll_idx'],
+    Subject: ['subject_dept_class_idx'],
+    PracticalSubmission: ['submission_practical_draft_idx', 'submission_student_status_idx'],
+    Certificate: ['certificate_subject_status_idx', 'certificate_status_subject_idx'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large dataset and print EXPLAIN plans and timings for the dashboard '
+        'queries without and with the dashboard indexes. Drops and recreates those '
+        'indexes, so run it against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=4)
+        parser.add_argument('--students-per-class', type=int, default=120)
+        parser.add_argument('--subjects-per-class', type=int, default=4)
+        parser.add_argument('--practicals', type=int, default=10, help='Practicals per subject')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows afterwards')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Seeding...')
+        sample = self.seed(options)
+        try:
+            queries = self.dashboard_queries(sample)
+            dropped = self.drop_indexes()
+            if not dropped:
+                self.stderr.write('Dashboard indexes not found; run migrate first')
+                return
+            try:
+                before = self.measure(queries, options['repeat'], 'before (no dashboard indexes)')
+            finally:
+                self.create_indexes(dropped)
+            after = self.measure(queries, options['repeat'], 'after (with dashboard indexes)')
+
+            self.stdout.write(f"\n{'query':<34} {'before ms':>10} {'after ms':>10}")
+            for label in queries:
+                self.stdout.write(f'{label:<34} {before[label]:>10.3f} {after[label]:>10.3f}')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, options):
+        password = make_password(None)
+        classes = [value for value, _ in CustomUser.CLASS_CHOICES]
+        departments = [f'{SEED_PREFIX}dept_{d}' for d in range(options['departments'])]
+        statuses = ['submitted', 'approved', 'rejected']
+        certificate_statuses = ['generated', 'submitted_to_teacher', 'sent_to_hod', 'sent_to_examiner', 'certified']
+
+        subject_keys = [
+            (department, student_class, f'{SEED_PREFIX}{d}_{c}_{n}')
+            for d, department in enumerate(departments)
+            for c, student_class in enumerate(classes)
+            for n in range(options['subjects_per_class'])
+        ]
+
+        # One teacher per subject, as in a real timetable
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{SEED_PREFIX}t_{code}', full_name='Teacher', role='teacher',
+                       department=department, password=password)
+            for department, _, code in subject_keys
+        ], batch_size=1000)
+        teachers = {
+            username[len(f'{SEED_PREFIX}t_'):]: teacher_id
+            for username, teacher_id in CustomUser.objects.filter(
+                username__startswith=f'{SEED_PREFIX}t_'
+            ).values_list('username', 'id')
+        }
+
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{SEED_PREFIX}s_{d}_{c}_{i}', full_name=f'Student {i}', role='student',
+                       department=department, student_class=student_class, roll_number=str(i), password=password)
+            for d, department in enumerate(departments)
+            for c, student_class in enumerate(classes)
+            for i in range(options['students_per_class'])
+        ], batch_size=1000)
+
+        Subject.objects.bulk_create([
+            Subject(name=code, code=code, department=department,
+                    student_class=student_class, teacher_id=teachers[code])
+            for department, student_class, code in subject_keys
+        ], batch_size=1000)
+        subjects = list(Subject.objects.filter(code__startswith=SEED_PREFIX))
+
+        deadline = timezone.now()
+        Practical.objects.bulk_create([
+            Practical(number=number, title=f'Practical {number}', description='', deadline=deadline,
+                      subject=subject, teacher_id=subject.teacher_id)
+            for subject in subjects
+            for number in range(1, options['practicals'] + 1)
+        ], batch_size=1000)
+
+        students = {}
+        for student_id, department, student_class in CustomUser.objects.filter(
+            username__startswith=f'{SEED_PREFIX}s_'
+        ).values_list('id', 'department', 'student_class'):
+            students.setdefault((department, student_class), []).append(student_id)
+
+        practicals = {}
+        for practical_id, subject_id in Practical.objects.filter(
+            subject__code__startswith=SEED_PREFIX
+        ).values_list('id', 'subject_id'):
+            practicals.setdefault(subject_id, []).append(practical_id)
+
+        submissions = []
+        certificates = []
+        for subject in subjects:
+            class_students = students[(subject.department, subject.student_class)]
+            for n, student_id in enumerate(class_students):
+                for practical_id in practicals[subject.id]:
+                    draft = (student_id + practical_id) % 5 == 0
+                    submissions.append(PracticalSubmission(
+                        student_id=student_id, practical_id=practical_id, is_draft=draft,
+                        status='draft' if draft else statuses[(student_id + practical_id) % 3]
+                    ))
+                certificates.append(Certificate(
+                    student_id=student_id, subject=subject, teacher_id=subject.teacher_id,
+                    status=certificate_statuses[n % len(certificate_statuses)]
+                ))
+            if len(submissions) >= 10000:
+                PracticalSubmission.objects.bulk_create(submissions, batch_size=2000)
+                submissions = []
+        PracticalSubmission.objects.bulk_create(submissions, batch_size=2000)
+        Certificate.objects.bulk_create(certificates, batch_size=2000)
+
+        self.stdout.write(
+            f'{CustomUser.objects.filter(username__startswith=SEED_PREFIX).count()} users, '
+            f'{len(subjects)} subjects, '
+            f'{PracticalSubmission.objects.filter(practical__subject__code__startswith=SEED_PREFIX).count()} submissions, '
+            f'{Certificate.objects.filter(subject__code__startswith=SEED_PREFIX).count()} certificates'
+        )
+        subject = subjects[len(subjects) // 2]
+        return {
+            'teacher_id': subject.teacher_id,
+            'department': subject.department,
+            'student_class': subject.student_class,
+            'subject': subject,
+            'student_id': students[(subject.department, subject.student_class)][0],
+        }
+
+    def dashboard_queries(self, sample):
+        """
+        The hot filters from the dashboards, keyed by a short label
+        """
+        return {
+            'examiner: student by roll': CustomUser.objects.filter(
+                role='student', department=sample['department'],
+                student_class=sample['student_class'], roll_number='7'
+            ),
+            'add_certificate: class students': CustomUser.objects.filter(
+                role='student', department=sample['department'], student_class=sample['student_class']
+            ).values_list('id', flat=True),
+            'student: class subjects': Subject.objects.filter(
+                department=sample['department'], student_class=sample['student_class']
+            ),
+            'teacher: submitted work': PracticalSubmission.objects.filter(
+                practical__teacher_id=sample['teacher_id'], is_draft=False
+            ).select_related('student', 'practical'),
+            'student: approved submissions': PracticalSubmission.objects.filter(
+                student_id=sample['student_id'], status='approved'
+            ),
+            'certificates: subject by status': Certificate.objects.filter(
+                subject=sample['subject'], status='generated'
+            ),
+            'hod: certificates to approve': Certificate.objects.filter(
+                status='sent_to_hod', subject__department=sample['department']
+            ).select_related('student', 'subject', 'teacher'),
+        }
+
+    def measure(self, queries, repeat, title):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {title} ==='))
+        timings = {}
+        for label, queryset in queries.items():
+            self.stdout.write(self.style.SUCCESS(f'\n-- {label}'))
+            self.stdout.write(queryset.explain())
+
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                runs.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(runs)
+            self.stdout.write(f'median {timings[label]:.3f} ms over {repeat} runs')
+        return timings
+
+    def existing_indexes(self, model):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+    def drop_indexes(self):
+        dropped = []
+        with connection.schema_editor() as editor:
+            for model, names in DASHBOARD_INDEXES.items():
+                existing = self.existing_indexes(model)
+                for index in model._meta.indexes:
+                    if index.name in names and index.name in existing:
+                        editor.remove_index(model, index)
+                        dropped.append((model, index))
+        self.analyze()
+        return dropped
+
+    def create_indexes(self, indexes):
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+        self.analyze()
+
+    def analyze(self):
+        """
+        Refresh planner statistics so both runs plan with the seeded data
+        """
+        tables = [model._meta.db_table for model in DASHBOARD_INDEXES]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+            elif connection.vendor == 'mysql':
+                cursor.execute('ANALYZE TABLE ' + ', '.join(connection.ops.quote_name(table) for table in tables))
+                cursor.fetchall()
+            elif connection.vendor == 'postgresql':
+                for table in tables:
+                    cursor.execute('ANALYZE ' + connection.ops.quote_name(table))
+
+    def cleanup(self):
+        self.stdout.write('\nRemoving seeded rows...')
+        # Delete in batches; the file-release signals load each row
+        for model, lookup in (
+            (PracticalSubmission, 'practical__subject__code__startswith'),
+            (Certificate, 'subject__code__startswith'),
+            (Practical, 'subject__code__startswith'),
+        ):
+            ids = list(model.objects.filter(**{lookup: SEED_PREFIX}).values_list('id', flat=True))
+            for start in range(0, len(ids), 1000):
+                model.objects.filter(id__in=ids[start:start + 1000]).delete()
+        Subject.objects.filter(code__startswith=SEED_PREFIX).delete()
+        CustomUser.objects.filter(username__startswith=SEED_PREFIX).delete()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from portal.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions (and their chunks) older than UPLOAD_EXPIRY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None, help='Age in seconds (default: UPLOAD_EXPIRY)')
+
+    def handle(self, *args, **options):
+        removed = purge_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} upload sessions'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from portal.models import Practical, PracticalSubmission, SearchDocument
+from portal.search import index_practical, index_submission
+
+
+class Command(BaseCommand):
+    help = (
+        'Index practicals and submission reports that are missing from the full-text search index '
+        '(rows created before it existed or by bulk inserts)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-check every row, not only unindexed ones')
+
+    def handle(self, *args, **options):
+        practicals = Practical.objects.all()
+        submissions = PracticalSubmission.objects.select_related('practical', 'student')
+        if not options['all']:
+            practicals = practicals.exclude(
+                id__in=SearchDocument.objects.filter(submission__isnull=True).values('practical_id')
+            )
+            submissions = submissions.filter(search_document__isnull=True)
+
+        indexed = 0
+        for practical in practicals.iterator():
+            index_practical(practical)
+            indexed += 1
+        self.stdout.write(f'Practicals indexed: {indexed}')
+
+        # Unchanged uploads are skipped and identical ones reuse their text
+        indexed = 0
+        for submission in submissions.iterator():
+            index_submission(submission)
+            indexed += 1
+            if indexed % 100 == 0:
+                self.stdout.write(f'  {indexed} submissions...')
+        self.stdout.write(self.style.SUCCESS(f'Submissions indexed: {indexed}'))
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from portal.jobs import work, requeue_stale_jobs
+
+
+class StopFlag:
+    """
+    Minimal stand-in for threading.Event that is safe to set from a signal handler
+    """
+
+    def __init__(self):
+        self.stopped = False
+
+    def set(self):
+        self.stopped = True
+
+    def is_set(self):
+        return self.stopped
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return self.stopped
+
+
+def _process_main(worker_id, poll_interval):
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    # The parent stops each child with SIGTERM; the current job is finished first
+    stop_flag = StopFlag()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_flag.set())
+    work(worker_id, stop_flag, poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 2),
+            help='Number of jobs to run at the same time'
+        )
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Run jobs in threads or in separate processes'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 1.0),
+            help='Seconds to wait when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        use_processes = options['pool'] == 'process'
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        stop_event = threading.Event()
+        if use_processes:
+            # Children must open their own database connections
+            connections.close_all()
+            context = multiprocessing.get_context()
+            workers = [
+                context.Process(target=_process_main, args=(f'{prefix}:p{i}', poll_interval))
+                for i in range(concurrency)
+            ]
+        else:
+            workers = [
+                threading.Thread(target=work, args=(f'{prefix}:t{i}', stop_event, poll_interval), daemon=True)
+                for i in range(concurrency)
+            ]
+
+        # Handlers only flip a flag; setting an Event from a signal handler can
+        # deadlock with the main thread waiting on it.
+        stop_flag = StopFlag()
+        signal.signal(signal.SIGINT, lambda signum, frame: stop_flag.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_flag.set())
+
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {prefix} running {concurrency} {options['pool']}(s)"
+        ))
+
+        # Recover jobs abandoned by crashed workers while the pool runs
+        check_interval = max(getattr(settings, 'JOB_LOCK_TIMEOUT', 600) / 2, poll_interval)
+        last_check = time.monotonic()
+        while not stop_flag.wait(min(poll_interval, 1.0)):
+            if time.monotonic() - last_check >= check_interval:
+                requeue_stale_jobs()
+                last_check = time.monotonic()
+
+        self.stdout.write('Stopping after current jobs finish...')
+        stop_event.set()
+        for worker in workers:
+            if use_processes:
+                worker.terminate()
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from portal.models import CustomUser
+from portal.seeding import SEED_PASSWORD, SEED_PREFIX, seed_portal, clear_seed
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset (users, subjects, submissions, certificates, files) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=1,
+                            help='Departments to fill, taken from CustomUser.DEPARTMENT_CHOICES')
+        parser.add_argument('--students-per-class', type=int, default=60, help='Students in each of the 6 semesters')
+        parser.add_argument('--subjects-per-class', type=int, default=4)
+        parser.add_argument('--practicals', type=int, default=8, help='Practicals per subject')
+        parser.add_argument('--files', type=int, default=20, help='Distinct dummy upload files to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for repeatable datasets')
+        parser.add_argument('--clear', action='store_true', help='Delete the seeded data and exit')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_seed(log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS('Seeded data removed'))
+            return
+
+        if options['departments'] > len(CustomUser.DEPARTMENT_CHOICES):
+            raise CommandError(f'Only {len(CustomUser.DEPARTMENT_CHOICES)} departments are defined')
+        if CustomUser.objects.filter(username__startswith=SEED_PREFIX).exists():
+            raise CommandError('Seeded data already exists; run with --clear first')
+
+        start = time.perf_counter()
+        counts = seed_portal(
+            departments=options['departments'],
+            students_per_class=options['students_per_class'],
+            subjects_per_class=options['subjects_per_class'],
+            practicals_per_subject=options['practicals'],
+            files=options['files'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Seeded {summary} in {time.perf_counter() - start:.1f}s'))
+        self.stdout.write(f"Log in as e.g. {SEED_PREFIX}teacher_0_0_0 / {SEED_PREFIX}student_0_0_0 with password '{SEED_PASSWORD}'")
@@ -0,0 +1,281 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+# name: (type, help, label names)
+METRICS = {
+    'portal_request_duration_seconds': (
+        'histogram', 'Request latency by URL name and user role', ('view', 'role')),
+    'portal_db_queries_total': (
+        'counter', 'Database queries run by requests, by URL name', ('view',)),
+    'portal_file_bytes_served_total': (
+        'counter', 'File bytes sent by the download and file views, by URL name', ('view',)),
+    'portal_upload_bytes_received_total': (
+        'counter', 'Request body bytes of file uploads, by URL name', ('view',)),
+    'portal_certificate_transitions_total': (
+        'counter', 'Certificate status changes, by new status', ('status',)),
+}
+
+# Request bodies of these types carry uploaded files
+UPLOAD_CONTENT_TYPES = ('multipart/form-data', 'application/octet-stream')
+
+# Summed values of exited processes, in METRICS_DIR
+DEAD_PROCESSES_FILE = 'dead.json'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_state = {'dirty': False, 'flushed': 0.0, 'pid': None, 'process_id': ''}
+
+
+def _check_process():
+    """
+    Start from zero in a new process. A worker forked after this module was
+    imported inherits the parent's values and must not report them, or
+    overwrite the parent's file, as its own. Called with _lock held.
+    """
+    pid = os.getpid()
+    if _state['pid'] != pid:
+        _counters.clear()
+        _histograms.clear()
+        _state.update(dirty=False, flushed=0.0, pid=pid, process_id=f'{pid}-{int(time.time())}')
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter of this process"""
+    key = (name, tuple(str(labels[label]) for label in METRICS[name][2]))
+    with _lock:
+        _check_process()
+        _counters[key] = _counters.get(key, 0) + amount
+        _state['dirty'] = True
+
+
+def observe(name, value, **labels):
+    """Record one value in a histogram of this process"""
+    key = (name, tuple(str(labels[label]) for label in METRICS[name][2]))
+    with _lock:
+        _check_process()
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # One count per bucket, then the +Inf count, then the sum
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += value
+        _state['dirty'] = True
+
+
+def get_metrics_dir():
+    """
+    Directory shared by all worker processes, or None for single-process
+    mode where /metrics only reports the process that serves it
+    """
+    path = getattr(settings, 'METRICS_DIR', None)
+    if path:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def snapshot():
+    with _lock:
+        _check_process()
+        _state['dirty'] = False
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()],
+        }
+
+
+def flush():
+    """
+    Write this process's values to its own file in METRICS_DIR. Each
+    process only ever writes its own file, so no locking is needed; the
+    file is replaced atomically so a scrape never reads half of it.
+    """
+    directory = get_metrics_dir()
+    if not directory:
+        return
+    data = snapshot()
+    path = os.path.join(directory, f"{_state['process_id']}.json")
+    with open(path + '.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+    _state['flushed'] = time.monotonic()
+
+
+def maybe_flush():
+    if _state['dirty'] and _state['pid'] == os.getpid() and time.monotonic() - _state['flushed'] >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+        flush()
+
+
+atexit.register(lambda: _state['dirty'] and _state['pid'] == os.getpid() and flush())
+
+
+def merge(snapshots):
+    """Sum snapshots into ({(name, labels): value}, {(name, labels): [values]})"""
+    counters = {}
+    histograms = {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in data['histograms']:
+            key = (name, tuple(labels))
+            total = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                total[i] += value
+    return counters, histograms
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune_dead_processes(directory):
+    """
+    Fold the files of exited processes into one file of their totals and
+    remove them, so counters never go backwards but worker recycling (e.g.
+    gunicorn max_requests) does not grow METRICS_DIR without limit. Only
+    works when every process writing METRICS_DIR runs on this host.
+    """
+    with open(os.path.join(directory, 'prune.lock'), 'w') as lock:
+        # Two scrapes at once must not both fold in the same file
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            pid = os.path.basename(path).split('-')[0]
+            if pid.isdigit() and not process_alive(int(pid)):
+                dead.append(path)
+        if not dead:
+            return
+
+        totals_path = os.path.join(directory, DEAD_PROCESSES_FILE)
+        snapshots = [read_snapshot(path) for path in [totals_path] + dead]
+        counters, histograms = merge(data for data in snapshots if data)
+        with open(totals_path + '.tmp', 'w') as file:
+            json.dump({
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            }, file)
+        os.replace(totals_path + '.tmp', totals_path)
+        for path in dead:
+            os.remove(path)
+
+
+def collect():
+    """
+    Sum the values of every process. Values of processes that have exited
+    are kept in DEAD_PROCESSES_FILE so counters do not go backwards; clear
+    METRICS_DIR on deploy.
+    """
+    directory = get_metrics_dir()
+    if not directory:
+        return merge([snapshot()])
+
+    flush()
+    prune_dead_processes(directory)
+    snapshots = [read_snapshot(path) for path in glob.glob(os.path.join(directory, '*.json'))]
+    return merge(data for data in snapshots if data)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(label_names, labels)} {value}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            # Bucket counts are stored cumulative already
+            for bound, count in zip(LATENCY_BUCKETS, values):
+                lines.append(f'{name}_bucket{format_labels(label_names, labels, [("le", str(bound))])} {count}')
+            lines.append(f'{name}_bucket{format_labels(label_names, labels, [("le", "+Inf")])} {values[-2]}')
+            lines.append(f'{name}_sum{format_labels(label_names, labels)} {values[-1]}')
+            lines.append(f'{name}_count{format_labels(label_names, labels)} {values[-2]}')
+    return '\n'.join(lines) + '\n'
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Record every request's latency (by URL name and role), query count and
+    upload body size
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        queries = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+
+        user = getattr(request, 'user', None)
+        role = (user.role or 'none') if user is not None and user.is_authenticated else 'anonymous'
+        view = view_name(request)
+        observe('portal_request_duration_seconds', time.perf_counter() - start, view=view, role=role)
+        if queries.count:
+            inc('portal_db_queries_total', queries.count, view=view)
+        if request.method in ('POST', 'PUT') and request.content_type in UPLOAD_CONTENT_TYPES:
+            inc('portal_upload_bytes_received_total', int(request.META.get('CONTENT_LENGTH') or 0), view=view)
+        maybe_flush()
+        return response
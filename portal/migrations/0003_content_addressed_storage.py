@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:12
+
+from django.db import migrations, models
+import portal.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='file_path',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=portal.storage.get_content_storage, upload_to='certificates/'),
+        ),
+        migrations.AlterField(
+            model_name='certificatesubmission',
+            name='file_path',
+            field=models.FileField(max_length=255, storage=portal.storage.get_content_storage, upload_to='certificates/'),
+        ),
+        migrations.AlterField(
+            model_name='practicalsubmission',
+            name='file_path',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=portal.storage.get_content_storage, upload_to='practicals/'),
+        ),
+    ]
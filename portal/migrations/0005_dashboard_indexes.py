@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['subject', 'status'], name='certificate_subject_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['status', 'subject'], name='certificate_status_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'department', 'student_class', 'roll_number'], name='user_role_dept_class_roll_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='practicalsubmission',
+            index=models.Index(fields=['practical', 'is_draft'], name='submission_practical_draft_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='practicalsubmission',
+            index=models.Index(fields=['student', 'status'], name='submission_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['department', 'student_class'], name='subject_dept_class_idx'),
+        ),
+    ]
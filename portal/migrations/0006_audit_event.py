@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('action', models.CharField(choices=[('submission_reviewed', 'Submission reviewed'), ('certificate_generated', 'Certificates generated'), ('certificate_transition', 'Certificate status changed'), ('exam_mode_toggled', 'Exam mode toggled'), ('subject_renewed', 'Subject renewed'), ('student_deleted', 'Student deleted')], max_length=30)),
+                ('department', models.CharField(blank=True, max_length=50)),
+                ('object_type', models.CharField(blank=True, max_length=30)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('from_status', models.CharField(blank=True, max_length=30)),
+                ('to_status', models.CharField(blank=True, max_length=30)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='portal.subject')),
+            ],
+        ),
+    ]
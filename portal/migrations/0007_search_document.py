@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Full-text index over title and body. On SQLite an external-content FTS5
+# table mirrors portal_searchdocument through triggers.
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE portal_searchdocument_fts USING fts5("
+    "title, body, content='portal_searchdocument', content_rowid='id')",
+    "CREATE TRIGGER portal_searchdocument_fts_insert AFTER INSERT ON portal_searchdocument BEGIN "
+    "INSERT INTO portal_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER portal_searchdocument_fts_delete AFTER DELETE ON portal_searchdocument BEGIN "
+    "INSERT INTO portal_searchdocument_fts(portal_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER portal_searchdocument_fts_update AFTER UPDATE ON portal_searchdocument BEGIN "
+    "INSERT INTO portal_searchdocument_fts(portal_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO portal_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS portal_searchdocument_fts_insert',
+    'DROP TRIGGER IF EXISTS portal_searchdocument_fts_delete',
+    'DROP TRIGGER IF EXISTS portal_searchdocument_fts_update',
+    'DROP TABLE IF EXISTS portal_searchdocument_fts',
+]
+MYSQL_CREATE = ['ALTER TABLE portal_searchdocument ADD FULLTEXT INDEX searchdocument_fulltext (title, body)']
+MYSQL_DROP = ['ALTER TABLE portal_searchdocument DROP INDEX searchdocument_fulltext']
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0006_audit_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=400)),
+                ('body', models.TextField(blank=True)),
+                ('digest', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('practical', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='portal.practical')),
+                ('submission', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='portal.practicalsubmission')),
+            ],
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_CREATE, 'mysql': MYSQL_CREATE}),
+            run_for_vendor({'sqlite': SQLITE_DROP, 'mysql': MYSQL_DROP}),
+        ),
+    ]
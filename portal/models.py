@@ -1,7 +1,9 @@
+import uuid
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from .storage import get_content_storage
 
 
 # Custom User Manager
@@ -60,6 +62,14 @@ class CustomUser(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Student lookups by class (examiner search, certificate generation)
+            models.Index(fields=['role', 'department', 'student_class', 'roll_number'], name='user_role_dept_class_roll_idx'),
+            # Name prefix search within a class (examiner type-ahead)
+            models.Index(fields=['role', 'department', 'student_class', 'full_name'], name='user_role_dept_class_name_idx'),
+        ]
+
     def clean(self):
         if self.role == 'student':
             if not self.roll_number:
@@ -91,6 +101,11 @@ class Subject(models.Model):
     teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, limit_choices_to={'role': 'teacher'})
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'student_class'], name='subject_dept_class_idx'),
+        ]
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -125,7 +140,7 @@ class PracticalSubmission(models.Model):
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, limit_choices_to={'role': 'student'})
     practical = models.ForeignKey(Practical, on_delete=models.CASCADE)
 
-    file_path = models.FileField(upload_to='practicals/', blank=True, null=True)
+    file_path = models.FileField(upload_to='practicals/', storage=get_content_storage, max_length=255, blank=True, null=True)
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     is_draft = models.BooleanField(default=True)
@@ -138,6 +153,11 @@ class PracticalSubmission(models.Model):
     is_public = models.BooleanField(default=False)
     class Meta:
         unique_together = ['student', 'practical']
+        indexes = [
+            # Teacher dashboard: submitted (non-draft) work per practical
+            models.Index(fields=['practical', 'is_draft'], name='submission_practical_draft_idx'),
+            models.Index(fields=['student', 'status'], name='submission_student_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.is_draft and not self.submitted_at:
@@ -194,7 +214,7 @@ class Certificate(models.Model):
         related_name='examiner_certificates'
     )
 
-    file_path = models.FileField(upload_to='certificates/', blank=True, null=True)
+    file_path = models.FileField(upload_to='certificates/', storage=get_content_storage, max_length=255, blank=True, null=True)
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='draft')
     teacher_feedback = models.TextField(blank=True, null=True)
     hod_feedback = models.TextField(blank=True, null=True)
@@ -208,18 +228,18 @@ class Certificate(models.Model):
 
     class Meta:
         unique_together = ['student', 'subject']
+        indexes = [
+            models.Index(fields=['subject', 'status'], name='certificate_subject_status_idx'),
+            # HOD queue: one status across a department's subjects
+            models.Index(fields=['status', 'subject'], name='certificate_status_subject_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Student can submit only if all practicals approved
-        if self.status == 'submitted_to_teacher' and self.student:
-            all_practicals = Practical.objects.filter(subject=self.subject)
-            approved_count = PracticalSubmission.objects.filter(
-                student=self.student,
-                practical__in=all_practicals,
-                status='approved'
-            ).count()
-
-            if approved_count < all_practicals.count():
+        if self.status == 'submitted_to_teacher' and self.student_id:
+            from .eligibility import student_eligibility
+
+            if not student_eligibility(self.student_id, self.subject).eligible:
                 raise ValidationError("All practicals must be approved before submitting the certificate.")
 
             if not self.submitted_at:
@@ -253,7 +273,7 @@ class CertificateSubmission(models.Model):
 
     certificate = models.ForeignKey('Certificate', on_delete=models.CASCADE)
     student = models.ForeignKey('CustomUser', on_delete=models.CASCADE)
-    file_path = models.FileField(upload_to='certificates/')
+    file_path = models.FileField(upload_to='certificates/', storage=get_content_storage, max_length=255)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     submitted_at = models.DateTimeField(default=timezone.now)
     teacher_feedback = models.TextField(blank=True, null=True)
@@ -277,3 +297,144 @@ class ExamMode(models.Model):
 
     def __str__(self):
         return f"{self.department} - {'Enabled' if self.is_enabled else 'Disabled'}"
+
+
+# Content-addressed upload blob (see storage.ContentAddressedStorage)
+class StoredBlob(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.ref_count} refs)"
+
+
+# Resumable upload of a practical submission file, sent in chunks
+class ChunkedUpload(models.Model):
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('assembling', 'Assembling'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='chunked_uploads')
+    submission = models.ForeignKey(PracticalSubmission, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    checksum = models.CharField(max_length=64, blank=True)  # optional SHA-256 of the whole file
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+
+# Background Job Model
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, blank=True, null=True, related_name='jobs')
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    progress = models.PositiveSmallIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# Append-only record of who did what (see portal/audit.py). The user and
+# subject columns are plain references without constraints, so events outlive
+# deleted students and renewed subjects and a delete never rewrites history.
+# Their indexes also serve the newest-first timelines: index entries for one
+# id are stored in primary key order on SQLite and InnoDB.
+class AuditEvent(models.Model):
+    ACTION_CHOICES = [
+        ('submission_reviewed', 'Submission reviewed'),
+        ('certificate_generated', 'Certificates generated'),
+        ('certificate_transition', 'Certificate status changed'),
+        ('exam_mode_toggled', 'Exam mode toggled'),
+        ('subject_renewed', 'Subject renewed'),
+        ('student_deleted', 'Student deleted'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    action = models.CharField(max_length=30, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True, related_name='+'
+    )
+    student = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True, related_name='+'
+    )
+    subject = models.ForeignKey(
+        Subject, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True, related_name='+'
+    )
+    department = models.CharField(max_length=50, blank=True)
+    object_type = models.CharField(max_length=30, blank=True)
+    object_id = models.PositiveIntegerField(blank=True, null=True)
+    from_status = models.CharField(max_length=30, blank=True)
+    to_status = models.CharField(max_length=30, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Audit events cannot be changed')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Audit events cannot be deleted')
+
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.object_id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
+# Searchable text of a practical (submission empty) or of one submission's
+# upload (see portal/search.py). The full-text index over title and body is
+# created in the migration: FULLTEXT on MySQL, an FTS5 table on SQLite.
+class SearchDocument(models.Model):
+    practical = models.ForeignKey(Practical, on_delete=models.CASCADE, related_name='search_documents')
+    submission = models.OneToOneField(
+        PracticalSubmission, on_delete=models.CASCADE, blank=True, null=True, related_name='search_document'
+    )
+    title = models.CharField(max_length=400)
+    body = models.TextField(blank=True)
+    digest = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the extracted upload
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,51 @@
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+def encode_cursor(value, pk):
+    """
+    Opaque cursor for the row a page ended on
+    """
+    text = f"{value.isoformat() if value else ''}|{pk}"
+    return urlsafe_base64_encode(text.encode())
+
+
+def decode_cursor(cursor):
+    """
+    Return (datetime or None, pk) from a cursor; ValueError if malformed
+    """
+    try:
+        value, pk = urlsafe_base64_decode(cursor).decode().split('|')
+        return (parse_datetime(value) if value else None), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(queryset, field, cursor=None, page_size=25):
+    """
+    One page of `queryset`, newest `field` first with id as tie-breaker and
+    NULLs last. Instead of OFFSET, the next page starts after the cursor
+    row, so every page costs the same however deep the client goes.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(F(field).desc(nulls_last=True), '-pk')
+
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        if value is None:
+            queryset = queryset.filter(**{f'{field}__isnull': True, 'pk__lt': pk})
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) |
+                Q(**{field: value, 'pk__lt': pk}) |
+                Q(**{f'{field}__isnull': True})
+            )
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.pk)
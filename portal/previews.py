@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from .storage import parse_blob_name
+from .utils import get_file_extension
+
+PREVIEWABLE_EXTENSIONS = ['.pdf', '.docx']
+
+PREVIEW_PDF = 'document.pdf'
+META_FILE = 'meta.json'
+
+# Page geometry for the built-in DOCX renderer (A4 at 100 dpi)
+PAGE_SIZE = (827, 1169)
+PAGE_MARGIN = 70
+PAGE_DPI = 100
+# Pages the built-in renderer holds in memory before writing them to the PDF
+PDF_BATCH_PAGES = 10
+
+Preview = namedtuple('Preview', ['digest', 'directory', 'pdf_path', 'thumbnails'])
+
+
+def get_cache_dir():
+    return str(getattr(settings, 'PREVIEW_CACHE_DIR', os.path.join(settings.BASE_DIR, 'preview_cache')))
+
+
+def is_previewable(file_path):
+    """
+    Check if a preview can be rendered for this file
+    """
+    return get_file_extension(file_path) in PREVIEWABLE_EXTENSIONS
+
+
+def file_digest(field_file):
+    """
+    SHA-256 of a stored file. Content-addressed names already carry it;
+    other files are hashed once and memoised on path, mtime and size.
+    """
+    parsed = parse_blob_name(field_file.name)
+    if parsed:
+        return parsed[0]
+
+    stat = os.stat(field_file.path)
+    key = f'preview-digest:{field_file.path}:{stat.st_mtime_ns}:{stat.st_size}'
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(field_file.path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+def preview_dir(digest):
+    return os.path.join(get_cache_dir(), digest[:2], digest)
+
+
+def load_preview(digest):
+    """
+    Return the cached Preview for a content hash, or None if not rendered yet
+    """
+    directory = preview_dir(digest)
+    meta_path = os.path.join(directory, META_FILE)
+    try:
+        with open(meta_path) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    # Access time for LRU eviction
+    os.utime(meta_path)
+    return Preview(digest, directory, os.path.join(directory, PREVIEW_PDF), meta.get('thumbnails', []))
+
+
+def get_preview(field_file):
+    """
+    Return the cached Preview for an uploaded file, or None
+    """
+    if not field_file or not is_previewable(field_file.name) or not os.path.exists(field_file.path):
+        return None
+    return load_preview(file_digest(field_file))
+
+
+def build_preview(field_file):
+    """
+    Render an upload into a PDF and page thumbnails and store them in the
+    cache under the file's content hash. Identical uploads share one entry.
+    """
+    digest = file_digest(field_file)
+    preview = load_preview(digest)
+    if preview:
+        return preview
+
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='.build-', dir=get_cache_dir())
+    try:
+        pdf_path = os.path.join(work_dir, PREVIEW_PDF)
+        extension = get_file_extension(field_file.name)
+
+        thumbnails = None
+        if extension == '.pdf':
+            shutil.copyfile(field_file.path, pdf_path)
+        else:
+            thumbnails = convert_docx(field_file.path, pdf_path)
+        if thumbnails is None:
+            thumbnails = write_thumbnails(work_dir, pdf_path)
+
+        with open(os.path.join(work_dir, META_FILE), 'w') as file:
+            json.dump({'source': field_file.name, 'thumbnails': thumbnails, 'created': time.time()}, file)
+
+        directory = preview_dir(digest)
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        try:
+            os.rename(work_dir, directory)
+        except OSError:
+            # Another worker finished the same file first
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    maybe_evict_previews()
+    return load_preview(digest)
+
+
+def convert_docx(source_path, pdf_path):
+    """
+    Convert a DOCX to PDF. LibreOffice is used when installed; otherwise the
+    text is laid out with python-docx and Pillow, and the page thumbnails
+    are written on the way. Returns their file names for the Pillow
+    renderer, or None.
+    """
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if soffice:
+        out_dir = os.path.dirname(pdf_path)
+        subprocess.run(
+            [soffice, '--headless', '--convert-to', 'pdf', '--outdir', out_dir, source_path],
+            check=True, capture_output=True, timeout=getattr(settings, 'PREVIEW_CONVERT_TIMEOUT', 120)
+        )
+        converted = os.path.join(out_dir, os.path.splitext(os.path.basename(source_path))[0] + '.pdf')
+        os.replace(converted, pdf_path)
+        return None
+
+    # Pages are written PDF_BATCH_PAGES at a time, so memory use does not
+    # grow with the length of the document
+    directory = os.path.dirname(pdf_path)
+    limit = getattr(settings, 'PREVIEW_MAX_THUMBNAILS', 20)
+    thumbnails = []
+    batch = []
+    for number, page in enumerate(render_docx_pages(source_path), start=1):
+        if number <= limit:
+            thumbnails.append(save_thumbnail(page, directory, number))
+        batch.append(page)
+        if len(batch) == PDF_BATCH_PAGES:
+            write_pdf_pages(pdf_path, batch)
+            batch = []
+    if batch:
+        write_pdf_pages(pdf_path, batch)
+    return thumbnails
+
+
+def write_pdf_pages(pdf_path, pages):
+    """Write page images to a new PDF, or append them to the one begun"""
+    pages[0].save(
+        pdf_path, save_all=True, append_images=pages[1:], append=os.path.exists(pdf_path), resolution=PAGE_DPI
+    )
+
+
+def docx_blocks(document):
+    """
+    Yield (style, text) for paragraphs and table rows in document order
+    """
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    for child in document.element.body.iterchildren():
+        if child.tag.endswith('}p'):
+            paragraph = Paragraph(child, document)
+            yield paragraph.style.name if paragraph.style is not None else '', paragraph.text
+        elif child.tag.endswith('}tbl'):
+            for row in Table(child, document).rows:
+                yield 'Table', ' | '.join(cell.text.strip() for cell in row.cells)
+
+
+def render_docx_pages(source_path):
+    """
+    Lay out a DOCX's text on A4 page images, yielding each page once it is
+    full. Rendering stops after PREVIEW_MAX_PAGES pages, with a note on the
+    last one.
+    """
+    from docx import Document
+    from PIL import Image, ImageDraw, ImageFont
+
+    fonts = {
+        'heading': ImageFont.load_default(size=22),
+        'body': ImageFont.load_default(size=14),
+    }
+    width = PAGE_SIZE[0] - 2 * PAGE_MARGIN
+    max_pages = getattr(settings, 'PREVIEW_MAX_PAGES', 100)
+
+    # Greyscale: a third of the memory of RGB for black text on white
+    page = Image.new('L', PAGE_SIZE, 'white')
+    draw, y, count = ImageDraw.Draw(page), PAGE_MARGIN, 1
+    for style, text in docx_blocks(Document(source_path)):
+        font = fonts['heading'] if style.startswith(('Heading', 'Title')) else fonts['body']
+        line_height = int(font.size * 1.5)
+
+        for line in wrap_text(draw, text, font, width) or ['']:
+            if y + line_height > PAGE_SIZE[1] - PAGE_MARGIN:
+                if count == max_pages:
+                    draw.text((PAGE_MARGIN, y), f'Preview limited to {max_pages} pages.',
+                              fill='black', font=fonts['body'])
+                    yield page
+                    return
+                yield page
+                page = Image.new('L', PAGE_SIZE, 'white')
+                draw, y, count = ImageDraw.Draw(page), PAGE_MARGIN, count + 1
+            draw.text((PAGE_MARGIN, y), line, fill='black', font=font)
+            y += line_height
+        y += line_height // 2
+
+    yield page
+
+
+def wrap_text(draw, text, font, width):
+    lines = []
+    for raw_line in text.splitlines():
+        line = ''
+        for word in raw_line.split():
+            candidate = f'{line} {word}'.strip()
+            if line and draw.textlength(candidate, font=font) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def write_thumbnails(directory, pdf_path):
+    """
+    Write page thumbnails (PNG) of a PDF and return their file names. PDFs
+    are rasterised with pdftoppm when it is installed; without it, only
+    documents rendered by the built-in renderer get thumbnails.
+    """
+    width = getattr(settings, 'PREVIEW_THUMBNAIL_WIDTH', 200)
+    limit = getattr(settings, 'PREVIEW_MAX_THUMBNAILS', 20)
+
+    pdftoppm = shutil.which('pdftoppm')
+    if not pdftoppm:
+        return []
+    subprocess.run(
+        [pdftoppm, '-png', '-scale-to-x', str(width), '-scale-to-y', '-1',
+         '-l', str(limit), pdf_path, os.path.join(directory, 'thumb')],
+        check=True, capture_output=True, timeout=getattr(settings, 'PREVIEW_CONVERT_TIMEOUT', 120)
+    )
+    return sorted(name for name in os.listdir(directory) if name.startswith('thumb'))
+
+
+def save_thumbnail(page, directory, number):
+    """Write a thumbnail of one rendered page image and return its file name"""
+    width = getattr(settings, 'PREVIEW_THUMBNAIL_WIDTH', 200)
+    thumbnail = page.copy()
+    thumbnail.thumbnail((width, width * 2))
+    name = f'thumb-{number}.png'
+    thumbnail.save(os.path.join(directory, name))
+    return name
+
+
+def directory_size(directory):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def maybe_evict_previews():
+    """
+    Run evict_previews at most once per PREVIEW_EVICT_INTERVAL seconds
+    across all processes, rather than walking the cache after every build
+    """
+    if cache.add('previews:evicted', True, getattr(settings, 'PREVIEW_EVICT_INTERVAL', 600)):
+        return evict_previews()
+    return 0
+
+
+def evict_previews(max_bytes=None):
+    """
+    Delete least recently viewed previews until the cache fits in
+    PREVIEW_CACHE_MAX_BYTES. Returns the number of entries removed.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'PREVIEW_CACHE_MAX_BYTES', 1024 * 1024 * 1024)
+
+    root = get_cache_dir()
+    entries = []
+    for prefix in os.listdir(root) if os.path.isdir(root) else []:
+        prefix_dir = os.path.join(root, prefix)
+        if prefix.startswith('.') or not os.path.isdir(prefix_dir):
+            continue
+        for digest in os.listdir(prefix_dir):
+            directory = os.path.join(prefix_dir, digest)
+            meta_path = os.path.join(directory, META_FILE)
+            last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+            entries.append((last_used, directory, directory_size(directory)))
+
+    total = sum(size for _, _, size in entries)
+    removed = 0
+    for _, directory, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
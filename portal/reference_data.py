@@ -0,0 +1,53 @@
+import hashlib
+import json
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+def version_key(name):
+    return f'refdata:{name}:version'
+
+
+def cached_payload(name, variant, loader):
+    """
+    (json_bytes, etag) for one variant of a reference data set, e.g.
+    ('subjects', 'computer_science'). Entries are keyed on the set's
+    version, so invalidate_reference_data(name) retires every variant at
+    once; the loader only runs after a change or on expiry.
+    """
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), uuid.uuid4().hex, None)
+        version = cache.get(version_key(name))
+
+    key = f'refdata:{name}:{version}:{variant}'
+    entry = cache.get(key)
+    if entry is None:
+        content = json.dumps(loader(), cls=DjangoJSONEncoder).encode()
+        entry = (content, quote_etag(hashlib.md5(content).hexdigest()))
+        cache.set(key, entry, getattr(settings, 'REFERENCE_DATA_TIMEOUT', 24 * 60 * 60))
+    return entry
+
+
+def invalidate_reference_data(*names):
+    """New version for each set; the old entries are never read again and expire"""
+    for name in names:
+        cache.set(version_key(name), uuid.uuid4().hex, None)
+
+
+def reference_data_response(request, name, variant, loader):
+    """
+    JSON response for a reference data endpoint with an ETag, so a browser
+    revalidating after REFERENCE_DATA_MAX_AGE gets a 304 without a query
+    """
+    content, etag = cached_payload(name, variant, loader)
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    # Private: the endpoints sit behind a login, so shared caches must not keep them
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'REFERENCE_DATA_MAX_AGE', 60))
+    return get_conditional_response(request, etag=etag, response=response)
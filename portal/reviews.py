@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import PracticalSubmission
+from . import audit
+
+# Review action -> resulting submission status
+REVIEW_ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+
+def bulk_review(teacher, submission_ids, action, feedback='', item_feedback=None):
+    """
+    Approve or reject many of a teacher's submitted practicals with one
+    UPDATE inside a transaction. `feedback` goes to every submission unless
+    `item_feedback` ({submission_id: text}) has its own. Approving keeps the
+    approved_at of submissions that were already approved and stamps the
+    rest; rejecting clears it.
+
+    Returns (updated_ids, skipped_ids); drafts and other teachers'
+    submissions are skipped. Each change is recorded in the audit log.
+    """
+    status = REVIEW_ACTIONS[action]
+    item_feedback = item_feedback or {}
+    requested = set(submission_ids)
+
+    with transaction.atomic():
+        submissions = PracticalSubmission.objects.filter(
+            id__in=requested, practical__teacher=teacher, is_draft=False
+        )
+        rows = list(submissions.values_list(
+            'id', 'status', 'student_id', 'practical__subject_id', 'practical__subject__department'
+        ))
+        ids = {row[0] for row in rows}
+        if not ids:
+            return [], sorted(requested)
+
+        if status == 'approved':
+            approved_at = Case(
+                When(status='approved', approved_at__isnull=False, then=F('approved_at')),
+                default=Value(timezone.now()),
+            )
+        else:
+            approved_at = Value(None)
+
+        whens = [When(pk=pk, then=Value(text)) for pk, text in item_feedback.items() if pk in ids]
+        feedback_value = Case(*whens, default=Value(feedback)) if whens else Value(feedback)
+
+        PracticalSubmission.objects.filter(id__in=ids).update(
+            status=status, approved_at=approved_at, feedback=feedback_value
+        )
+        for pk, previous, student_id, subject_id, department in rows:
+            audit.record(
+                'submission_reviewed', actor=teacher, student=student_id, subject=subject_id,
+                department=department, target=PracticalSubmission(pk=pk),
+                from_status=previous, to_status=status, bulk=True
+            )
+
+    return sorted(ids), sorted(requested - ids)
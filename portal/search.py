@@ -0,0 +1,214 @@
+import os
+import re
+import shutil
+import subprocess
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from .jobs import enqueue
+from .models import Job, SearchDocument
+from .previews import docx_blocks, file_digest
+from .utils import get_file_extension
+
+FTS_TABLE = 'portal_searchdocument_fts'
+MYSQL_MATCH = (
+    'MATCH (portal_searchdocument.title, portal_searchdocument.body) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+)
+
+SNIPPET_CHARS = 160
+
+
+# ---------- Indexing ----------
+
+def extract_text(field_file):
+    """
+    Plain text of an uploaded DOCX or PDF, or '' for other files. PDFs need
+    pdftotext (poppler-utils); without it they are indexed by title only.
+    """
+    extension = get_file_extension(field_file.name)
+    if extension == '.docx':
+        from docx import Document
+
+        text = '\n'.join(text for _, text in docx_blocks(Document(field_file.path)) if text)
+    elif extension == '.pdf':
+        pdftotext = shutil.which('pdftotext')
+        if not pdftotext:
+            return ''
+        result = subprocess.run(
+            [pdftotext, '-enc', 'UTF-8', '-q', field_file.path, '-'],
+            capture_output=True, timeout=getattr(settings, 'SEARCH_EXTRACT_TIMEOUT', 60)
+        )
+        text = result.stdout.decode('utf-8', 'replace')
+    else:
+        return ''
+    return text[:getattr(settings, 'SEARCH_MAX_TEXT_CHARS', 100000)]
+
+
+def submission_title(submission):
+    student = submission.student
+    return f'{submission.practical.title} {student.full_name} {student.username}'
+
+
+def index_practical(practical):
+    """
+    Keep the practical's own document (title and description) current and
+    retitle its submissions' documents when the practical is renamed
+    """
+    document = SearchDocument.objects.filter(practical=practical, submission__isnull=True).first()
+    if document is None:
+        SearchDocument.objects.create(practical=practical, title=practical.title, body=practical.description)
+        return
+    if (document.title, document.body) == (practical.title, practical.description):
+        return
+
+    renamed = document.title != practical.title
+    document.title, document.body = practical.title, practical.description
+    document.save(update_fields=['title', 'body', 'indexed_at'])
+    if renamed:
+        documents = list(
+            SearchDocument.objects.filter(practical=practical, submission__isnull=False)
+            .select_related('submission__student', 'submission__practical')
+        )
+        for document in documents:
+            document.title = submission_title(document.submission)
+        SearchDocument.objects.bulk_update(documents, ['title'])
+
+
+def index_submission(submission):
+    """
+    Index a submission's upload. Text is extracted once per file content:
+    an unchanged upload is skipped and an identical one reuses the text.
+    """
+    field_file = submission.file_path
+    digest = ''
+    if field_file and os.path.exists(field_file.path):
+        digest = file_digest(field_file)
+
+    document = SearchDocument.objects.filter(submission=submission).first()
+    title = submission_title(submission)
+    if document is not None and document.digest == digest:
+        if document.title != title:
+            document.title = title
+            document.save(update_fields=['title', 'indexed_at'])
+        return document
+
+    body = ''
+    if digest:
+        body = SearchDocument.objects.filter(digest=digest).values_list('body', flat=True).first()
+        if body is None:
+            body = extract_text(field_file)
+
+    document, _ = SearchDocument.objects.update_or_create(
+        submission=submission,
+        defaults={'practical_id': submission.practical_id, 'title': title, 'body': body, 'digest': digest},
+    )
+    return document
+
+
+def request_index(submission_id):
+    """Queue text extraction for a submission unless it is already pending"""
+    payload = {'submission_id': submission_id}
+    if Job.objects.filter(name='search.index', payload=payload, status='queued').exists():
+        return None
+    return enqueue('search.index', payload)
+
+
+# ---------- Searching ----------
+
+def search_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def fts5_query(terms):
+    # Every term must match; quoting keeps FTS5 syntax out of user input
+    return ' '.join('"%s"' % term for term in terms)
+
+
+def matching(query):
+    """
+    SearchDocuments matching `query`, selected by id through the full-text
+    index so the queryset also works as a subquery (e.g. in the admin)
+    """
+    terms = search_terms(query)
+    if not terms:
+        return SearchDocument.objects.none()
+    if connection.vendor == 'sqlite':
+        ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts5_query(terms)])
+    elif connection.vendor == 'mysql':
+        ids = RawSQL(f'SELECT id FROM portal_searchdocument WHERE {MYSQL_MATCH}', [query])
+    else:
+        # No full-text index on other databases
+        documents = SearchDocument.objects.all()
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        return documents
+    return SearchDocument.objects.filter(id__in=ids)
+
+
+def ranked(query):
+    """
+    SearchDocuments matching `query` with a `rank` (higher is better) from
+    the full-text index, for use as the outer query
+    """
+    terms = search_terms(query)
+    if not terms:
+        return SearchDocument.objects.none()
+    if connection.vendor == 'sqlite':
+        return SearchDocument.objects.extra(
+            select={'rank': f'-bm25({FTS_TABLE}, 5.0, 1.0)'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE} MATCH %s', f'{FTS_TABLE}.rowid = portal_searchdocument.id'],
+            params=[fts5_query(terms)],
+        )
+    if connection.vendor == 'mysql':
+        return SearchDocument.objects.extra(
+            select={'rank': MYSQL_MATCH}, select_params=[query], where=[MYSQL_MATCH], params=[query]
+        )
+    return matching(query).extra(select={'rank': '0'})
+
+
+def scope(documents, user):
+    """Teachers search their own practicals, HODs and examiners their department"""
+    documents = documents.filter(Q(submission__isnull=True) | Q(submission__is_draft=False))
+    if user.role == 'teacher':
+        return documents.filter(practical__teacher=user)
+    return documents.filter(practical__subject__department=user.department)
+
+
+def search_documents(query, user, limit=20, offset=0):
+    documents = scope(ranked(query), user).select_related('practical__subject', 'submission__student')
+    return list(documents.order_by('-rank', '-id')[offset:offset + limit])
+
+
+def snippet(text, terms, width=SNIPPET_CHARS):
+    """A window of `text` around the first term found"""
+    text = ' '.join(text.split())
+    found = [match.start() for term in terms for match in [re.search(re.escape(term), text, re.IGNORECASE)] if match]
+    start = max(0, min(found) - width // 3) if found else 0
+    excerpt = text[start:start + width]
+    return ('…' if start else '') + excerpt + ('…' if start + width < len(text) else '')
+
+
+def result_json(document, query):
+    practical = document.practical
+    result = {
+        'rank': round(float(document.rank), 4),
+        'practical_id': practical.id,
+        'practical': f'P{practical.number}: {practical.title}',
+        'subject': practical.subject.name,
+        'snippet': snippet(document.body, search_terms(query)),
+    }
+    if document.submission_id:
+        submission = document.submission
+        result.update({
+            'type': 'submission',
+            'submission_id': submission.id,
+            'student': submission.student.full_name,
+            'status': submission.status,
+            'url': reverse('view_practical_submission', args=[submission.id]),
+        })
+    else:
+        result.update({'type': 'practical', 'url': reverse('practical_detail', args=[practical.id])})
+    return result
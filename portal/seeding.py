@@ -0,0 +1,263 @@
+import io
+import random
+from collections import Counter
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from .models import (CustomUser, Subject, Practical, PracticalSubmission, Certificate,
+                     CertificateSubmission, ExamMode)
+from .storage import content_storage
+
+SEED_PREFIX = 'seed_'
+SEED_PASSWORD = 'seed-password'
+BATCH_SIZE = 1000
+
+# Share of submissions per state; the rest of the practicals are not started
+SUBMISSION_STATES = [('draft', 0.10), ('submitted', 0.30), ('approved', 0.35), ('rejected', 0.10)]
+
+CERTIFICATE_STAGES = ['generated', 'submitted_to_teacher', 'sent_to_hod', 'sent_to_examiner', 'certified', 'rejected']
+# Status of the student's upload at each certificate stage
+CERTIFICATE_SUBMISSION_STATUS = {
+    'submitted_to_teacher': 'pending',
+    'sent_to_hod': 'sent_to_hod',
+    'sent_to_examiner': 'sent_to_hod',
+    'certified': 'certified',
+    'rejected': 'rejected',
+}
+
+LOREM = (
+    'Aim: study and implement the given algorithm. Apparatus: computer system, compiler. '
+    'Theory: the procedure is explained step by step with its time and space complexity. '
+    'Conclusion: the program was executed successfully and the output was verified.'
+).split()
+
+
+def dummy_pdf(rng, pages):
+    """A small multi-page PDF with report-like text"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    for page in range(pages):
+        image = Image.new('RGB', (595, 842), 'white')
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            draw.text((50, 50 + line * 18), ' '.join(rng.choices(LOREM, k=10)), fill='black')
+        images.append(image)
+    output = io.BytesIO()
+    images[0].save(output, 'PDF', save_all=True, append_images=images[1:])
+    return output.getvalue()
+
+
+def dummy_docx(rng, pages):
+    from docx import Document
+
+    document = Document()
+    document.add_heading('Practical Report', 1)
+    for paragraph in range(pages * 12):
+        document.add_paragraph(' '.join(rng.choices(LOREM, k=40)))
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def create_file_pool(rng, folder, count):
+    """
+    Store `count` distinct documents and return their FileField names.
+    Rows share these files, as identical uploads do in blob storage.
+    """
+    names = []
+    for number in range(count):
+        pages = rng.randint(1, 5)
+        if number % 2:
+            content, extension = dummy_docx(rng, pages), '.docx'
+        else:
+            content, extension = dummy_pdf(rng, pages), '.pdf'
+        names.append(content_storage.save(f'{folder}/{SEED_PREFIX}{number}{extension}', ContentFile(content)))
+    return names
+
+
+def seed_portal(departments=1, students_per_class=60, subjects_per_class=4, practicals_per_subject=8,
+                files=20, seed=42, log=print):
+    """
+    Generate a realistic dataset: per department a HOD, an examiner, one
+    teacher per subject and students in every semester, with submissions
+    in every status and certificates at every workflow stage. Rows are
+    written with bulk_create in batches. Returns row counts.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(SEED_PASSWORD)
+    classes = [value for value, _ in CustomUser.CLASS_CHOICES]
+    # CustomUser.save() validates choices, so only real departments can be used
+    department_names = [value for value, _ in CustomUser.DEPARTMENT_CHOICES][:departments]
+
+    log('Writing dummy files...')
+    practical_files = create_file_pool(rng, 'practicals', files)
+    certificate_files = create_file_pool(rng, 'certificates', max(1, files // 4))
+    file_uses = Counter()
+
+    with transaction.atomic():
+        log('Creating users...')
+        users = [CustomUser(username=f'{SEED_PREFIX}admin', full_name='Seed Admin', role='admin', password=password)]
+        for d, department in enumerate(department_names):
+            users.append(CustomUser(username=f'{SEED_PREFIX}hod_{d}', full_name=f'HOD {d}', role='hod',
+                                    department=department, password=password))
+            users.append(CustomUser(username=f'{SEED_PREFIX}examiner_{d}', full_name=f'Examiner {d}',
+                                    role='examiner', department=department, password=password))
+            for c, student_class in enumerate(classes):
+                for n in range(subjects_per_class):
+                    users.append(CustomUser(username=f'{SEED_PREFIX}teacher_{d}_{c}_{n}', full_name=f'Teacher {d}.{c}.{n}',
+                                            role='teacher', department=department, password=password))
+                for i in range(students_per_class):
+                    users.append(CustomUser(username=f'{SEED_PREFIX}student_{d}_{c}_{i}', full_name=f'Student {d}.{c}.{i}',
+                                            role='student', department=department, student_class=student_class,
+                                            roll_number=f'SEED-{d}-{i + 1:04d}', email=f'student_{d}_{c}_{i}@example.com',
+                                            password=password))
+        CustomUser.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        user_ids = dict(CustomUser.objects.filter(username__startswith=SEED_PREFIX).values_list('username', 'id'))
+
+        # Existing exam mode settings are left as they are
+        ExamMode.objects.bulk_create(
+            [ExamMode(department=department, is_enabled=False) for department in department_names],
+            ignore_conflicts=True
+        )
+
+        log('Creating subjects and practicals...')
+        Subject.objects.bulk_create([
+            Subject(name=f'Subject {d}.{c}.{n}', code=f'{SEED_PREFIX}{d}_{c}_{n}', department=department,
+                    student_class=student_class, teacher_id=user_ids[f'{SEED_PREFIX}teacher_{d}_{c}_{n}'])
+            for d, department in enumerate(department_names)
+            for c, student_class in enumerate(classes)
+            for n in range(subjects_per_class)
+        ], batch_size=BATCH_SIZE)
+        subjects = list(Subject.objects.filter(code__startswith=SEED_PREFIX))
+
+        Practical.objects.bulk_create([
+            Practical(number=number, title=f'Practical {number}: {" ".join(rng.choices(LOREM, k=4))}',
+                      description=' '.join(rng.choices(LOREM, k=30)),
+                      deadline=now + timedelta(days=7 * (number - practicals_per_subject // 2)),
+                      subject=subject, teacher_id=subject.teacher_id, is_public=rng.random() < 0.05)
+            for subject in subjects
+            for number in range(1, practicals_per_subject + 1)
+        ], batch_size=BATCH_SIZE)
+        practicals = {}
+        for practical in Practical.objects.filter(subject__in=subjects).only('id', 'subject_id', 'deadline'):
+            practicals.setdefault(practical.subject_id, []).append(practical)
+
+        students = {}
+        for student_id, department, student_class in CustomUser.objects.filter(
+            username__startswith=f'{SEED_PREFIX}student_'
+        ).values_list('id', 'department', 'student_class'):
+            students.setdefault((department, student_class), []).append(student_id)
+
+        log('Creating submissions...')
+        submissions = []
+        submission_count = 0
+        for subject in subjects:
+            for student_id in students[(subject.department, subject.student_class)]:
+                for practical in practicals[subject.id]:
+                    state = pick_state(rng)
+                    if state is None:
+                        continue
+                    file_name = rng.choice(practical_files) if state != 'draft' or rng.random() < 0.5 else None
+                    file_uses[file_name] += 1
+                    submitted_at = None
+                    is_late = False
+                    if state != 'draft':
+                        submitted_at = practical.deadline - timedelta(hours=rng.uniform(-48, 240))
+                        is_late = submitted_at > practical.deadline
+                    submissions.append(PracticalSubmission(
+                        student_id=student_id, practical_id=practical.id, file_path=file_name,
+                        status=state, is_draft=state == 'draft', is_late=is_late, submitted_at=submitted_at,
+                        approved_at=submitted_at + timedelta(days=1) if state == 'approved' else None,
+                        feedback='Resubmit with output screenshots.' if state == 'rejected' else '',
+                    ))
+                if len(submissions) >= BATCH_SIZE * 10:
+                    PracticalSubmission.objects.bulk_create(submissions, batch_size=BATCH_SIZE)
+                    submission_count += len(submissions)
+                    submissions = []
+        PracticalSubmission.objects.bulk_create(submissions, batch_size=BATCH_SIZE)
+        submission_count += len(submissions)
+
+        log('Creating certificates...')
+        certificates = []
+        for subject in subjects:
+            template_file = rng.choice(certificate_files)
+            file_uses[template_file] += 1
+            certificates.append(Certificate(subject=subject, teacher_id=subject.teacher_id,
+                                            status='template_added', file_path=template_file))
+            d = department_names.index(subject.department)
+            for n, student_id in enumerate(students[(subject.department, subject.student_class)]):
+                stage = CERTIFICATE_STAGES[(n + subject.id) % len(CERTIFICATE_STAGES)]
+                stage_index = CERTIFICATE_STAGES.index(stage)
+                file_uses[template_file] += 1
+                certificates.append(Certificate(
+                    student_id=student_id, subject=subject, teacher_id=subject.teacher_id,
+                    hod_id=user_ids[f'{SEED_PREFIX}hod_{d}'] if stage_index >= 3 else None,
+                    examiner_id=user_ids[f'{SEED_PREFIX}examiner_{d}'] if stage == 'certified' else None,
+                    status=stage, file_path=template_file,
+                    submitted_at=now - timedelta(days=rng.randint(1, 30)) if stage_index >= 1 else None,
+                    certified_at=now if stage == 'certified' else None,
+                ))
+        Certificate.objects.bulk_create(certificates, batch_size=BATCH_SIZE)
+
+        certificate_submissions = []
+        for certificate_id, student_id, status in Certificate.objects.filter(
+            subject__in=subjects, status__in=list(CERTIFICATE_SUBMISSION_STATUS)
+        ).values_list('id', 'student_id', 'status'):
+            file_name = rng.choice(certificate_files)
+            file_uses[file_name] += 1
+            certificate_submissions.append(CertificateSubmission(
+                certificate_id=certificate_id, student_id=student_id, file_path=file_name,
+                status=CERTIFICATE_SUBMISSION_STATUS[status],
+                submitted_at=now - timedelta(days=rng.randint(1, 30)),
+            ))
+        CertificateSubmission.objects.bulk_create(certificate_submissions, batch_size=BATCH_SIZE)
+
+    # Each pool file was saved once; record one reference per row instead
+    for name in practical_files + certificate_files:
+        if file_uses[name]:
+            content_storage.add_references(name, file_uses[name] - 1)
+        else:
+            content_storage.delete(name)
+
+    return {
+        'users': len(users),
+        'subjects': len(subjects),
+        'practicals': sum(len(items) for items in practicals.values()),
+        'submissions': submission_count,
+        'certificates': len(certificates),
+        'certificate_submissions': len(certificate_submissions),
+        'files': len(practical_files) + len(certificate_files),
+    }
+
+
+def pick_state(rng):
+    roll = rng.random()
+    for state, share in SUBMISSION_STATES:
+        if roll < share:
+            return state
+        roll -= share
+    return None
+
+
+def clear_seed(log=print):
+    """
+    Delete everything seed_portal created. Files are released through the
+    model signals as the rows go.
+    """
+    subjects = Subject.objects.filter(code__startswith=SEED_PREFIX)
+    for model, lookup in (
+        (CertificateSubmission, 'certificate__subject__in'),
+        (Certificate, 'subject__in'),
+        (PracticalSubmission, 'practical__subject__in'),
+    ):
+        ids = list(model.objects.filter(**{lookup: subjects}).values_list('id', flat=True))
+        log(f'Deleting {len(ids)} {model._meta.verbose_name_plural}...')
+        for start in range(0, len(ids), BATCH_SIZE):
+            model.objects.filter(id__in=ids[start:start + BATCH_SIZE]).delete()
+    Practical.objects.filter(subject__in=subjects).delete()
+    subjects.delete()
+    CustomUser.objects.filter(username__startswith=SEED_PREFIX).delete()
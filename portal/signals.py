@@ -0,0 +1,176 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, post_init
+from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, CertificateSubmission, ExamMode
+from .exam_mode import invalidate_exam_mode
+from .search import index_practical, request_index
+from .reference_data import invalidate_reference_data
+from .stats import invalidate_stats
+from . import metrics
+from .storage import parse_blob_name
+
+STORED_FILE_MODELS = (PracticalSubmission, Certificate, CertificateSubmission)
+
+
+def release_file(name, storage):
+    """
+    Drop a row's reference to a content-addressed upload once the change
+    has committed; a rollback keeps the row and so must keep its file
+    """
+    if name and parse_blob_name(name):
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def release_replaced_file(sender, instance, **kwargs):
+    """When a new upload replaces an old one, release the old blob"""
+    if instance._state.adding or not instance.pk:
+        return
+    # Only a freshly assigned upload is uncommitted, so ordinary saves cost no query
+    if not instance.file_path or instance.file_path._committed:
+        return
+    old_name = sender.objects.filter(pk=instance.pk).values_list('file_path', flat=True).first()
+    if old_name:
+        release_file(old_name, instance.file_path.storage)
+
+
+def release_deleted_file(sender, instance, **kwargs):
+    if instance.file_path:
+        release_file(instance.file_path.name, instance.file_path.storage)
+
+
+for model in STORED_FILE_MODELS:
+    pre_save.connect(release_replaced_file, sender=model)
+    post_delete.connect(release_deleted_file, sender=model)
+
+
+# Dashboard statistics (see stats.py)
+
+def remember_department(sender, instance, update_fields=None, **kwargs):
+    """Note the stored department so a move invalidates both departments"""
+    instance._previous_department = None
+    if instance.pk and (update_fields is None or 'department' in update_fields):
+        instance._previous_department = sender.objects.filter(pk=instance.pk).values_list(
+            'department', flat=True
+        ).first()
+
+
+def invalidate_stats_on_commit(*departments):
+    """
+    Clear the totals once the change commits; cleared earlier, another
+    process could cache the old totals again before then
+    """
+    transaction.on_commit(lambda: invalidate_stats(*departments))
+
+
+def invalidate_department_stats(sender, instance, update_fields=None, **kwargs):
+    # Logins save only last_login; they cannot change any totals
+    if update_fields is not None and not {'role', 'department'} & set(update_fields):
+        return
+    invalidate_stats_on_commit(instance.department, getattr(instance, '_previous_department', None))
+
+
+def remember_submission_draft(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred field is not loaded
+    instance._loaded_is_draft = instance.__dict__.get('is_draft')
+
+
+def submission_stats_changed(sender, instance, created=False, **kwargs):
+    # Only submitted (non-draft) rows are counted, so draft autosaves clear nothing
+    loaded = True if created else instance._loaded_is_draft
+    if instance.is_draft != loaded:
+        invalidate_stats_on_commit()
+    instance._loaded_is_draft = instance.is_draft
+
+
+def submission_stats_deleted(sender, instance, **kwargs):
+    if not instance.is_draft:
+        invalidate_stats_on_commit()
+
+
+def invalidate_certificate_stats(sender, instance, created=False, **kwargs):
+    # Certificates only count towards the totals while they wait for the HOD,
+    # so cascade deletes of other certificates cost no query
+    if 'sent_to_hod' not in (instance.status, None if created else instance._loaded_status):
+        return
+    field = Certificate._meta.get_field('subject')
+    if field.is_cached(instance):
+        department = field.get_cached_value(instance).department
+    else:
+        department = Subject.objects.filter(pk=instance.subject_id).values_list('department', flat=True).first()
+    invalidate_stats_on_commit(department)
+
+
+for model in (CustomUser, Subject):
+    pre_save.connect(remember_department, sender=model)
+    post_save.connect(invalidate_department_stats, sender=model)
+    post_delete.connect(invalidate_department_stats, sender=model)
+post_init.connect(remember_submission_draft, sender=PracticalSubmission)
+post_save.connect(submission_stats_changed, sender=PracticalSubmission)
+post_delete.connect(submission_stats_deleted, sender=PracticalSubmission)
+post_save.connect(invalidate_certificate_stats, sender=Certificate)
+post_delete.connect(invalidate_certificate_stats, sender=Certificate)
+
+
+# Certificate workflow metrics (see metrics.py)
+
+def remember_certificate_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status field is not loaded
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+def count_certificate_transition(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if created or instance.status != instance._loaded_status:
+        metrics.inc('portal_certificate_transitions_total', status=instance.status)
+        instance._loaded_status = instance.status
+
+
+post_init.connect(remember_certificate_status, sender=Certificate)
+post_save.connect(count_certificate_transition, sender=Certificate)
+
+
+# Exam mode cache (see exam_mode.py)
+
+def exam_mode_changed(sender, instance, **kwargs):
+    # After commit, so no process can reload the old row under the new version
+    transaction.on_commit(invalidate_exam_mode)
+
+
+post_save.connect(exam_mode_changed, sender=ExamMode)
+post_delete.connect(exam_mode_changed, sender=ExamMode)
+
+
+# Full-text search index (see search.py)
+
+def remember_file_name(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred file field is not loaded
+    value = instance.__dict__.get('file_path')
+    instance._loaded_file_name = getattr(value, 'name', value)
+
+
+def submission_file_changed(sender, instance, created=False, **kwargs):
+    name = instance.file_path.name or ''
+    loaded = None if created else instance._loaded_file_name
+    if name != loaded and (name or loaded):
+        # Extraction is slow, so the worker does it once the upload is committed
+        transaction.on_commit(lambda: request_index(instance.pk))
+    instance._loaded_file_name = name
+
+
+def practical_text_changed(sender, instance, **kwargs):
+    index_practical(instance)
+
+
+post_init.connect(remember_file_name, sender=PracticalSubmission)
+post_save.connect(submission_file_changed, sender=PracticalSubmission)
+post_save.connect(practical_text_changed, sender=Practical)
+
+
+# Subject dropdown data (see reference_data.py)
+
+def subjects_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_reference_data('subjects'))
+
+
+post_save.connect(subjects_changed, sender=Subject)
+post_delete.connect(subjects_changed, sender=Subject)
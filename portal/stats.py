@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Func, IntegerField, Max, Q, Subquery
+from .models import CustomUser, Subject, PracticalSubmission, Certificate
+
+ADMIN_STATS_KEY = 'dashboard-stats:admin'
+
+
+def department_stats_key(department):
+    return f'dashboard-stats:department:{department}'
+
+
+def count_subquery(queryset):
+    """
+    COUNT(*) of another table as an uncorrelated subquery expression
+    """
+    return Subquery(
+        queryset.order_by().values(n=Func(F('pk'), function='COUNT', output_field=IntegerField()))
+    )
+
+
+def scalar_count(queryset):
+    """
+    count_subquery() for aggregate(), which only accepts aggregates, so it
+    is wrapped in Max(); it is the same value on every row.
+    """
+    return Max(count_subquery(queryset))
+
+
+def cached_stats(key, compute):
+    stats = cache.get(key)
+    if stats is None:
+        stats = {name: value or 0 for name, value in compute().items()}
+        cache.set(key, stats, getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 300))
+    return stats
+
+
+def admin_stats():
+    """
+    Role, subject and submission totals for the admin dashboard, in one query
+    """
+    return cached_stats(ADMIN_STATS_KEY, lambda: CustomUser.objects.aggregate(
+        students=Count('pk', filter=Q(role='student')),
+        teachers=Count('pk', filter=Q(role='teacher')),
+        hods=Count('pk', filter=Q(role='hod')),
+        examiners=Count('pk', filter=Q(role='examiner')),
+        subjects=scalar_count(Subject.objects.all()),
+        submissions=scalar_count(PracticalSubmission.objects.filter(is_draft=False)),
+    ))
+
+
+def department_stats(department):
+    """
+    Totals for a HOD's department, in one query
+    """
+    return cached_stats(department_stats_key(department), lambda: CustomUser.objects.filter(
+        department=department
+    ).aggregate(
+        students=Count('pk', filter=Q(role='student')),
+        teachers=Count('pk', filter=Q(role='teacher')),
+        subjects=scalar_count(Subject.objects.filter(department=department)),
+        pending_certificates=scalar_count(Certificate.objects.filter(
+            subject__department=department, status='sent_to_hod'
+        )),
+    ))
+
+
+def invalidate_stats(*departments):
+    """
+    Drop cached totals for the admin dashboard and the given departments
+    """
+    cache.delete_many([ADMIN_STATS_KEY] + [department_stats_key(d) for d in departments if d])
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+
+# Names handed to FileFields look like "practicals/<sha256>/report.pdf"
+BLOB_NAME_RE = re.compile(r'^(?P<prefix>.*?)(?P<digest>[0-9a-f]{64})/(?P<filename>[^/]+)$')
+
+
+def parse_blob_name(name):
+    """
+    Return (digest, filename) for a content-addressed name, else None
+    """
+    match = BLOB_NAME_RE.match(str(name).replace('\\', '/'))
+    if not match:
+        return None
+    return match.group('digest'), match.group('filename')
+
+
+def blob_relative_path(digest, filename):
+    return os.path.join(BLOB_DIR, digest[:2], digest + os.path.splitext(filename)[1].lower())
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that keeps one copy of each distinct upload.
+
+    Files are written once to blobs/<aa>/<sha256><ext>. The name stored in
+    the FileField keeps the upload_to folder and the original file name
+    ("practicals/<sha256>/report.pdf"), so downloads keep their names and
+    the FieldFile API is unchanged. StoredBlob rows count how many names
+    point at each blob; the blob is removed when the last one is deleted.
+    Names written before this storage existed keep working unchanged.
+    """
+
+    def path(self, name):
+        parsed = parse_blob_name(name)
+        if parsed:
+            return super().path(blob_relative_path(*parsed))
+        return super().path(name)
+
+    def url(self, name):
+        parsed = parse_blob_name(name)
+        if parsed:
+            return super().url(blob_relative_path(*parsed).replace(os.sep, '/'))
+        return super().url(name)
+
+    def get_available_name(self, name, max_length=None):
+        # Content addressing makes name collisions harmless
+        return name
+
+    def _save(self, name, content):
+        digest, size, temp_path = self._spool(content)
+        return self.save_hashed(name, temp_path, digest, size)
+
+    def save_hashed(self, name, temp_path, digest, size):
+        """
+        Move a local file whose SHA-256 is already known into blob storage
+        and return the name to store in the FileField. temp_path should come
+        from temp_file() so the move stays on one filesystem.
+        """
+        directory, filename = os.path.split(name)
+        blob_path = super().path(blob_relative_path(digest, filename))
+        try:
+            # The reference is taken first and its row stays locked until the
+            # file is in place, so a concurrent release cannot unlink it
+            with transaction.atomic():
+                add_reference(digest, size)
+                if not os.path.exists(blob_path):
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(temp_path, blob_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(blob_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return '/'.join(part for part in (directory.replace('\\', '/'), digest, filename) if part)
+
+    def temp_file(self):
+        """
+        Open a new temp file in the blob area. Returns (file, path).
+        """
+        blob_root = super().path(BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=blob_root, prefix='.upload-')
+        return os.fdopen(fd, 'wb'), temp_path
+
+    def _spool(self, content):
+        """
+        Copy an upload to a temp file in the blob area while hashing it
+        """
+        sha = hashlib.sha256()
+        size = 0
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        temp_file, temp_path = self.temp_file()
+        with temp_file:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                sha.update(chunk)
+                size += len(chunk)
+                temp_file.write(chunk)
+        return sha.hexdigest(), size, temp_path
+
+    def delete(self, name):
+        """
+        Drop one reference to a blob, removing the file with the last one.
+        The count and the unlink happen under the StoredBlob row lock.
+        """
+        parsed = parse_blob_name(name)
+        if not parsed:
+            return super().delete(name)
+        with transaction.atomic():
+            if release_reference(parsed[0]):
+                super().delete(blob_relative_path(*parsed))
+
+    def add_references(self, name, count):
+        """
+        Record extra rows pointing at an existing name (e.g. after bulk_create)
+        """
+        parsed = parse_blob_name(name)
+        if parsed and count:
+            add_reference(parsed[0], count=count)
+
+
+def add_reference(digest, size=None, count=1):
+    from .models import StoredBlob
+
+    updated = StoredBlob.objects.filter(digest=digest).update(ref_count=F('ref_count') + count)
+    if not updated:
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(digest=digest, size=size or 0, ref_count=count)
+        except IntegrityError:
+            StoredBlob.objects.filter(digest=digest).update(ref_count=F('ref_count') + count)
+
+
+def release_reference(digest):
+    """
+    Decrement a blob's reference count. Returns True when it reached zero
+    and the blob file should be removed. Call inside a transaction: the
+    row stays locked until the caller has removed the file.
+    """
+    from .models import StoredBlob
+
+    blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+    if blob is None:
+        return False
+    if blob.ref_count > 1:
+        StoredBlob.objects.filter(digest=digest).update(ref_count=F('ref_count') - 1)
+        return False
+    blob.delete()
+    return True
+
+
+content_storage = ContentAddressedStorage()
+
+
+def get_content_storage():
+    return content_storage
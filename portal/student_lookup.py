@@ -0,0 +1,50 @@
+from django.db.models import Prefetch, Q
+from .models import CustomUser, PracticalSubmission, Certificate
+
+
+def class_students(department, student_class):
+    return CustomUser.objects.filter(role='student', department=department, student_class=student_class)
+
+
+def suggest_students(department, student_class, prefix, limit=10):
+    """
+    Students of a class whose roll number or name starts with `prefix`, as
+    dicts. Both are prefix range scans of the (role, department, class, ...)
+    indexes; MySQL's case-insensitive collation lets LIKE 'x%' use them.
+    """
+    return list(
+        class_students(department, student_class)
+        .filter(Q(roll_number__istartswith=prefix) | Q(full_name__istartswith=prefix))
+        .order_by('roll_number', 'id')
+        .values('id', 'roll_number', 'full_name')[:limit]
+    )
+
+
+def student_records(department, student_class, roll_numbers=None, subject=None):
+    """
+    Students of a class (all of them, or those with `roll_numbers`) with
+    their submissions and certificate, in three queries however many
+    students there are. Each student gets `.records_submissions` (a list),
+    `.records_approved` (a count) and `.records_certificate` (the first
+    certificate, or None).
+    """
+    students = class_students(department, student_class)
+    if roll_numbers is not None:
+        students = students.filter(roll_number__in=roll_numbers)
+
+    submissions = PracticalSubmission.objects.select_related('practical', 'practical__subject').order_by(
+        'practical__subject__name', 'practical__number', 'id'
+    )
+    certificates = Certificate.objects.order_by('id')
+    if subject:
+        submissions = submissions.filter(practical__subject=subject)
+        certificates = certificates.filter(subject=subject)
+
+    students = list(students.order_by('roll_number', 'id').prefetch_related(
+        Prefetch('practicalsubmission_set', queryset=submissions, to_attr='records_submissions'),
+        Prefetch('certificate_set', queryset=certificates, to_attr='student_certificates'),
+    ))
+    for student in students:
+        student.records_certificate = student.student_certificates[0] if student.student_certificates else None
+        student.records_approved = sum(submission.status == 'approved' for submission in student.records_submissions)
+    return students
@@ -0,0 +1,89 @@
+from django.db import transaction
+from .jobs import task, set_progress, enqueue
+from .models import CustomUser, Subject, Certificate, CertificateSubmission, Practical, PracticalSubmission, Job
+from .certificates import generate_student_certificates
+from .previews import build_preview, is_previewable
+from .search import index_submission
+from . import audit
+
+# file_type used in URLs -> model with a file_path field
+FILE_MODELS = {
+    'submission': PracticalSubmission,
+    'certificate': Certificate,
+    'certificate_submission': CertificateSubmission,
+}
+
+
+@task('certificates.generate')
+def generate_certificates_task(job, template_id):
+    """Create per-student certificates for a newly added certificate template"""
+    template = Certificate.objects.select_related('subject', 'teacher').get(pk=template_id)
+    set_progress(job, 10, f'Generating certificates for {template.subject.name}')
+
+    created, skipped = generate_student_certificates(template)
+    return {
+        'created': created,
+        'skipped': skipped,
+        'message': f'Certificates generated for {created} students ({skipped} already had one).',
+    }
+
+
+@task('subjects.renew')
+def renew_subject_task(job, subject_id, teacher_id=None):
+    """Delete a subject's practicals and certificates and optionally assign a new teacher"""
+    subject = Subject.objects.get(pk=subject_id)
+    set_progress(job, 10, f'Renewing {subject.name}')
+
+    with transaction.atomic():
+        # Child table first, then certificates, then practicals (and their submissions)
+        CertificateSubmission.objects.filter(certificate__subject=subject).delete()
+        _, deleted_certificates = Certificate.objects.filter(subject=subject).delete()
+        _, deleted_practicals = Practical.objects.filter(subject=subject).delete()
+
+        previous_teacher = subject.teacher_id
+        if teacher_id:
+            subject.teacher = CustomUser.objects.get(pk=teacher_id, role='teacher')
+            subject.save()
+
+        audit.record(
+            'subject_renewed', actor=job.created_by_id, subject=subject, target=subject,
+            deleted={**deleted_certificates, **deleted_practicals},
+            previous_teacher_id=previous_teacher, teacher_id=subject.teacher_id
+        )
+
+    return {'message': f'All Practicals and Certificates for {subject.name} have been deleted and renewed successfully.'}
+
+
+@task('previews.render')
+def render_preview_task(job, file_type, file_id):
+    """Render the cached PDF and thumbnails for an uploaded document"""
+    obj = FILE_MODELS[file_type].objects.get(pk=file_id)
+    if not obj.file_path:
+        return {'message': 'No file to preview.'}
+
+    set_progress(job, 10, 'Rendering preview')
+    preview = build_preview(obj.file_path)
+    return {'digest': preview.digest, 'message': 'Preview ready.'}
+
+
+@task('search.index')
+def index_submission_task(job, submission_id):
+    """Extract an uploaded report's text into the search index"""
+    submission = PracticalSubmission.objects.select_related('practical', 'student').filter(pk=submission_id).first()
+    if submission is None:
+        return {'message': 'Submission no longer exists.'}
+
+    set_progress(job, 10, 'Indexing submission text')
+    document = index_submission(submission)
+    return {'characters': len(document.body), 'message': 'Submission indexed.'}
+
+
+def request_preview(file_type, obj):
+    """Queue a preview render for an upload unless one is already pending"""
+    if not obj.file_path or not is_previewable(obj.file_path.name):
+        return None
+
+    payload = {'file_type': file_type, 'file_id': obj.pk}
+    if Job.objects.filter(name='previews.render', payload=payload, status__in=['queued', 'running']).exists():
+        return None
+    return enqueue('previews.render', payload)
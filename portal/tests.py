@@ -0,0 +1,599 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from unittest import skipIf
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .certificates import generate_student_certificates
+from .exports import entry_name
+from .file_serving import MAX_RANGES, parse_range_header
+from .jobs import TASKS, claim, enqueue, run_job, task
+from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, AuditEvent, Job, StoredBlob, SearchDocument
+from .previews import PDF_BATCH_PAGES, PREVIEW_PDF, convert_docx
+from .reviews import bulk_review
+from .search import index_submission
+from .stats import ADMIN_STATS_KEY, admin_stats
+from .storage import content_storage, parse_blob_name
+from .uploads import start_upload, chunk_path, chunk_dir, complete_upload
+from .workflow import transition
+
+
+def make_user(username, role, **fields):
+    fields.setdefault('full_name', username.title())
+    fields.setdefault('department', 'computer_science')
+    if role == 'student':
+        fields.setdefault('student_class', 'Semester 1')
+    return CustomUser.objects.create_user(
+        username, f'{username}@example.com', 'pw', role=role, **fields
+    )
+
+
+def make_subject(teacher, code='S1'):
+    return Subject.objects.create(
+        name=f'Subject {code}', code=code, department='computer_science', student_class='Semester 1', teacher=teacher
+    )
+
+
+def make_practical(subject, number=1):
+    return Practical.objects.create(
+        number=number, title=f'Practical {number}', description='Description',
+        deadline=timezone.now() + timedelta(days=7), subject=subject, teacher=subject.teacher
+    )
+
+
+class TempMediaMixin:
+    """Uploads and upload chunks go to a directory removed after each test"""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        override = override_settings(MEDIA_ROOT=media, UPLOAD_CHUNK_DIR=os.path.join(media, 'chunks'))
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class StudentDashboardQueryCountTests(TestCase):
+    """The student dashboard costs the same number of queries however much data the student has"""
+
+    # Session, user, practicals, submissions, certificates
+    QUERIES = 5
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student', roll_number='1')
+        self.client.force_login(self.student)
+        self.subjects = 0
+
+    def add_subject(self, practicals):
+        """A subject with `practicals` practicals, each with a submission by the student"""
+        self.subjects += 1
+        subject = make_subject(self.teacher, code=f'S{self.subjects}')
+        for number in range(1, practicals + 1):
+            practical = make_practical(subject, number)
+            PracticalSubmission.objects.create(
+                practical=practical, student=self.student, status='submitted', is_draft=False
+            )
+
+    def get_dashboard(self):
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_practicals_and_submissions(self):
+        self.add_subject(practicals=2)
+        # Loads the per-process exam mode cache so it is not counted below
+        self.get_dashboard()
+        with self.assertNumQueries(self.QUERIES):
+            self.get_dashboard()
+
+        for _ in range(4):
+            self.add_subject(practicals=10)
+        with self.assertNumQueries(self.QUERIES):
+            response = self.get_dashboard()
+        self.assertEqual(len(response.context['practicals']), 42)
+        self.assertEqual(len(response.context['submissions']), 42)
+
+
+class SubmissionReviewPermissionTests(TestCase):
+    """Only the practical's teacher can approve or reject a submission"""
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student', roll_number='1')
+        practical = make_practical(make_subject(self.teacher))
+        self.submission = PracticalSubmission.objects.create(
+            practical=practical, student=self.student, status='submitted', is_draft=False
+        )
+
+    def assert_status(self, status):
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, status)
+
+    def test_student_cannot_approve(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('approve_submission', args=[self.submission.id]))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assert_status('submitted')
+        self.assertFalse(AuditEvent.objects.exists())
+
+    def test_other_teacher_cannot_approve_or_reject(self):
+        self.client.force_login(make_user('other', 'teacher'))
+        for name in ('approve_submission', 'reject_submission'):
+            response = self.client.get(reverse(name, args=[self.submission.id]))
+            self.assertEqual(response.status_code, 404)
+        self.assert_status('submitted')
+
+    def test_teacher_approves_and_is_audited(self):
+        self.client.force_login(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('approve_submission', args=[self.submission.id]))
+        self.assertRedirects(response, reverse('teacher_dashboard'), fetch_redirect_response=False)
+        self.assert_status('approved')
+        self.assertIsNotNone(self.submission.approved_at)
+        event = AuditEvent.objects.get()
+        self.assertEqual((event.actor_id, event.to_status), (self.teacher.id, 'approved'))
+
+
+class TeacherQueueTests(TestCase):
+    """The action links in the teacher queue JSON work"""
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student', roll_number='1')
+        practical = make_practical(make_subject(self.teacher))
+        self.submission = PracticalSubmission.objects.create(
+            practical=practical, student=self.student, status='submitted', is_draft=False,
+            submitted_at=timezone.now()
+        )
+        self.client.force_login(self.teacher)
+
+    def test_pending_row_links(self):
+        response = self.client.get(reverse('teacher_queue', args=['pending']))
+        [row] = response.json()['results']
+        self.assertEqual(row['id'], self.submission.id)
+
+        self.assertEqual(row['review_url'], reverse('review_submission', args=[self.submission.id]))
+        response = self.client.get(row['approve_url'])
+        self.assertRedirects(response, reverse('teacher_dashboard'), fetch_redirect_response=False)
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, 'approved')
+        self.assertEqual(self.client.get(reverse('teacher_queue', args=['pending'])).json()['results'], [])
+
+
+class CompleteUploadTests(TempMediaMixin, TestCase):
+    """A chunked upload only replaces the file of a submission that is still editable"""
+
+    def setUp(self):
+        super().setUp()
+        self.student = make_user('student', 'student', roll_number='1')
+        practical = make_practical(make_subject(make_user('teacher', 'teacher')))
+        self.submission = PracticalSubmission.objects.create(
+            practical=practical, student=self.student, status='draft', is_draft=True
+        )
+
+    def open_upload(self, content=b'%PDF-report'):
+        upload = start_upload(self.student, self.submission, 'report.pdf', len(content))
+        os.makedirs(chunk_dir(upload), exist_ok=True)
+        with open(chunk_path(upload, 0), 'wb') as chunk:
+            chunk.write(content)
+        return upload
+
+    def test_draft_is_replaced(self):
+        submission = complete_upload(self.open_upload(), final_submit=True)
+        self.assertEqual((submission.status, submission.is_draft), ('submitted', False))
+        with submission.file_path.open('rb') as file:
+            self.assertEqual(file.read(), b'%PDF-report')
+
+    def test_approved_while_uploading_is_refused(self):
+        upload = self.open_upload()
+        PracticalSubmission.objects.filter(pk=self.submission.pk).update(status='approved', is_draft=False)
+
+        with self.assertRaises(ValueError):
+            complete_upload(upload, final_submit=True)
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, 'approved')
+        self.assertFalse(self.submission.file_path)
+
+
+class DashboardStatsInvalidationTests(TestCase):
+    """Cached totals are cleared when a change commits, and only when it changes them"""
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student', roll_number='1')
+        self.practical = make_practical(make_subject(self.teacher))
+
+    def test_cleared_on_commit_only(self):
+        admin_stats()
+        with self.captureOnCommitCallbacks() as callbacks:
+            submission = PracticalSubmission.objects.create(
+                practical=self.practical, student=self.student, status='submitted', is_draft=False
+            )
+        self.assertIsNotNone(cache.get(ADMIN_STATS_KEY))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(ADMIN_STATS_KEY))
+
+        admin_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.feedback = 'Autosaved'
+            submission.save()
+        self.assertIsNotNone(cache.get(ADMIN_STATS_KEY))
+
+
+class ExportEntryNameTests(TestCase):
+    """Free-text fields cannot steer ZIP entries out of their folder"""
+
+    def test_separators_and_dots_are_removed(self):
+        teacher = make_user('teacher', 'teacher')
+        practical = make_practical(make_subject(teacher, code='../CS/101'), number=3)
+        for i, (roll_number, expected) in enumerate((('../../x', 'x'), ('a/b', 'ab'), ('..', None), ('12', '12'))):
+            student = make_user(f'student{i}', 'student', roll_number=roll_number)
+            submission = PracticalSubmission(practical=practical, student=student, file_path='practicals/report.PDF')
+            self.assertEqual(
+                entry_name(submission, folder_per_subject=True), f"CS101/{expected or student.pk}_P3.pdf"
+            )
+
+
+class HomePageTests(TestCase):
+    """Anonymous visitors get a cacheable page that names no students"""
+
+    def test_anonymous_page(self):
+        teacher = make_user('teacher', 'teacher')
+        practical = make_practical(make_subject(teacher))
+        practical.is_public = True
+        practical.save()
+        student = make_user('student', 'student', roll_number='1', full_name='Asha Kulkarni')
+        PracticalSubmission.objects.create(practical=practical, student=student, status='approved', is_draft=False)
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, student.full_name)
+        self.assertIn('public', response['Cache-Control'])
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class RunJobOwnershipTests(TestCase):
+    """A worker whose job was taken over cannot overwrite the new run"""
+
+    def setUp(self):
+        @task('tests.echo')
+        def echo(job, value):
+            return {'value': value}
+        self.addCleanup(TASKS.pop, 'tests.echo')
+
+    def test_result_recorded_by_owner(self):
+        job = enqueue('tests.echo', {'value': 1})
+        self.assertTrue(claim(job.pk, 'worker-1'))
+        self.assertTrue(run_job(job.pk, 'worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.locked_by), ('succeeded', {'value': 1}, 'worker-1'))
+
+    def test_result_discarded_after_takeover(self):
+        job = enqueue('tests.echo', {'value': 1})
+        self.assertTrue(claim(job.pk, 'worker-1'))
+        # Its lock expired and another worker claimed the job again
+        Job.objects.filter(pk=job.pk).update(status='queued', locked_by='', locked_at=None)
+        self.assertTrue(claim(job.pk, 'worker-2'))
+
+        with self.assertLogs('portal.jobs', 'WARNING'):
+            self.assertFalse(run_job(job.pk, 'worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.result), ('running', 'worker-2', None))
+
+
+class CertificateTransitionTests(TestCase):
+    """transition() moves a certificate only from its allowed statuses, and only once"""
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student', roll_number='1')
+        self.certificate = Certificate.objects.create(
+            student=self.student, subject=make_subject(self.teacher), teacher=self.teacher, status='generated'
+        )
+
+    def stored_status(self):
+        return Certificate.objects.values_list('status', flat=True).get(pk=self.certificate.pk)
+
+    def test_legal_moves_stamp_and_audit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(transition(self.certificate, 'send', actor=self.student))
+            self.assertTrue(transition(self.certificate, 'teacher_approve', actor=self.teacher))
+        self.assertEqual(self.certificate.status, 'sent_to_hod')
+        self.assertEqual(self.stored_status(), 'sent_to_hod')
+        stored = Certificate.objects.get(pk=self.certificate.pk)
+        self.assertIsNotNone(stored.submitted_at)
+        self.assertIsNotNone(stored.approved_at)
+        self.assertEqual(
+            list(AuditEvent.objects.order_by('id').values_list('from_status', 'to_status')),
+            [('generated', 'submitted_to_teacher'), ('submitted_to_teacher', 'sent_to_hod')]
+        )
+
+    def test_illegal_move_changes_nothing(self):
+        self.assertFalse(transition(self.certificate, 'hod_approve'))
+        self.assertFalse(transition(self.certificate, 'examiner_reject'))
+        self.assertEqual(self.certificate.status, 'generated')
+        self.assertEqual(self.stored_status(), 'generated')
+
+    def test_lost_race(self):
+        self.assertTrue(transition(self.certificate, 'send'))
+        # Two reviewers loaded the certificate before either clicked
+        first = Certificate.objects.get(pk=self.certificate.pk)
+        second = Certificate.objects.get(pk=self.certificate.pk)
+
+        self.assertTrue(transition(first, 'teacher_approve', actor=self.teacher))
+        self.assertFalse(transition(second, 'teacher_reject', actor=self.teacher))
+        self.assertEqual(second.status, 'submitted_to_teacher')
+        self.assertEqual(self.stored_status(), 'sent_to_hod')
+
+
+class BulkReviewTests(TestCase):
+    """bulk_review updates the teacher's submitted rows of a mixed selection and skips the rest"""
+
+    def setUp(self):
+        self.teacher = make_user('teacher', 'teacher')
+        subject = make_subject(self.teacher)
+        other_practical = make_practical(make_subject(make_user('other', 'teacher'), code='S2'))
+        self.earlier = timezone.now() - timedelta(days=3)
+
+        def submission(number, practical=None, **fields):
+            student = make_user(f'student{number}', 'student', roll_number=str(number))
+            return PracticalSubmission.objects.create(
+                practical=practical or make_practical(subject, number), student=student, **fields
+            )
+
+        self.submitted = submission(1, status='submitted', is_draft=False)
+        self.approved = submission(2, status='approved', is_draft=False, approved_at=self.earlier)
+        self.rejected = submission(3, status='rejected', is_draft=False)
+        self.draft = submission(4, status='draft', is_draft=True)
+        self.other_teachers = submission(5, practical=other_practical, status='submitted', is_draft=False)
+        self.all = [self.submitted, self.approved, self.rejected, self.draft, self.other_teachers]
+
+    def review(self, action, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_review(self.teacher, [s.pk for s in self.all], action, **kwargs)
+        for submission in self.all:
+            submission.refresh_from_db()
+        return result
+
+    def test_approve_mixed_selection(self):
+        updated, skipped = self.review(
+            'approve', feedback='Good', item_feedback={self.rejected.pk: 'Fixed now'}
+        )
+        self.assertEqual(updated, sorted([self.submitted.pk, self.approved.pk, self.rejected.pk]))
+        self.assertEqual(skipped, sorted([self.draft.pk, self.other_teachers.pk]))
+
+        self.assertEqual([s.status for s in self.all], ['approved'] * 3 + ['draft', 'submitted'])
+        self.assertEqual(self.approved.approved_at, self.earlier)
+        self.assertIsNotNone(self.submitted.approved_at)
+        self.assertEqual((self.submitted.feedback, self.rejected.feedback), ('Good', 'Fixed now'))
+        self.assertEqual(AuditEvent.objects.count(), 3)
+
+    def test_reject_mixed_selection(self):
+        updated, skipped = self.review('reject')
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(skipped, sorted([self.draft.pk, self.other_teachers.pk]))
+        self.assertEqual([s.status for s in self.all], ['rejected'] * 3 + ['draft', 'submitted'])
+        self.assertIsNone(self.approved.approved_at)
+
+    def test_single_reject_clears_approved_at_too(self):
+        self.client.force_login(self.teacher)
+        self.client.get(reverse('reject_submission', args=[self.approved.pk]))
+        self.approved.refresh_from_db()
+        self.assertEqual(self.approved.status, 'rejected')
+        self.assertIsNone(self.approved.approved_at)
+
+
+class GenerateCertificatesTests(TempMediaMixin, TestCase):
+    """Generated certificates are counted once, and each references the template's file"""
+
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_user('teacher', 'teacher')
+        self.subject = make_subject(self.teacher)
+        self.students = [make_user(f'student{i}', 'student', roll_number=str(i)) for i in range(3)]
+        make_user('elsewhere', 'student', student_class='Semester 2', roll_number='1')
+        self.template = Certificate.objects.create(
+            subject=self.subject, teacher=self.teacher, status='template_added',
+            file_path=SimpleUploadedFile('certificate.pdf', b'%PDF-certificate')
+        )
+
+    def ref_count(self):
+        digest = parse_blob_name(self.template.file_path.name)[0]
+        return StoredBlob.objects.get(digest=digest).ref_count
+
+    def test_counts(self):
+        Certificate.objects.create(
+            student=self.students[0], subject=self.subject, teacher=self.teacher, status='submitted_to_teacher'
+        )
+        self.assertEqual(generate_student_certificates(self.template), (2, 1))
+        self.assertEqual(self.ref_count(), 3)
+
+        # Running again creates nothing and takes no references
+        self.assertEqual(generate_student_certificates(self.template), (0, 3))
+        self.assertEqual(self.ref_count(), 3)
+        self.assertEqual(
+            Certificate.objects.filter(subject=self.subject, status='generated').count(), 2
+        )
+
+
+class StoredBlobTests(TempMediaMixin, TestCase):
+    """Identical uploads share one file, released with the last row that uses it"""
+
+    def setUp(self):
+        super().setUp()
+        practical = make_practical(make_subject(make_user('teacher', 'teacher')))
+        self.submissions = [
+            PracticalSubmission.objects.create(
+                practical=practical, student=make_user(f'student{i}', 'student', roll_number=str(i)),
+                status='draft', is_draft=True
+            )
+            for i in range(2)
+        ]
+
+    def upload(self, submission, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.file_path = SimpleUploadedFile('report.pdf', content)
+            submission.save()
+        return parse_blob_name(submission.file_path.name)[0]
+
+    def ref_count(self, digest):
+        return StoredBlob.objects.filter(digest=digest).values_list('ref_count', flat=True).first()
+
+    def test_add_and_release(self):
+        first, second = self.submissions
+        digest = self.upload(first, b'same report')
+        self.assertEqual(self.upload(second, b'same report'), digest)
+        self.assertEqual(self.ref_count(digest), 2)
+        path = first.file_path.path
+
+        # Replacing one upload releases its reference to the shared file
+        other = self.upload(first, b'another report')
+        self.assertEqual((self.ref_count(digest), self.ref_count(other)), (1, 1))
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.ref_count(digest))
+        self.assertFalse(os.path.exists(path))
+
+    def test_rolled_back_delete_keeps_the_file(self):
+        submission = self.submissions[0]
+        digest = self.upload(submission, b'report')
+        pk = submission.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    submission.delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.ref_count(digest), 1)
+        self.assertTrue(os.path.exists(PracticalSubmission.objects.get(pk=pk).file_path.path))
+
+    def test_dedupe_media(self):
+        legacy = []
+        for i, submission in enumerate(self.submissions):
+            name = f'practicals/legacy{i}.pdf'
+            os.makedirs(os.path.dirname(content_storage.path(name)), exist_ok=True)
+            with open(content_storage.path(name), 'wb') as file:
+                file.write(b'legacy report')
+            PracticalSubmission.objects.filter(pk=submission.pk).update(file_path=name)
+            legacy.append(content_storage.path(name))
+        missing = PracticalSubmission.objects.create(
+            practical=self.submissions[0].practical, student=make_user('student9', 'student', roll_number='9'),
+            file_path='practicals/gone.pdf'
+        )
+
+        call_command('dedupe_media', stdout=StringIO(), stderr=StringIO())
+        names = set(PracticalSubmission.objects.exclude(pk=missing.pk).values_list('file_path', flat=True))
+        self.assertEqual(len({parse_blob_name(name)[0] for name in names}), 1)
+        self.assertEqual(self.ref_count(parse_blob_name(names.pop())[0]), 2)
+        self.assertFalse(any(os.path.exists(path) for path in legacy))
+
+
+class ParseRangeHeaderTests(SimpleTestCase):
+    """Range headers, per RFC 9110"""
+
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-99', [(0, 99)]),
+            ('bytes=900-', [(900, 999)]),
+            ('bytes=950-2000', [(950, 999)]),
+            # Suffix ranges: the last N bytes, all of them when N is larger
+            ('bytes=-100', [(900, 999)]),
+            ('bytes=-5000', [(0, 999)]),
+            ('bytes=0-0, -1', [(0, 0), (999, 999)]),
+            # Sorted, with overlapping and adjacent ranges merged
+            ('bytes=500-599, 0-99, 50-149, 150-199', [(0, 199), (500, 599)]),
+            # Nothing satisfiable: 416
+            ('bytes=1000-', []),
+            ('bytes=-0', []),
+            # Ignored, so the whole file is sent with 200
+            ('bytes=abc', None),
+            ('items=0-10', None),
+            ('bytes=10-5', None),
+            ('bytes=' + ', '.join(['0-1'] * (MAX_RANGES + 1)), None),
+            ('bytes=' + ', '.join(['0-'] * 32), None),
+            ('bytes=0-599, 400-999', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range_header(header, 1000), expected)
+
+
+@skipIf(shutil.which('soffice') or shutil.which('libreoffice'), 'LibreOffice converts DOCX files instead')
+class DocxPreviewTests(SimpleTestCase):
+    """The built-in DOCX renderer writes pages in batches and stops at PREVIEW_MAX_PAGES"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        from docx import Document
+
+        document = Document()
+        for number in range(400):
+            document.add_paragraph(f'Line {number} of a long report')
+        self.source = os.path.join(self.directory, 'report.docx')
+        document.save(self.source)
+
+    def convert(self, **settings):
+        pdf_path = os.path.join(self.directory, PREVIEW_PDF)
+        with override_settings(**settings):
+            thumbnails = convert_docx(self.source, pdf_path)
+        from PIL import PdfParser
+
+        return len(PdfParser.PdfParser(pdf_path).pages), thumbnails
+
+    def test_all_pages(self):
+        pages, thumbnails = self.convert(PREVIEW_MAX_PAGES=100, PREVIEW_MAX_THUMBNAILS=3)
+        self.assertGreater(pages, PDF_BATCH_PAGES)
+        self.assertEqual(thumbnails, ['thumb-1.png', 'thumb-2.png', 'thumb-3.png'])
+
+    def test_page_cap(self):
+        pages, thumbnails = self.convert(PREVIEW_MAX_PAGES=4, PREVIEW_MAX_THUMBNAILS=20)
+        self.assertEqual(pages, 4)
+        self.assertEqual(len(thumbnails), 4)
+
+
+class AdminSearchTests(TestCase):
+    """Admin searches use the full-text index and exact matches, never LIKE scans"""
+
+    def setUp(self):
+        teacher = make_user('teacher', 'teacher')
+        self.practical = make_practical(make_subject(teacher, code='CS101'))
+        self.practical.description = 'Quantum entanglement experiment'
+        self.practical.save()
+        student = make_user('student', 'student', roll_number='1')
+        self.submission = PracticalSubmission.objects.create(
+            practical=self.practical, student=student, status='submitted', is_draft=False
+        )
+        index_submission(self.submission)
+        SearchDocument.objects.filter(submission=self.submission).update(body='zebra migration report')
+        self.client.force_login(CustomUser.objects.create_superuser('root', 'root@example.com', 'pw'))
+
+    def search(self, model, term):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:portal_{model}_changelist'), {'q': term})
+        self.assertFalse([query['sql'] for query in queries if ' LIKE ' in query['sql']])
+        return list(response.context['cl'].result_list)
+
+    def test_practicals(self):
+        self.assertEqual(self.search('practical', 'entanglement'), [self.practical])
+        self.assertEqual(self.search('practical', 'CS101'), [self.practical])
+        self.assertEqual(self.search('practical', 'unrelated'), [])
+
+    def test_submissions(self):
+        self.assertEqual(self.search('practicalsubmission', 'zebra'), [self.submission])
+        self.assertEqual(self.search('practicalsubmission', 'student'), [self.submission])
+        self.assertEqual(self.search('practicalsubmission', 'unrelated'), [])
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ChunkedUpload, PracticalSubmission
+from .signals import release_file
+from .utils import get_file_extension
+
+ALLOWED_EXTENSIONS = ['.pdf', '.doc', '.docx']
+READ_BLOCK = 64 * 1024
+
+
+def get_chunk_root():
+    return str(getattr(settings, 'UPLOAD_CHUNK_DIR', os.path.join(settings.BASE_DIR, 'upload_chunks')))
+
+
+def chunk_dir(upload):
+    return os.path.join(get_chunk_root(), str(upload.pk))
+
+
+def chunk_path(upload, index):
+    return os.path.join(chunk_dir(upload), f'{index}.part')
+
+
+def received_chunks(upload):
+    """
+    Indexes of the chunks already stored for an upload, in order
+    """
+    try:
+        names = os.listdir(chunk_dir(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part') and name[:-5].isdigit())
+
+
+def start_upload(user, submission, filename, size, checksum=''):
+    """
+    Open an upload session, or return the unfinished one for the same file
+    so a client that lost its connection resumes where it stopped.
+    """
+    filename = os.path.basename(filename.replace('\\', '/'))
+    if get_file_extension(filename) not in ALLOWED_EXTENSIONS:
+        raise ValueError('Only PDF, DOC and DOCX files are allowed')
+    max_size = getattr(settings, 'UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+    if size <= 0 or size > max_size:
+        raise ValueError(f'File size must be between 1 byte and {max_size} bytes')
+
+    existing = ChunkedUpload.objects.filter(
+        user=user, submission=submission, filename=filename,
+        size=size, checksum=checksum, status='uploading'
+    ).order_by('-created_at').first()
+    if existing:
+        return existing
+
+    return ChunkedUpload.objects.create(
+        user=user,
+        submission=submission,
+        filename=filename,
+        size=size,
+        chunk_size=getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 * 1024),
+        checksum=checksum,
+    )
+
+
+def write_chunk(upload, index, stream, checksum):
+    """
+    Store one chunk read from the request stream. The chunk's SHA-256 must
+    match `checksum`; a chunk sent twice simply replaces the first copy.
+    """
+    if upload.status != 'uploading':
+        raise ValueError('Upload is already finished')
+    if not 0 <= index < upload.total_chunks:
+        raise ValueError('Chunk index out of range')
+
+    expected = min(upload.chunk_size, upload.size - index * upload.chunk_size)
+    os.makedirs(chunk_dir(upload), exist_ok=True)
+    temp_path = chunk_path(upload, index) + '.tmp'
+
+    sha = hashlib.sha256()
+    length = 0
+    try:
+        with open(temp_path, 'wb') as file:
+            # Read at most one byte past the expected size to detect oversized chunks
+            while length <= expected:
+                block = stream.read(min(READ_BLOCK, expected + 1 - length))
+                if not block:
+                    break
+                sha.update(block)
+                length += len(block)
+                file.write(block)
+
+        if length != expected:
+            raise ValueError(f'Chunk {index} should be {expected} bytes, got {length}')
+        if sha.hexdigest() != checksum.lower():
+            raise ValueError(f'Checksum mismatch for chunk {index}')
+        os.replace(temp_path, chunk_path(upload, index))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def complete_upload(upload, final_submit=False):
+    """
+    Join the chunks straight into content-addressed storage and attach the
+    file to the upload's PracticalSubmission, as submit_practical does for
+    a normal form post. Returns the submission.
+    """
+    # Conditional update so a retried "complete" request cannot assemble twice
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='uploading').update(status='assembling')
+    if not claimed:
+        upload.refresh_from_db()
+        if upload.status == 'complete':
+            return upload.submission
+        raise ValueError('Upload is already being assembled')
+
+    try:
+        missing = sorted(set(range(upload.total_chunks)) - set(received_chunks(upload)))
+        if missing:
+            raise ValueError(f'Missing chunks: {missing[:20]}')
+
+        submission = upload.submission
+        field = PracticalSubmission._meta.get_field('file_path')
+        storage = field.storage
+        name = field.generate_filename(submission, upload.filename)
+
+        sha = hashlib.sha256()
+        size = 0
+        temp_file, temp_path = storage.temp_file()
+        try:
+            with temp_file:
+                for index in range(upload.total_chunks):
+                    with open(chunk_path(upload, index), 'rb') as chunk:
+                        for block in iter(lambda: chunk.read(READ_BLOCK), b''):
+                            sha.update(block)
+                            size += len(block)
+                            temp_file.write(block)
+            if size != upload.size:
+                raise ValueError(f'Assembled file is {size} bytes, expected {upload.size}')
+            if upload.checksum and sha.hexdigest() != upload.checksum.lower():
+                raise ValueError('Checksum mismatch for the assembled file')
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        with transaction.atomic():
+            # The teacher may have reviewed the submission since the upload was opened
+            submission = PracticalSubmission.objects.select_for_update().get(pk=upload.submission_id)
+            if not submission.is_draft and submission.status != 'rejected':
+                os.remove(temp_path)
+                raise ValueError('Practical already submitted')
+
+            old_name = submission.file_path.name if submission.file_path else None
+            submission.file_path.name = storage.save_hashed(name, temp_path, sha.hexdigest(), size)
+            if final_submit:
+                submission.is_draft = False
+                submission.status = 'submitted'
+            else:
+                submission.is_draft = True
+                submission.status = 'draft'
+            submission.save()
+
+            # The name was assigned directly, so the pre_save signal does not see the replacement
+            release_file(old_name, storage)
+    except Exception:
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='uploading')
+        raise
+
+    ChunkedUpload.objects.filter(pk=upload.pk).update(status='complete', completed_at=timezone.now())
+    shutil.rmtree(chunk_dir(upload), ignore_errors=True)
+    return submission
+
+
+def purge_stale_uploads(max_age=None):
+    """
+    Delete upload sessions (and their chunks) older than UPLOAD_EXPIRY
+    seconds. Returns the number of sessions removed.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'UPLOAD_EXPIRY', 24 * 60 * 60)
+
+    stale = ChunkedUpload.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=max_age))
+    for upload in stale.only('pk'):
+        shutil.rmtree(chunk_dir(upload), ignore_errors=True)
+    return stale.delete()[0]
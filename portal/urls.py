@@ -20,6 +20,7 @@ urlpatterns = [
     # Dashboards
     path('dashboard/student/', views.student_dashboard, name='student_dashboard'),
     path('dashboard/teacher/', views.teacher_dashboard, name='teacher_dashboard'),
+    path('dashboard/teacher/<str:queue>/', views.teacher_queue, name='teacher_queue'),
     path('dashboard/hod/', views.hod_dashboard, name='hod_dashboard'),
     path('dashboard/admin/', views.admin_dashboard, name='admin_dashboard'),
     path('dashboard/examiner/', views.examiner_dashboard, name='examiner_dashboard'),
@@ -31,7 +32,12 @@ urlpatterns = [
     path('subjects/<int:subject_id>/add-practical/', views.add_practical, name='add_practical'),
     path('practicals/<int:practical_id>/', views.practical_detail, name='practical_detail'),
     path('practicals/<int:practical_id>/submit/', views.submit_practical, name='submit_practical'),
+    path('practicals/<int:practical_id>/upload/', views.start_chunked_upload, name='start_chunked_upload'),
+    path('uploads/<uuid:upload_id>/', views.chunked_upload_status, name='chunked_upload_status'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.complete_chunked_upload, name='complete_chunked_upload'),
     path('submissions/<int:submission_id>/review/', views.review_submission, name='review_submission'),
+    path('submissions/bulk-review/', views.bulk_review_submissions, name='bulk_review_submissions'),
     path('submissions/<int:submission_id>/mark-best/', views.mark_best_practical, name='mark_best_practical'),
     path('approve_submission/<int:submission_id>/', views.approve_submission, name='approve_submission'),
     path('submission/<int:submission_id>/reject/', views.reject_submission, name='reject_submission'),
@@ -58,6 +64,9 @@ urlpatterns = [
     
     # Downloads
     path('submissions/<int:submission_id>/download/', views.download_submission, name='download_submission'),
+    path('practicals/<int:practical_id>/export/', views.export_submissions, name='export_practical_submissions'),
+    path('subjects/<int:subject_id>/export/', views.export_submissions, name='export_subject_submissions'),
+    path('submissions/export/', views.export_submissions, name='export_class_submissions'),
     path('teacher/add-certificate/<int:subject_id>/', views.add_certificate, name='add_certificate'),
     path('teacher/approve-certificate/<int:certificate_id>/', views.approve_certificate_teacher, name='approve_certificate_teacher'),
 
@@ -76,6 +85,7 @@ urlpatterns = [
     
     # Direct File Serving URLs
     path('file/<str:file_type>/<int:file_id>/', views.serve_file_direct, name='serve_file_direct'),
+    path('preview/<str:file_type>/<int:file_id>/<str:artifact>', views.preview_file, name='preview_file'),
     
     # Test URLs
     path('test/files/', views.test_file_access, name='test_file_access'),
@@ -84,6 +94,7 @@ urlpatterns = [
     path('examiner/certificates/', views.examiner_certificates, name='examiner_certificates'),
     path('examiner/approve-certificate/<int:certificate_id>/', views.approve_certificate_examiner, name='approve_certificate_examiner'),
     path('examiner/reject-certificate/<int:certificate_id>/', views.reject_certificate_examiner, name='reject_certificate_examiner'),
+    path('examiner/students/suggest/', views.examiner_student_suggestions, name='examiner_student_suggestions'),
     
     # Download URLs
     path('certificate/download/<int:certificate_id>/', views.download_certificate, name='download_certificate'),
@@ -92,4 +103,17 @@ urlpatterns = [
     path('hod/student/delete/<int:id>/', views.hod_delete_student, name='hod_delete_student'),
     path('hod/subjects/', views.hod_subject_list, name='hod_subject_list'),
     path('hod/subjects/renew/<int:subject_id>/', views.renew_practicals, name='renew_practicals'),
+
+    # Background jobs
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+
+    # Request timing summary and Prometheus metrics
+    path('performance/', views.performance_summary, name='performance_summary'),
+    path('metrics', views.metrics_view, name='metrics'),
+
+    # Full-text search (teachers, HODs, examiners)
+    path('search/', views.search_view, name='search'),
+
+    # Audit log timeline (admins, HODs)
+    path('audit/', views.audit_timeline, name='audit_timeline'),
 ]
\ No newline at end of file
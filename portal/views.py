@@ -1,24 +1,45 @@
+import hashlib
+import hmac
 import os
 from django.http import JsonResponse
-import zipfile
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.conf import settings
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, Http404, JsonResponse
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.core.files.base import ContentFile
 from django.utils import timezone
-from docx import Document
-from docx.shared import Inches
-from PIL import Image as PILImage
-from io import BytesIO
-from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, ExamMode, CertificateSubmission
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.db import transaction
+from django.db.models import Q
+from .models import CustomUser, Subject, Practical, PracticalSubmission, Certificate, ExamMode, CertificateSubmission, Job, ChunkedUpload
 from .forms import (StudentRegistrationForm, TeacherRegistrationForm, HODRegistrationForm, 
                    ExaminerCreationForm, CustomLoginForm, SubjectForm, PracticalForm, 
                    PracticalSubmissionForm, FeedbackForm, ExamModeForm, ExaminerSearchForm,CertificateSubmissionForm)
 from .forms import CustomLoginForm 
 from .utils import get_google_docs_viewer_url, get_file_extension, is_viewable_file, get_file_icon 
+from .file_serving import serve_file, serve_path
+from .previews import get_preview, is_previewable, PREVIEW_PDF
+from .tasks import request_preview
+from .jobs import enqueue
+from .pagination import keyset_page
+from .stats import admin_stats, department_stats
+from .exports import visible_submissions, stream_submissions_zip
+from .uploads import start_upload, write_chunk, complete_upload, received_chunks
+from .instrumentation import summary as timing_summary
+from .metrics import render_metrics
+from .exam_mode import is_exam_mode_enabled, get_exam_mode
+from .eligibility import student_eligibility, attach_eligibility
+from .reviews import bulk_review, REVIEW_ACTIONS
+from .workflow import transition
+from . import audit
+from .search import search_documents, result_json
+from .student_lookup import student_records, suggest_students
+from .reference_data import reference_data_response
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.shortcuts import render, redirect
@@ -27,28 +48,21 @@ from django.shortcuts import render, redirect
 
 
 def home(request):
-    """Home page showing public best practicals"""
-    
-    exam_modes = ExamMode.objects.filter(is_enabled=True)
+    """Home page; the same for every anonymous visitor, so browsers and the proxy may reuse it"""
+    response = render(request, 'portal/home.html')
 
-    if exam_modes.exists():
-        public_practicals = []
-    else:
-       
-        public_practicals = PracticalSubmission.objects.filter(
-            status='approved',
-            practical__is_public=True
-        ).select_related(
-            'student',
-            'practical',
-            'practical__subject',
-            'practical__teacher'
-        )
+    # A page that showed one-off messages must not be reused
+    if getattr(request, '_messages', None) is not None and request._messages.used:
+        patch_cache_control(response, private=True, no_store=True)
+        return response
 
-    return render(request, 'portal/home.html', {
-        'public_practicals': public_practicals,
-        'exam_mode_enabled': exam_modes.exists()
-    })
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'HOME_CACHE_MAX_AGE', 60))
+    return get_conditional_response(request, etag=etag, response=response)
 
 
 def student_login(request):
@@ -161,45 +175,35 @@ def student_dashboard(request):
         messages.error(request, 'Access denied')
         return redirect('home')
 
-    exam_mode_enabled = ExamMode.objects.filter(
-        department=request.user.department, is_enabled=True
-    ).exists()
+    exam_mode_enabled = is_exam_mode_enabled(request.user.department)
 
     subjects = Subject.objects.filter(
         department=request.user.department,
         student_class=request.user.student_class
     ).select_related('teacher')
 
-    practicals = Practical.objects.filter(
-        subject__in=subjects
-    ).select_related('subject').order_by('subject', 'number')
-    
-    print(f"Student: {request.user.full_name}")
-    print(f"Department: {request.user.department}")
-    print(f"Class: {request.user.student_class}")
-    print(f"Subjects found: {subjects.count()}")
-    print(f"Practicals found: {practicals.count()}")
-    
-    
-    submissions = PracticalSubmission.objects.filter(student=request.user).select_related('practical')
+    # Evaluate each list exactly once so the page costs a fixed number of
+    # queries regardless of how many practicals the student has.
+    practicals = list(
+        Practical.objects.filter(subject__in=subjects)
+        .select_related('subject')
+        .order_by('subject', 'number')
+    )
 
-  
-    practical_status = {practical.id: submissions.filter(practical=practical).first() for practical in practicals}
+    submissions = list(
+        PracticalSubmission.objects.filter(student=request.user)
+        .select_related('practical', 'practical__subject')
+    )
 
-    
-    certificates = Certificate.objects.filter(
-        student=request.user
-    ).select_related('subject', 'teacher', 'hod')
-    
-    
-    available_certificates = Certificate.objects.filter(
-        subject__in=subjects,
-        student__isnull=True,
-        status__in=['template_added', 'generated']
-    ).select_related('subject', 'teacher', 'hod')
-    
-   
-    all_certificates = certificates.union(available_certificates)
+    practical_status = {submission.practical_id: submission for submission in submissions}
+
+    # Own certificates plus the unassigned templates for the student's subjects
+    all_certificates = list(
+        Certificate.objects.filter(
+            Q(student=request.user) |
+            Q(subject__in=subjects, student__isnull=True, status__in=['template_added', 'generated'])
+        ).select_related('subject', 'teacher', 'hod')
+    )
 
     context = {
         'subjects': subjects,
@@ -222,38 +226,123 @@ def teacher_dashboard(request):
         return redirect('home')
     
     subjects = Subject.objects.filter(teacher=request.user)
-    practicals = Practical.objects.filter(teacher=request.user)
-    submissions = (
-        PracticalSubmission.objects.filter(
-            practical__teacher=request.user,
-            is_draft=False
+    practicals = Practical.objects.filter(teacher=request.user).select_related('subject')
+
+    # First page of each review list; the page fetches later pages from teacher_queue
+    page_size = getattr(settings, 'TEACHER_QUEUE_PAGE_SIZE', 25)
+    queues = {}
+    for queue in TEACHER_QUEUES:
+        rows, next_cursor = keyset_page(
+            teacher_queue_queryset(request.user, queue, {}), 'submitted_at', page_size=page_size
         )
-        .select_related('student', 'practical')
-    )
+        queues[queue] = {'results': [queue_row(queue, row) for row in rows], 'next_cursor': next_cursor}
 
-   
-    certificates = (
-        Certificate.objects.filter(teacher=request.user)
-        .select_related('subject')
-    )
-
-    
-    certificate_submissions = (
-        CertificateSubmission.objects.filter(certificate__teacher=request.user)
-        .select_related('student', 'certificate')
-    )
-
-    
     context = {
         'subjects': subjects,
         'practicals': practicals,
-        'submissions': submissions,
-        'certificates': certificates,
-        'certificate_submissions': certificate_submissions,
+        'queues': queues,
+        'jobs': recent_jobs(request.user),
     }
 
     return render(request, 'portal/dashboards/teacher_dashboard.html', context)
 
+# Teacher review lists, paginated by keyset (see pagination.py)
+
+TEACHER_QUEUES = ('pending', 'submissions', 'certificate_submissions')
+
+
+def teacher_queue_queryset(user, queue, filters):
+    """
+    Rows for one of the teacher dashboard lists, narrowed by the
+    optional status / subject / practical filters
+    """
+    status = filters.get('status')
+    subject_id = filters.get('subject')
+    practical_id = filters.get('practical')
+
+    if queue == 'certificate_submissions':
+        queryset = CertificateSubmission.objects.filter(
+            certificate__teacher=user
+        ).select_related('student', 'certificate', 'certificate__subject')
+        if status:
+            queryset = queryset.filter(status=status)
+        if subject_id:
+            queryset = queryset.filter(certificate__subject_id=subject_id)
+        return queryset
+
+    queryset = PracticalSubmission.objects.filter(
+        practical__teacher=user,
+        is_draft=False
+    ).select_related('student', 'practical', 'practical__subject')
+    if queue == 'pending':
+        status = 'submitted'
+    if status:
+        queryset = queryset.filter(status=status)
+    if subject_id:
+        queryset = queryset.filter(practical__subject_id=subject_id)
+    if practical_id:
+        queryset = queryset.filter(practical_id=practical_id)
+    return queryset
+
+
+def queue_row(queue, obj):
+    """JSON for one row of a teacher dashboard list"""
+    row = {
+        'id': obj.id,
+        'student': obj.student.full_name,
+        'roll_number': obj.student.roll_number,
+        'status': obj.status,
+        'status_display': obj.get_status_display(),
+        'submitted_at': obj.submitted_at.isoformat() if obj.submitted_at else None,
+    }
+
+    if queue == 'certificate_submissions':
+        row.update({
+            'subject': obj.certificate.subject.code,
+            'approve_url': reverse('approve_certificate_teacher', args=[obj.id]),
+            'reject_url': reverse('reject_certificate', args=[obj.id]),
+            'file_url': obj.file_path.url if obj.file_path else None,
+            'view_url': reverse('view_certificate', args=[obj.id]) if obj.file_path else None,
+        })
+        return row
+
+    row.update({
+        'practical_number': obj.practical.number,
+        'practical_title': obj.practical.title,
+        'subject': obj.practical.subject.code,
+        'review_url': reverse('review_submission', args=[obj.id]),
+        'approve_url': reverse('approve_submission', args=[obj.id]),
+        'reject_url': reverse('reject_submission', args=[obj.id]),
+        'download_url': reverse('download_submission', args=[obj.id]) if obj.file_path else None,
+    })
+    return row
+
+
+@login_required
+def teacher_queue(request, queue):
+    """One page of a teacher dashboard list as JSON (?cursor=&status=&subject=&practical=)"""
+    if request.user.role != 'teacher':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+    if queue not in TEACHER_QUEUES:
+        raise Http404("Unknown list")
+
+    filters = {key: request.GET.get(key) for key in ('status', 'subject', 'practical')}
+    if not all(value.isdigit() for key, value in filters.items() if key != 'status' and value):
+        return JsonResponse({'status': 'error', 'message': 'Invalid filter'}, status=400)
+
+    page_size = getattr(settings, 'TEACHER_QUEUE_PAGE_SIZE', 25)
+    try:
+        page_size = max(1, min(int(request.GET.get('page_size', page_size)), 100))
+        rows, next_cursor = keyset_page(
+            teacher_queue_queryset(request.user, queue, filters), 'submitted_at',
+            cursor=request.GET.get('cursor'), page_size=page_size
+        )
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    return JsonResponse({'results': [queue_row(queue, row) for row in rows], 'next_cursor': next_cursor})
+
+
 @login_required
 def hod_dashboard(request):
     if request.user.role != 'hod':
@@ -264,25 +353,37 @@ def hod_dashboard(request):
         messages.warning(request, 'Your department has not been assigned yet. Please contact admin.')
         return render(request, 'portal/dashboards/hod_dashboard.html', {'no_department': True})
     
-    students = CustomUser.objects.filter(role='student', department=request.user.department)
-    teachers = CustomUser.objects.filter(role='teacher', department=request.user.department)
-    subjects = Subject.objects.filter(department=request.user.department)
-    certificates = Certificate.objects.filter(
+    # Lists are evaluated here so the template never issues its own queries.
+    # Students are shown a page at a time (totals come from the cached stats);
+    # teachers only fill the renew dropdown, so only their names are loaded.
+    try:
+        students, next_cursor = keyset_page(
+            CustomUser.objects.filter(role='student', department=request.user.department), 'date_joined',
+            cursor=request.GET.get('cursor'), page_size=getattr(settings, 'HOD_STUDENT_PAGE_SIZE', 50)
+        )
+    except ValueError:
+        return redirect('hod_dashboard')
+    teachers = list(CustomUser.objects.filter(
+        role='teacher', department=request.user.department
+    ).only('id', 'full_name').order_by('full_name'))
+    subjects = list(Subject.objects.filter(department=request.user.department).select_related('teacher'))
+    certificates = attach_eligibility(list(Certificate.objects.filter(
         subject__department=request.user.department,
         status='sent_to_hod'
-    ).select_related('student', 'subject', 'teacher')
+    ).select_related('student', 'subject', 'teacher')))
     
-    exam_mode, created = ExamMode.objects.get_or_create(
-        department=request.user.department,
-        defaults={'is_enabled': False}
-    )
+    exam_mode = get_exam_mode(request.user.department)
     
     return render(request, 'portal/dashboards/hod_dashboard.html', {
         'students': students,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
         'teachers': teachers,
         'subjects': subjects,
         'certificates': certificates,
-        'exam_mode': exam_mode
+        'exam_mode': exam_mode,
+        'stats': department_stats(request.user.department),
+        'jobs': recent_jobs(request.user),
     })
 
 @login_required
@@ -291,20 +392,20 @@ def admin_dashboard(request):
         messages.error(request, 'Access denied')
         return redirect('home')
     
-    students = CustomUser.objects.filter(role='student')
-    teachers = CustomUser.objects.filter(role='teacher')
-    hods = CustomUser.objects.filter(role='hod')
-    examiners = CustomUser.objects.filter(role='examiner')
-    subjects = Subject.objects.all()
-    submissions = PracticalSubmission.objects.filter(is_draft=False)
+    # Totals come from one cached aggregate query; only the rows the
+    # template lists are loaded, all of them here rather than lazily.
+    stats = admin_stats()
+    students = list(CustomUser.objects.filter(role='student')[:10])
+    teachers = list(CustomUser.objects.filter(role='teacher'))
+    hods = list(CustomUser.objects.filter(role='hod'))
+    subjects = list(Subject.objects.select_related('teacher'))
     
     return render(request, 'portal/dashboards/admin_dashboard.html', {
+        'stats': stats,
         'students': students,
         'teachers': teachers,
         'hods': hods,
-        'examiners': examiners,
         'subjects': subjects,
-        'submissions': submissions
     })
 
 
@@ -316,51 +417,43 @@ def examiner_dashboard(request):
     
     form = ExaminerSearchForm(request.POST or None)
     student_data = None
+    batch = None
     
     if request.method == 'POST' and form.is_valid():
         department = form.cleaned_data.get('department')
         student_class = form.cleaned_data.get('student_class')
-        roll_number = form.cleaned_data.get('roll_number').strip() if form.cleaned_data.get('roll_number') else None
+        roll_numbers = form.roll_numbers()
+        whole_class = form.cleaned_data.get('whole_class')
         subject = form.cleaned_data.get('subject')
+        limit = getattr(settings, 'EXAMINER_BATCH_MAX', 200)
 
-      
-        if not department or not student_class or not roll_number:
+        if not department or not student_class or not (roll_numbers or whole_class):
             messages.error(request, 'Please provide Department, Class, and Roll Number')
+        elif len(roll_numbers) > limit:
+            messages.error(request, f'At most {limit} roll numbers at a time')
         else:
-           
-            student = CustomUser.objects.filter(
-                role='student',
-                department=department,
-                student_class=student_class,
-                roll_number=roll_number
-            ).first()
-
-            if not student:
-                messages.error(request, 'No student found with the given details')
-            else:
-               
-                submissions = PracticalSubmission.objects.filter(student=student)
-                if subject:
-                    submissions = submissions.filter(practical__subject=subject)
-                submissions = submissions.select_related('practical', 'practical__subject')
-
-                
-                certificate = None
-                if subject:
-                    certificate = Certificate.objects.filter(student=student, subject=subject).first()
-                else:
-                    certificate = Certificate.objects.filter(student=student).first()
+            # Submissions and certificates for every student in a fixed number of queries
+            students = student_records(department, student_class, None if whole_class else roll_numbers, subject)
 
-                
+            if not students:
+                messages.error(request, 'No student found with the given details')
+            elif len(students) == 1 and not whole_class and len(roll_numbers) == 1:
+                student = students[0]
                 student_data = {
                     'student': student,
-                    'submissions': submissions,
-                    'certificate': certificate
+                    'submissions': student.records_submissions,
+                    'certificate': student.records_certificate
                 }
+            else:
+                batch = students
+                missing = [] if whole_class else sorted(set(roll_numbers) - {student.roll_number for student in students})
+                if missing:
+                    messages.warning(request, f"No student found for roll number(s): {', '.join(missing)}")
 
     context = {
         'form': form,
-        'student_data': student_data
+        'student_data': student_data,
+        'batch': batch,
     }
 
     return render(request, 'portal/dashboards/examiner_dashboard.html', context)
@@ -476,6 +569,8 @@ def submit_practical(request, practical_id):
                 practical_submission.status = 'draft'
 
             practical_submission.save()
+            if 'file_path' in form.changed_data:
+                request_preview('submission', practical_submission)
             return redirect('student_dashboard')
     else:
         form = PracticalSubmissionForm(instance=submission)
@@ -486,6 +581,88 @@ def submit_practical(request, practical_id):
         'form': form
     }
     return render(request, 'portal/practicals/submit_practical.html', context)
+
+
+# Resumable chunked uploads for submit_practical (see portal/uploads.py)
+
+def upload_json(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'status': upload.status,
+        'chunk_size': upload.chunk_size,
+        'total_chunks': upload.total_chunks,
+        'received': received_chunks(upload),
+    }
+
+
+def get_student_upload(request, upload_id):
+    return get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+
+
+@login_required
+def start_chunked_upload(request, practical_id):
+    """Open (or resume) a chunked upload for the student's submission"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+    if request.user.role != 'student':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+
+    practical = get_object_or_404(Practical, id=practical_id)
+    submission, created = PracticalSubmission.objects.get_or_create(
+        student=request.user,
+        practical=practical
+    )
+    if not submission.is_draft and submission.status != 'rejected':
+        return JsonResponse({'status': 'error', 'message': 'Practical already submitted'}, status=400)
+
+    try:
+        upload = start_upload(
+            request.user, submission,
+            filename=request.POST.get('filename', ''),
+            size=int(request.POST.get('size', 0)),
+            checksum=request.POST.get('checksum', '').lower(),
+        )
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(upload_json(upload))
+
+
+@login_required
+def chunked_upload_status(request, upload_id):
+    """Chunks received so far, so a reconnecting client can resume"""
+    return JsonResponse(upload_json(get_student_upload(request, upload_id)))
+
+
+@login_required
+def upload_chunk(request, upload_id, index):
+    """Store one chunk; the body is the raw bytes, X-Chunk-Checksum their SHA-256"""
+    if request.method != 'PUT':
+        return JsonResponse({'status': 'error', 'message': 'PUT required'}, status=405)
+    upload = get_student_upload(request, upload_id)
+
+    try:
+        write_chunk(upload, index, request, request.headers.get('X-Chunk-Checksum', ''))
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'ok', 'index': index})
+
+
+@login_required
+def complete_chunked_upload(request, upload_id):
+    """Assemble the chunks and attach the file to the submission"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+    upload = get_student_upload(request, upload_id)
+
+    try:
+        submission = complete_upload(upload, final_submit=request.POST.get('action') == 'final_submit')
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e), **upload_json(upload)}, status=400)
+
+    request_preview('submission', submission)
+    return JsonResponse({'status': 'ok', 'redirect': reverse('student_dashboard')})
+
+
 @login_required
 def review_submission(request, submission_id):
     if request.user.role != 'teacher':
@@ -493,13 +670,14 @@ def review_submission(request, submission_id):
         return redirect('home')
     
     submission = get_object_or_404(
-        PracticalSubmission,
+        PracticalSubmission.objects.select_related('practical__subject'),
         id=submission_id,
         practical__teacher=request.user
     )
     
     if request.method == 'POST':
         action = request.POST.get('action')
+        previous = submission.status
         feedback_form = FeedbackForm(request.POST)
         
         if feedback_form.is_valid():
@@ -513,10 +691,17 @@ def review_submission(request, submission_id):
             
             elif action == 'reject':
                 submission.status = 'rejected'
+                submission.approved_at = None
                 submission.feedback = feedback
                 messages.success(request, 'Submission rejected ❌')
             
             submission.save()
+            if submission.status != previous:
+                audit.record(
+                    'submission_reviewed', actor=request.user, student=submission.student_id,
+                    subject=submission.practical.subject, target=submission,
+                    from_status=previous, to_status=submission.status
+                )
             return redirect('teacher_dashboard')
     else:
         feedback_form = FeedbackForm()
@@ -536,6 +721,44 @@ def review_submission(request, submission_id):
     })
     
 
+@login_required
+def bulk_review_submissions(request):
+    """
+    Approve or reject several submissions in one request (AJAX POST):
+    submission_ids (repeated), action, feedback, optional feedback_<id>
+    """
+    if request.user.role != 'teacher':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+
+    action = request.POST.get('action')
+    if action not in REVIEW_ACTIONS:
+        return JsonResponse({'status': 'error', 'message': 'Unknown action'}, status=400)
+
+    submission_ids = request.POST.getlist('submission_ids')
+    if not submission_ids or not all(value.isdigit() for value in submission_ids):
+        return JsonResponse({'status': 'error', 'message': 'Select at least one submission'}, status=400)
+    limit = getattr(settings, 'BULK_REVIEW_MAX', 500)
+    if len(submission_ids) > limit:
+        return JsonResponse({'status': 'error', 'message': f'At most {limit} submissions at a time'}, status=400)
+
+    submission_ids = [int(value) for value in submission_ids]
+    item_feedback = {
+        pk: request.POST[f'feedback_{pk}'] for pk in submission_ids if f'feedback_{pk}' in request.POST
+    }
+    updated, skipped = bulk_review(
+        request.user, submission_ids, action,
+        feedback=request.POST.get('feedback', ''), item_feedback=item_feedback
+    )
+    return JsonResponse({
+        'status': 'success',
+        'new_status': REVIEW_ACTIONS[action],
+        'updated': updated,
+        'skipped': skipped,
+    })
+
+
 # ================= Certificate Management =================
 
 # ================= Certificate Management =================
@@ -550,42 +773,22 @@ def add_certificate(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id, teacher=request.user)
 
     if request.method == 'POST':
-        if Certificate.objects.filter(subject=subject, teacher=request.user).exists():
+        if Certificate.objects.filter(subject=subject, teacher=request.user, student__isnull=True).exists():
             messages.warning(request, 'Certificate already added for this subject')
         else:
-            # Create certificate template
-            certificate = Certificate.objects.create(
+            # Create certificate template with its file (if provided) in one save
+            certificate = Certificate(
                 subject=subject,
                 teacher=request.user,
-                status='template_added'
-            )
-            
-            # Handle file upload if provided
-            if 'certificate_file' in request.FILES:
-                certificate.file_path = request.FILES['certificate_file']
-                certificate.save()
-            
-            # Create individual certificates for all students in this subject
-            students = CustomUser.objects.filter(
-                role='student',
-                department=subject.department,
-                student_class=subject.student_class
+                status='template_added',
+                file_path=request.FILES.get('certificate_file'),
             )
+            certificate.save()
             
-            for student in students:
-                # Create individual certificate for each student
-                student_certificate = Certificate.objects.create(
-                    student=student,
-                    subject=subject,
-                    teacher=request.user,
-                    status='generated'
-                )
-                # Copy template file if available
-                if certificate.file_path:
-                    student_certificate.file_path = certificate.file_path
-                    student_certificate.save()
+            # Per-student certificates are generated by the background worker
+            enqueue('certificates.generate', {'template_id': certificate.id}, user=request.user)
             
-            messages.success(request, f'Certificate template for {subject.name} added successfully ✅ Certificates generated for {students.count()} students.')
+            messages.success(request, f'Certificate template for {subject.name} added successfully ✅ Certificates are being generated for all students.')
         return redirect('teacher_dashboard')
 
     return render(request, 'portal/certificates/teacher_add_certificate.html', {
@@ -607,21 +810,12 @@ def send_certificate(request, certificate_id):
         certificate.save()
 
     # Check all practicals approved
-    practicals = Practical.objects.filter(subject=certificate.subject)
-    approved_count = PracticalSubmission.objects.filter(
-        student=request.user,
-        practical__subject=certificate.subject,
-        status='approved'
-    ).count()
-
-    if approved_count < practicals.count():
+    if not student_eligibility(request.user, certificate.subject).eligible:
         messages.error(request, 'Complete all practicals before sending certificate')
         return redirect('student_dashboard')
 
     # Update status if allowed
-    if certificate.status in ['generated', 'template_added']:
-        certificate.status = 'submitted_to_teacher'
-        certificate.save()
+    if transition(certificate, 'send', actor=request.user):
         messages.success(request, 'Certificate sent to Teacher for approval ✅')
     else:
         messages.error(request, 'Certificate already processed')
@@ -667,14 +861,12 @@ def approve_certificate_teacher(request, certificate_id):
         return redirect('home')
 
     # ✅ Fetch certificate assigned to the current teacher
-    certificate = get_object_or_404(Certificate, id=certificate_id, teacher=request.user)
+    certificate = get_object_or_404(
+        Certificate.objects.select_related('student', 'subject'), id=certificate_id, teacher=request.user
+    )
 
     # ✅ Allow approval only if certificate is submitted or sent to teacher
-    if certificate.status in ['submitted_to_teacher', 'sent_to_teacher']:
-        certificate.status = 'sent_to_hod'
-        certificate.approved_at = timezone.now()
-        certificate.save()
-
+    if transition(certificate, 'teacher_approve', actor=request.user):
         # ✅ Success message with student name
         student_name = certificate.student.username if certificate.student else "Unknown Student"
         messages.success(
@@ -697,9 +889,13 @@ def teacher_certificates(request):
         messages.error(request, 'Access denied')
         return redirect('home')
 
-    certificates = Certificate.objects.filter(teacher=request.user).order_by('-created_at')
+    certificates = list(
+        Certificate.objects.filter(teacher=request.user)
+        .select_related('subject', 'student')
+        .order_by('-created_at')
+    )
     return render(request, 'portal/certificates/teacher_certificates.html', {
-        'certificates': certificates
+        'certificates': attach_eligibility(certificates)
     })
 
 
@@ -711,18 +907,16 @@ def approve_certificate_hod(request, certificate_id):
         return redirect('home')
 
     certificate = get_object_or_404(
-        Certificate, 
+        Certificate.objects.select_related('subject'),
         id=certificate_id, 
         subject__department=request.user.department,
         status='sent_to_hod'
     )
 
-    certificate.status = 'sent_to_examiner'
-    certificate.hod = request.user
-    certificate.approved_at = timezone.now()
-    certificate.save()
-
-    messages.success(request, 'Certificate approved and sent to Examiner for final certification ✅')
+    if transition(certificate, 'hod_approve', actor=request.user, hod=request.user):
+        messages.success(request, 'Certificate approved and sent to Examiner for final certification ✅')
+    else:
+        messages.warning(request, 'Certificate was already processed')
     return redirect('hod_dashboard')
 @login_required
 def reject_certificate(request, certificate_id):
@@ -732,11 +926,11 @@ def reject_certificate(request, certificate_id):
         messages.error(request, 'Access denied')
         return redirect('home')
 
-    certificate = get_object_or_404(Certificate, id=certificate_id, teacher=request.user)
+    certificate = get_object_or_404(
+        Certificate.objects.select_related('student', 'subject'), id=certificate_id, teacher=request.user
+    )
 
-    if certificate.status == 'submitted_to_teacher':
-        certificate.status = 'rejected'
-        certificate.save()
+    if transition(certificate, 'teacher_reject', actor=request.user):
         messages.success(request, f'Certificate for {certificate.student.username} rejected ❌')
     else:
         messages.warning(request, f'Certificate cannot be rejected at this stage. Current status: {certificate.get_status_display()}')
@@ -752,12 +946,11 @@ def approve_certificate_teacher_ajax(request, certificate_id):
     if request.user.role != 'teacher':
         return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
 
-    certificate = get_object_or_404(Certificate, id=certificate_id, teacher=request.user)
+    certificate = get_object_or_404(
+        Certificate.objects.select_related('subject'), id=certificate_id, teacher=request.user
+    )
 
-    if certificate.status == 'submitted_to_teacher':
-        certificate.status = 'sent_to_hod'
-        certificate.approved_at = timezone.now()
-        certificate.save()
+    if transition(certificate, 'teacher_approve', actor=request.user):
         return JsonResponse({'status': 'success', 'new_status': certificate.get_status_display()})
     else:
         return JsonResponse({'status': 'error', 'message': 'Cannot approve at this stage'}, status=400)
@@ -769,11 +962,11 @@ def reject_certificate_ajax(request, certificate_id):
     if request.user.role != 'teacher':
         return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
 
-    certificate = get_object_or_404(Certificate, id=certificate_id, teacher=request.user)
+    certificate = get_object_or_404(
+        Certificate.objects.select_related('subject'), id=certificate_id, teacher=request.user
+    )
 
-    if certificate.status == 'submitted_to_teacher':
-        certificate.status = 'rejected'
-        certificate.save()
+    if transition(certificate, 'teacher_reject', actor=request.user):
         return JsonResponse({'status': 'success', 'new_status': certificate.get_status_display()})
     else:
         return JsonResponse({'status': 'error', 'message': 'Cannot reject at this stage'}, status=400)
@@ -783,19 +976,25 @@ def toggle_exam_mode(request):
         messages.error(request, 'Access denied')
         return redirect('home')
     
-    exam_mode, created = ExamMode.objects.get_or_create(
-        department=request.user.department,
-        defaults={'is_enabled': False}
-    )
-    
     if request.method == 'POST':
+        # The row is only created when the HOD actually changes the setting
+        exam_mode, created = ExamMode.objects.get_or_create(
+            department=request.user.department,
+            defaults={'is_enabled': False}
+        )
+        was_enabled = exam_mode.is_enabled
         form = ExamModeForm(request.POST, instance=exam_mode)
         if form.is_valid():
             form.save()
             status = 'enabled' if exam_mode.is_enabled else 'disabled'
+            audit.record(
+                'exam_mode_toggled', actor=request.user, department=exam_mode.department, target=exam_mode,
+                from_status='enabled' if was_enabled else 'disabled', to_status=status
+            )
             messages.success(request, f'Exam mode {status} for {exam_mode.get_department_display()}')
             return redirect('hod_dashboard')
     else:
+        exam_mode = get_exam_mode(request.user.department)
         form = ExamModeForm(instance=exam_mode)
     
     return render(request, 'portal/exam_mode.html', {'form': form, 'exam_mode': exam_mode})
@@ -863,13 +1062,28 @@ def create_examiner(request):
 # AJAX Views
 @login_required
 def get_subjects_by_department(request):
+    """
+    Subjects of ?department= for dropdowns, or of every department with
+    ?all=1 (to preload), served from the versioned reference data cache
+    """
+    if request.GET.get('all'):
+        def load():
+            departments = {}
+            for subject in Subject.objects.order_by('department', 'name', 'id').values('id', 'name', 'code', 'department'):
+                departments.setdefault(subject.pop('department'), []).append(subject)
+            return {'departments': departments}
+
+        return reference_data_response(request, 'subjects', '*', load)
+
     department = request.GET.get('department')
-    if department:
-        subjects = Subject.objects.filter(department=department).values('id', 'name', 'code')
-        subjects_list = list(subjects)
-    else:
-        subjects_list = []
-    return JsonResponse({'subjects': subjects_list})
+    if not department:
+        return JsonResponse({'subjects': []})
+
+    def load():
+        subjects = Subject.objects.filter(department=department).order_by('name', 'id').values('id', 'name', 'code')
+        return {'subjects': list(subjects)}
+
+    return reference_data_response(request, 'subjects', department, load)
 # File download views
 @login_required
 def download_submission(request, submission_id):
@@ -886,35 +1100,61 @@ def download_submission(request, submission_id):
         raise Http404("File not found")
     
     try:
-        # Check if file exists
-        if not os.path.exists(submission.file_path.path):
-            raise Http404("File not found on server")
-        
-        # Get file extension and set appropriate content type
-        file_extension = get_file_extension(submission.file_path.name)
-        
-        content_type_map = {
-            '.pdf': 'application/pdf',
-            '.doc': 'application/msword',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            
-        }
-        
-        content_type = content_type_map.get(file_extension, 'application/octet-stream')
-        
-        # Read file in binary mode
-        with open(submission.file_path.path, 'rb') as file:
-            file_data = file.read()
-        
-        response = HttpResponse(file_data, content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(submission.file_path.name)}"'
-        response['Content-Length'] = len(file_data)
-        return response
+        return serve_file(request, submission.file_path, as_attachment=True)
         
     except Exception as e:
         messages.error(request, f'Error downloading file: {str(e)}')
         return redirect(request.META.get('HTTP_REFERER', 'home'))
 
+@login_required
+def export_submissions(request, practical_id=None, subject_id=None):
+    """
+    Stream a ZIP of submitted practicals for one practical, one subject, or
+    one class (?department=&student_class=). Add ?manifest=1 for a CSV index.
+    """
+    if request.user.role not in ['teacher', 'hod', 'examiner', 'admin']:
+        messages.error(request, 'Access denied')
+        return redirect('home')
+
+    submissions = visible_submissions(request.user)
+    if practical_id:
+        practical = get_object_or_404(Practical.objects.select_related('subject'), id=practical_id)
+        submissions = submissions.filter(practical=practical)
+        archive_name = f"{practical.subject.code}_P{practical.number}"
+    elif subject_id:
+        subject = get_object_or_404(Subject, id=subject_id)
+        submissions = submissions.filter(practical__subject=subject)
+        archive_name = subject.code
+    else:
+        department = request.GET.get('department')
+        student_class = request.GET.get('student_class')
+        if not department or not student_class:
+            messages.error(request, 'Please provide Department and Class')
+            return redirect(request.META.get('HTTP_REFERER', 'home'))
+        submissions = submissions.filter(
+            practical__subject__department=department,
+            practical__subject__student_class=student_class
+        )
+        archive_name = f"{department}_{student_class}".replace(' ', '_')
+
+    submissions = submissions.select_related(
+        'student', 'practical', 'practical__subject'
+    ).order_by('practical__subject__code', 'practical__number', 'student__roll_number', 'id')
+
+    response = StreamingHttpResponse(
+        stream_submissions_zip(
+            submissions.iterator(),
+            folder_per_subject=not (practical_id or subject_id),
+            include_manifest=request.GET.get('manifest') == '1'
+        ),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{archive_name}_submissions.zip"'
+    # Let nginx pass bytes on as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def download_certificate(request, certificate_id):
     certificate = get_object_or_404(Certificate, id=certificate_id)
@@ -934,48 +1174,55 @@ def download_certificate(request, certificate_id):
         raise Http404("Certificate file not found")
     
     try:
-        # Check if file exists
-        if not os.path.exists(certificate.file_path.path):
-            raise Http404("Certificate file not found on server")
-        
-        # Get file extension and set appropriate content type
-        file_extension = get_file_extension(certificate.file_path.name)
-        
-        content_type_map = {
-            '.pdf': 'application/pdf',
-            '.doc': 'application/msword',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            
-        }
-        
-        content_type = content_type_map.get(file_extension, 'application/octet-stream')
-        
-        # Read file in binary mode
-        with open(certificate.file_path.path, 'rb') as file:
-            file_data = file.read()
-        
-        response = HttpResponse(file_data, content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(certificate.file_path.name)}"'
-        response['Content-Length'] = len(file_data)
-        return response
+        return serve_file(request, certificate.file_path, as_attachment=True)
         
     except Exception as e:
         messages.error(request, f'Error downloading certificate: {str(e)}')
         return redirect(request.META.get('HTTP_REFERER', 'home'))
-@login_required    
+@login_required
 def approve_submission(request, submission_id):
-    submission = get_object_or_404(PracticalSubmission, id=submission_id)
-    submission.status = "approved"
+    if request.user.role != 'teacher':
+        messages.error(request, "You are not authorized to approve this submission.")
+        return redirect('home')
+
+    submission = get_object_or_404(
+        PracticalSubmission.objects.select_related('practical__subject'),
+        id=submission_id,
+        practical__teacher=request.user
+    )
+    previous = submission.status
+    submission.status = 'approved'
+    submission.approved_at = timezone.now()
     submission.save()
+    if previous != 'approved':
+        audit.record(
+            'submission_reviewed', actor=request.user, student=submission.student_id,
+            subject=submission.practical.subject, target=submission, from_status=previous, to_status='approved'
+        )
+    messages.success(request, "Submission approved successfully.")
+    return redirect('teacher_dashboard')
+
 @login_required
 def reject_submission(request, submission_id):
-    submission = get_object_or_404(PracticalSubmission, id=submission_id)
-    if request.user.role == 'teacher':   # ✅ फक्त teacher ला reject करु दे
-        submission.status = 'rejected'
-        submission.save()
-        messages.success(request, "Submission rejected successfully.")
-    else:
+    if request.user.role != 'teacher':   # ✅ फक्त teacher ला reject करु दे
         messages.error(request, "You are not authorized to reject this submission.")
+        return redirect('home')
+
+    submission = get_object_or_404(
+        PracticalSubmission.objects.select_related('practical__subject'),
+        id=submission_id,
+        practical__teacher=request.user
+    )
+    previous = submission.status
+    submission.status = 'rejected'
+    submission.approved_at = None
+    submission.save()
+    if previous != 'rejected':
+        audit.record(
+            'submission_reviewed', actor=request.user, student=submission.student_id,
+            subject=submission.practical.subject, target=submission, from_status=previous, to_status='rejected'
+        )
+    messages.success(request, "Submission rejected successfully.")
     return redirect('teacher_dashboard')
 
 def login_selection(request):
@@ -1025,17 +1272,11 @@ def submit_certificate_form(request, certificate_id):
         return redirect('student_dashboard')
 
     # Check practical completion
-    practicals = Practical.objects.filter(subject=certificate.subject)
-    approved_count = PracticalSubmission.objects.filter(
-        student=request.user,
-        practical__subject=certificate.subject,
-        status='approved'
-    ).count()
-
-    if approved_count < practicals.count():
+    eligibility = student_eligibility(request.user, certificate.subject)
+    if not eligibility.eligible:
         messages.error(
             request,
-            f'Complete all {practicals.count()} practicals before submitting certificate. You have completed {approved_count}.'
+            f'Complete all {eligibility.total} practicals before submitting certificate. You have completed {eligibility.approved}.'
         )
         return redirect('student_dashboard')
 
@@ -1051,18 +1292,18 @@ def submit_certificate_form(request, certificate_id):
                     certificate.student = request.user
                     certificate.save()
 
-            # Create new submission
-            submission = form.save(commit=False)
-            submission.student = request.user
-            submission.certificate = certificate
-            submission.status = 'pending'
-            submission.submitted_at = timezone.now()
-            submission.save()
+            # Move the certificate first; the upload is only kept if that wins
+            with transaction.atomic():
+                if not transition(certificate, 'submit', actor=request.user):
+                    messages.error(request, 'Certificate already processed')
+                    return redirect('student_dashboard')
 
-            # Update certificate status
-            certificate.status = 'submitted_to_teacher'
-            certificate.submitted_at = timezone.now()
-            certificate.save()
+                submission = form.save(commit=False)
+                submission.student = request.user
+                submission.certificate = certificate
+                submission.status = 'pending'
+                submission.submitted_at = timezone.now()
+                submission.save()
 
             messages.success(request, 'Certificate submitted successfully ✅')
             return redirect('student_dashboard')
@@ -1074,11 +1315,74 @@ def submit_certificate_form(request, certificate_id):
     context = {
         'form': form,
         'certificate': certificate,
-        'practicals_count': practicals.count(),
-        'approved_count': approved_count,
+        'practicals_count': eligibility.total,
+        'approved_count': eligibility.approved,
     }
     return render(request, 'portal/certificates/submit_certificate_form.html', context)
 
+# ================= Document Viewer =================
+
+def preview_context(file_type, obj, file_url):
+    """
+    Viewer context for an upload: the locally rendered preview when it is
+    cached, otherwise the original file (and a queued render). Google Docs
+    is only offered for types we cannot preview ourselves.
+    """
+    preview = get_preview(obj.file_path)
+    if preview is None:
+        request_preview(file_type, obj)
+        return {
+            'preview_pdf_url': None,
+            'thumbnail_urls': [],
+            'google_viewer_url': None if is_previewable(obj.file_path.name) else get_google_docs_viewer_url(file_url),
+        }
+
+    return {
+        'preview_pdf_url': reverse('preview_file', args=[file_type, obj.pk, PREVIEW_PDF]),
+        'thumbnail_urls': [reverse('preview_file', args=[file_type, obj.pk, name]) for name in preview.thumbnails],
+        'google_viewer_url': None,
+    }
+
+
+def get_preview_object(request, file_type, file_id):
+    """Load an upload for preview if the user may view it, else None"""
+    user = request.user
+    if file_type == 'submission':
+        obj = get_object_or_404(PracticalSubmission.objects.select_related('practical__subject'), id=file_id)
+        subject, owner = obj.practical.subject, obj.student_id
+    elif file_type == 'certificate':
+        obj = get_object_or_404(Certificate.objects.select_related('subject'), id=file_id)
+        subject, owner = obj.subject, obj.student_id
+    elif file_type == 'certificate_submission':
+        obj = get_object_or_404(CertificateSubmission.objects.select_related('certificate__subject'), id=file_id)
+        subject, owner = obj.certificate.subject, obj.student_id
+    else:
+        raise Http404("Invalid file type")
+
+    allowed = (
+        user.role == 'admin' or
+        (user.role == 'student' and owner == user.id) or
+        (user.role == 'teacher' and subject.teacher_id == user.id) or
+        (user.role in ['hod', 'examiner'] and subject.department == user.department)
+    )
+    return obj if allowed else None
+
+
+@login_required
+def preview_file(request, file_type, file_id, artifact):
+    """Serve a rendered preview PDF or thumbnail from the preview cache"""
+    obj = get_preview_object(request, file_type, file_id)
+    if obj is None:
+        messages.error(request, 'Access denied')
+        return redirect('home')
+
+    preview = get_preview(obj.file_path)
+    if preview is None or (artifact != PREVIEW_PDF and artifact not in preview.thumbnails):
+        raise Http404("Preview not available")
+
+    return serve_path(request, os.path.join(preview.directory, artifact), artifact)
+
+
 # ================= Google Docs Viewer =================
 
 @login_required
@@ -1105,18 +1409,12 @@ def view_practical_submission(request, submission_id):
     try:
         # Use direct media URL instead of build_absolute_uri
         file_url = f"{request.scheme}://{request.get_host()}{submission.file_path.url}"
-        google_viewer_url = get_google_docs_viewer_url(file_url)
-        
-        # Debug info
-        print(f"File URL: {file_url}")
-        print(f"Google Viewer URL: {google_viewer_url}")
-        
     except Exception as e:
         messages.error(request, f'Error generating file URL: {str(e)}')
         return redirect(request.META.get('HTTP_REFERER', 'home'))
     
     context = {
-        'google_viewer_url': google_viewer_url,
+        **preview_context('submission', submission, file_url),
         'file_url': file_url,
         'file_id': submission_id,
         'document_title': f"Practical Submission - {submission.practical.title}",
@@ -1154,18 +1452,12 @@ def view_certificate(request, certificate_id):
     try:
         # Use direct media URL instead of build_absolute_uri
         file_url = f"{request.scheme}://{request.get_host()}{certificate.file_path.url}"
-        google_viewer_url = get_google_docs_viewer_url(file_url)
-        
-        # Debug info
-        print(f"Certificate File URL: {file_url}")
-        print(f"Certificate Google Viewer URL: {google_viewer_url}")
-        
     except Exception as e:
         messages.error(request, f'Error generating certificate URL: {str(e)}')
         return redirect(request.META.get('HTTP_REFERER', 'home'))
     
     context = {
-        'google_viewer_url': google_viewer_url,
+        **preview_context('certificate_submission', certificate, file_url),
         'file_url': file_url,
         'file_id': certificate_id,
         'document_title': f"Certificate - {certificate.certificate.subject.name}",
@@ -1205,19 +1497,16 @@ def approve_certificate_examiner(request, certificate_id):
         return redirect('home')
 
     certificate = get_object_or_404(
-        Certificate, 
+        Certificate.objects.select_related('student', 'subject'),
         id=certificate_id, 
         subject__department=request.user.department,
         status='sent_to_examiner'
     )
 
-    certificate.status = 'certified'
-    certificate.examiner = request.user
-    certificate.examiner_approved_at = timezone.now()
-    certificate.certified_at = timezone.now()
-    certificate.save()
-
-    messages.success(request, f'Certificate for {certificate.student.full_name} certified successfully ✅')
+    if transition(certificate, 'examiner_approve', actor=request.user, examiner=request.user):
+        messages.success(request, f'Certificate for {certificate.student.full_name} certified successfully ✅')
+    else:
+        messages.warning(request, 'Certificate was already processed')
     return redirect('examiner_certificates')
 
 @login_required
@@ -1228,17 +1517,16 @@ def reject_certificate_examiner(request, certificate_id):
         return redirect('home')
 
     certificate = get_object_or_404(
-        Certificate, 
+        Certificate.objects.select_related('student', 'subject'),
         id=certificate_id, 
         subject__department=request.user.department,
         status='sent_to_examiner'
     )
 
-    certificate.status = 'rejected'
-    certificate.examiner = request.user
-    certificate.save()
-
-    messages.success(request, f'Certificate for {certificate.student.full_name} rejected ❌')
+    if transition(certificate, 'examiner_reject', actor=request.user, examiner=request.user):
+        messages.success(request, f'Certificate for {certificate.student.full_name} rejected ❌')
+    else:
+        messages.warning(request, 'Certificate was already processed')
     return redirect('examiner_certificates')
 
 # ================= File Test View =================
@@ -1292,30 +1580,7 @@ def serve_file_direct(request, file_type, file_id):
         raise Http404("File not found")
     
     try:
-        # Check if file exists
-        if not os.path.exists(obj.file_path.path):
-            raise Http404("File not found on server")
-        
-        # Get file extension and set appropriate content type
-        file_extension = get_file_extension(obj.file_path.name)
-        
-        content_type_map = {
-            '.pdf': 'application/pdf',
-            '.doc': 'application/msword',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-          
-        }
-        
-        content_type = content_type_map.get(file_extension, 'application/octet-stream')
-        
-        # Read file in binary mode
-        with open(obj.file_path.path, 'rb') as file:
-            file_data = file.read()
-        
-        response = HttpResponse(file_data, content_type=content_type)
-        response['Content-Disposition'] = f'inline; filename="{os.path.basename(obj.file_path.name)}"'
-        response['Content-Length'] = len(file_data)
-        return response
+        return serve_file(request, obj.file_path, as_attachment=False)
         
     except Exception as e:
         messages.error(request, f'Error serving file: {str(e)}')
@@ -1377,7 +1642,13 @@ def hod_delete_student(request, id):
         return redirect("home")
 
     student = get_object_or_404(CustomUser, id=id, role="student")
-    student.delete()
+    with transaction.atomic():
+        audit.record(
+            'student_deleted', actor=request.user, student=student, target=student,
+            username=student.username, full_name=student.full_name,
+            roll_number=student.roll_number, student_class=student.student_class
+        )
+        student.delete()
 
     return redirect("hod_dashboard")
 
@@ -1407,22 +1678,7 @@ def renew_practicals(request, subject_id):
 
     if request.method == 'POST':
 
-        # 1) DELETE Certificate Submissions FIRST (child table)
-        CertificateSubmission.objects.filter(
-            certificate__subject=subject
-        ).delete()
-
-        # 2) DELETE Certificates
-        Certificate.objects.filter(
-            subject=subject
-        ).delete()
-
-        # 3) DELETE Practicals for this subject
-        Practical.objects.filter(
-            subject=subject
-        ).delete()
-
-        # 4) Assign NEW teacher if selected
+        # Validate the new teacher now; the deletes run in the background worker
         teacher_id = request.POST.get('teacher_id')
         if teacher_id:
             teacher = get_object_or_404(
@@ -1431,13 +1687,140 @@ def renew_practicals(request, subject_id):
                 role='teacher',
                 department=request.user.department
             )
-            subject.teacher = teacher
-            subject.save()
+            teacher_id = teacher.id
+
+        enqueue('subjects.renew', {'subject_id': subject.id, 'teacher_id': teacher_id}, user=request.user)
 
         messages.success(
             request,
-            f"All Practicals and Certificates for {subject.name} have been deleted and renewed successfully."
+            f"Renewal of {subject.name} has started. Practicals and Certificates will be removed shortly."
         )
         return redirect('hod_dashboard')
 
     return redirect('hod_subject_list')
+
+
+# ================= Background Jobs =================
+
+def recent_jobs(user):
+    """Jobs started by this user that are running or finished in the last hour"""
+    return list(
+        Job.objects.filter(created_by=user).filter(
+            Q(finished_at__isnull=True) | Q(finished_at__gte=timezone.now() - timedelta(hours=1))
+        ).order_by('-id')[:5]
+    )
+
+
+@login_required
+def job_status(request, job_id):
+    """Progress of a background job for dashboard polling"""
+    job = get_object_or_404(Job, id=job_id)
+    if job.created_by_id != request.user.id and request.user.role != 'admin':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+
+    return JsonResponse({
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'progress': job.progress,
+        'message': (job.result or {}).get('message') if job.status == 'succeeded' else job.progress_message,
+        'attempts': job.attempts,
+        'finished': job.is_finished,
+    })
+
+
+@login_required
+def performance_summary(request):
+    """Rolling per-view timing summary of this process, for admins"""
+    if request.user.role != 'admin':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+    return JsonResponse({'views': timing_summary()})
+
+
+@login_required
+def audit_timeline(request):
+    """
+    Audit events, newest first, as JSON: ?student=, ?subject=, ?actor= (ids),
+    ?before=<last id seen> for the next page. HODs see their department only.
+    """
+    if request.user.role not in ('admin', 'hod'):
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+
+    filters = {}
+    for name in ('student', 'subject', 'actor', 'before'):
+        value = request.GET.get(name)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({'status': 'error', 'message': f'Invalid {name}'}, status=400)
+            filters[name] = int(value)
+    if request.user.role == 'hod':
+        filters['department'] = request.user.department
+
+    limit = getattr(settings, 'AUDIT_PAGE_SIZE', 50)
+    events = audit.timeline(limit=limit, **filters)
+    return JsonResponse({
+        'status': 'success',
+        'events': [audit.event_json(event) for event in events],
+        'next_before': events[-1].id if len(events) == limit else None,
+    })
+
+
+@login_required
+def search_view(request):
+    """
+    Ranked full-text search over practicals and submission reports (JSON):
+    ?q=<words>&page=<n>. Teachers see their own practicals, HODs and
+    examiners their department.
+    """
+    if request.user.role not in ('teacher', 'hod', 'examiner'):
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'status': 'error', 'message': 'Enter something to search for'}, status=400)
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+
+    page_size = getattr(settings, 'SEARCH_PAGE_SIZE', 20)
+    documents = search_documents(query, request.user, limit=page_size + 1, offset=(page - 1) * page_size)
+    return JsonResponse({
+        'status': 'success',
+        'results': [result_json(document, query) for document in documents[:page_size]],
+        'next_page': page + 1 if len(documents) > page_size else None,
+    })
+
+
+@login_required
+def examiner_student_suggestions(request):
+    """Type-ahead for the examiner search: ?department=&student_class=&q=<roll number or name prefix>"""
+    if request.user.role != 'examiner':
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+
+    department = request.GET.get('department', '')
+    student_class = request.GET.get('student_class', '')
+    prefix = request.GET.get('q', '').strip()
+    if not department or not student_class or not prefix:
+        return JsonResponse({'status': 'error', 'message': 'Department, class and q are required'}, status=400)
+
+    students = suggest_students(
+        department, student_class, prefix, limit=getattr(settings, 'EXAMINER_SUGGESTION_LIMIT', 10)
+    )
+    response = JsonResponse({'status': 'success', 'students': students})
+    # Rosters rarely change; repeated keystrokes are answered by the browser
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics of all worker processes, for a scraper that sends
+    `Authorization: Bearer <METRICS_TOKEN>`. Disabled while no token is set.
+    REMOTE_ADDR cannot be trusted here: behind the local proxy every
+    request comes from 127.0.0.1.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404("Metrics are disabled")
+    if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
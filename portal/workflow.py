@@ -0,0 +1,59 @@
+from collections import namedtuple
+from django.db import transaction
+from django.utils import timezone
+from .models import Certificate
+from .stats import invalidate_stats
+from . import audit, metrics
+
+# A move from any of `sources` to `target`, stamping the `stamps` fields with now
+Transition = namedtuple('Transition', ['sources', 'target', 'stamps'])
+
+TRANSITIONS = {
+    # Student sends the generated certificate
+    'send': Transition(('generated', 'template_added'), 'submitted_to_teacher', ('submitted_at',)),
+    # Student uploads the signed certificate; allowed again after a rejection
+    'submit': Transition(
+        ('generated', 'template_added', 'submitted_to_teacher', 'rejected'), 'submitted_to_teacher', ('submitted_at',)
+    ),
+    'teacher_approve': Transition(('submitted_to_teacher', 'sent_to_teacher'), 'sent_to_hod', ('approved_at',)),
+    'teacher_reject': Transition(('submitted_to_teacher',), 'rejected', ()),
+    'hod_approve': Transition(('sent_to_hod',), 'sent_to_examiner', ('approved_at', 'examiner_approved_at')),
+    'examiner_approve': Transition(('sent_to_examiner',), 'certified', ('examiner_approved_at', 'certified_at')),
+    'examiner_reject': Transition(('sent_to_examiner',), 'rejected', ()),
+}
+
+
+def transition(certificate, action, actor=None, **fields):
+    """
+    Apply a workflow move as one UPDATE ... WHERE id = %s AND status IN
+    (sources), writing only the status, the move's timestamps and `fields`
+    (e.g. hod=request.user). Of two concurrent clicks exactly one wins.
+    The move is recorded in the audit log with `actor`.
+
+    Returns True when this call made the move; the instance is then
+    updated in memory. Certificate.save() is not run, so callers check
+    eligibility before a 'send' or 'submit'.
+    """
+    move = TRANSITIONS[action]
+    now = timezone.now()
+    values = {'status': move.target, **{name: now for name in move.stamps}, **fields}
+
+    won = Certificate.objects.filter(pk=certificate.pk, status__in=move.sources).update(**values) == 1
+    if not won:
+        return False
+
+    previous = certificate.status
+    for name, value in values.items():
+        setattr(certificate, name, value)
+    certificate._loaded_status = move.target
+
+    # What the post_save signals would have done
+    metrics.inc('portal_certificate_transitions_total', status=move.target)
+    if 'sent_to_hod' in move.sources + (move.target,):
+        department = certificate.subject.department
+        transaction.on_commit(lambda: invalidate_stats(department))
+    audit.record(
+        'certificate_transition', actor=actor, student=certificate.student_id, subject=certificate.subject,
+        target=certificate, from_status=previous, to_status=move.target, move=action
+    )
+    return True
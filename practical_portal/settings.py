@@ -24,6 +24,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'portal.instrumentation.ServerTimingMiddleware',
+    'portal.metrics.MetricsMiddleware',
+    'portal.audit.AuditMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,6 +70,16 @@ DATABASES = {
     }
 }
 
+# Shared by every web and worker process, so cache invalidation (exam mode,
+# home page, dashboard totals, reference data) reaches all of them. Create the
+# table once after migrating: python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'portal_cache',
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -133,4 +146,96 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 # Base URL for file serving (used in Google Docs viewer)
-BASE_URL = 'http://localhost:8000'  # Change this to your domain in production
\ No newline at end of file
+BASE_URL = 'http://localhost:8000'  # Change this to your domain in production
+
+# File serving for downloads and inline viewing.
+# None streams files through Django in FILE_SERVE_CHUNK_SIZE blocks.
+# 'nginx' returns X-Accel-Redirect (FILE_SERVE_ACCEL_PREFIX must be an internal
+# location aliased to MEDIA_ROOT); 'apache' / 'lighttpd' return X-Sendfile.
+FILE_SERVE_BACKEND = None
+FILE_SERVE_ACCEL_PREFIX = '/protected-media/'
+FILE_SERVE_CHUNK_SIZE = 64 * 1024
+
+# Background job queue (run with: python manage.py run_worker)
+JOB_WORKER_CONCURRENCY = 2
+JOB_POLL_INTERVAL = 1.0          # seconds between polls of an empty queue
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 5            # seconds; doubles after each failed attempt
+JOB_LOCK_TIMEOUT = 600           # running jobs whose lock is not renewed for this long are requeued
+JOB_RUN_INLINE = False           # True runs jobs inside the request (no worker needed)
+
+# Document previews rendered once per file content (see portal/previews.py)
+PREVIEW_CACHE_DIR = BASE_DIR / 'preview_cache'
+PREVIEW_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+PREVIEW_THUMBNAIL_WIDTH = 200
+PREVIEW_MAX_THUMBNAILS = 20
+PREVIEW_CONVERT_TIMEOUT = 120
+PREVIEW_MAX_PAGES = 100           # pages drawn by the built-in DOCX renderer
+PREVIEW_EVICT_INTERVAL = 600      # seconds between cache size checks
+
+# Resumable chunked uploads for practical submissions (see portal/uploads.py)
+UPLOAD_CHUNK_DIR = BASE_DIR / 'upload_chunks'
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_EXPIRY = 24 * 60 * 60     # seconds before unfinished uploads are purged
+
+# Cached admin/HOD dashboard totals (see portal/stats.py); model signals
+# clear them on change, in every process through the shared CACHES backend.
+DASHBOARD_STATS_TIMEOUT = 300
+
+# Students per page in the HOD dashboard list
+HOD_STUDENT_PAGE_SIZE = 50
+
+# Rows per page in the teacher dashboard review lists
+TEACHER_QUEUE_PAGE_SIZE = 25
+
+# Per-request timing (see portal/instrumentation.py). A sampled share of
+# requests records query count, DB, view and template time into a rolling
+# per URL name summary (admins: /performance/) and a Server-Timing header.
+SERVER_TIMING_SAMPLE_RATE = 1.0  # 0.0 - 1.0; lower it on busy production sites
+SERVER_TIMING_HEADER = True      # False keeps the numbers out of responses
+SERVER_TIMING_WINDOW = 200       # recent requests kept per URL name
+
+# Prometheus metrics at /metrics (see portal/metrics.py). With several worker
+# processes set METRICS_DIR to a directory they share; each process writes its
+# values there and /metrics adds them up; files of exited processes are folded
+# into one. Clear the directory on deploy. /metrics answers 404 until
+# METRICS_TOKEN is set; scrapers send it as `Authorization: Bearer <token>`.
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5       # seconds between writes of a process's values
+METRICS_TOKEN = ''
+
+# Exam mode is cached in each process (see portal/exam_mode.py); a toggle
+# reaches every worker through the shared cache within this many seconds.
+EXAM_MODE_CHECK_INTERVAL = 5
+
+# Home page: anonymous pages may be reused by browsers and the proxy
+HOME_CACHE_MAX_AGE = 60
+
+# Worker boot import budget, checked with: python manage.py check_import_time
+IMPORT_TIME_BUDGET_MS = 1000
+
+# Most submissions a teacher can approve or reject in one bulk review
+BULK_REVIEW_MAX = 500
+
+# Audit log (see portal/audit.py): a request's or job's events are written
+# together when it finishes. Timeline pages at /audit/ hold AUDIT_PAGE_SIZE events.
+AUDIT_BATCH_SIZE = 500
+AUDIT_PAGE_SIZE = 50
+
+# Full-text search (see portal/search.py). The worker extracts each upload's
+# text once; PDFs need pdftotext (poppler-utils) installed.
+SEARCH_MAX_TEXT_CHARS = 100000   # indexed characters per upload
+SEARCH_EXTRACT_TIMEOUT = 60      # seconds
+SEARCH_PAGE_SIZE = 20
+
+# Examiner dashboard: type-ahead suggestions per keystroke, and the most roll
+# numbers one batch lookup may list (a whole class is always allowed)
+EXAMINER_SUGGESTION_LIMIT = 10
+EXAMINER_BATCH_MAX = 200
+
+# Reference data endpoints such as subjects by department (see
+# portal/reference_data.py): cached until the data changes, and browsers may
+# reuse a response for REFERENCE_DATA_MAX_AGE seconds, then revalidate by ETag
+REFERENCE_DATA_TIMEOUT = 24 * 60 * 60
+REFERENCE_DATA_MAX_AGE = 60